@@ -9,16 +9,27 @@ class AbstractDroid(ABC):
     You must also make sure that you do NOT change any of the code in this file.
     You must use this abstract class as-is, which means that your code may need
     to be written in a way that you are not expecting.
+    NOTE: The one exception is the empty __slots__ below, added so that the
+    droid classes can use __slots__ across the whole hierarchy, along with the
+    comments that go with it. It adds no attributes and changes no behavior.
     NOTE: calculate_total_cost returns None, and should continue to return None
     in child classes, meaning that access to the total cost value must be done
     by use of the total_cost attribute once the calculate_total_cost method has
     been called.
     """
 
+    # No per-instance __dict__, the only change made to this class. Without
+    # it every droid would still get a __dict__ even though the droid
+    # classes declare __slots__. Children that do not declare __slots__ of
+    # their own still get one, so this does not restrict them.
+    __slots__ = ()
+
     def __init__(self, *args, **kwargs) -> None:
         """Set up total_cost var for all children"""
         super().__init__(*args, **kwargs)
-        self.total_cost = 0
+        # total_cost is a property on the droid classes, so this assignment
+        # goes through its setter rather than needing a slot here.
+        self.total_cost = 0  # pylint:disable=assigning-non-slot
 
     @abstractmethod
     def calculate_total_cost(self) -> None:
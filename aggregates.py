@@ -0,0 +1,171 @@
+"""Cost Aggregates module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# First-party Imports
+from droids import MODEL_CLASSES, Droid
+
+# Dimensions droids can be grouped by.
+DIMENSIONS = ("model", "material", "color")
+
+NUMBER_OF_MATERIALS = len(Droid.Materials.ALL)
+NUMBER_OF_COLORS = len(Droid.Colors.ALL)
+# One cell for every combination of model, material and color.
+NUMBER_OF_CELLS = len(MODEL_CLASSES) * NUMBER_OF_MATERIALS * NUMBER_OF_COLORS
+
+
+class CostSummary:
+    """Count, total, minimum, maximum and mean total cost of a group of
+    droids"""
+
+    __slots__ = ("count", "total", "minimum", "maximum")
+
+    def __init__(self, count=0, total=0.0, minimum=None, maximum=None):
+        """Constructor"""
+        self.count = count
+        self.total = total
+        self.minimum = minimum
+        self.maximum = maximum
+
+    @property
+    def mean(self):
+        """Mean total cost, or None when the group is empty"""
+        if not self.count:
+            return None
+        return self.total / self.count
+
+    def merge(self, other):
+        """Add the droids summarized by another summary into this one"""
+        if not other.count:
+            return
+        if not self.count:
+            self.minimum = other.minimum
+            self.maximum = other.maximum
+        else:
+            self.minimum = min(self.minimum, other.minimum)
+            self.maximum = max(self.maximum, other.maximum)
+        self.count += other.count
+        self.total += other.total
+
+    def to_dict(self):
+        """Return the summary as a dictionary"""
+        return {
+            "count": self.count,
+            "total": self.total,
+            "minimum": self.minimum,
+            "maximum": self.maximum,
+            "mean": self.mean,
+        }
+
+    def __eq__(self, other):
+        """Equal when every statistic is equal"""
+        if not isinstance(other, CostSummary):
+            return NotImplemented
+        return self.to_dict() == other.to_dict()
+
+    def __repr__(self):
+        """Representation for debugging"""
+        return (
+            f"CostSummary(count={self.count}, total={self.total}, "
+            f"minimum={self.minimum}, maximum={self.maximum})"
+        )
+
+
+class CostAggregates:
+    """Running count, total, minimum and maximum of the total cost of droids
+    for every combination of model, material and color.
+
+    Adding a droid only updates its own combination, so the aggregates are
+    always current without scanning the droids again. Grouping by any of
+    the dimensions merges at most NUMBER_OF_CELLS combinations, however
+    many droids there are."""
+
+    def __init__(self):
+        """Constructor"""
+        # One entry per cell, indexed by _get_cell.
+        self._counts = [0] * NUMBER_OF_CELLS
+        self._totals = [0.0] * NUMBER_OF_CELLS
+        self._minimums = [float("inf")] * NUMBER_OF_CELLS
+        self._maximums = [float("-inf")] * NUMBER_OF_CELLS
+
+    def add(self, model_code, material_code, color_code, total_cost):
+        """Add the total cost of one droid"""
+        cell = _get_cell(model_code, material_code, color_code)
+        self._counts[cell] += 1
+        self._totals[cell] += total_cost
+        if total_cost < self._minimums[cell]:
+            self._minimums[cell] = total_cost
+        if total_cost > self._maximums[cell]:
+            self._maximums[cell] = total_cost
+
+    def add_many(self, model_codes, material_codes, color_codes, total_costs):
+        """Add the total costs of many droids, given as parallel sequences"""
+        # Local names for the lists, as this loop can run millions of times.
+        counts = self._counts
+        totals = self._totals
+        minimums = self._minimums
+        maximums = self._maximums
+        for model_code, material_code, color_code, total_cost in zip(
+            model_codes, material_codes, color_codes, total_costs
+        ):
+            # Same as _get_cell, written out to save a call per droid.
+            cell = (
+                model_code * NUMBER_OF_MATERIALS + material_code
+            ) * NUMBER_OF_COLORS + color_code
+            counts[cell] += 1
+            totals[cell] += total_cost
+            if total_cost < minimums[cell]:
+                minimums[cell] = total_cost
+            if total_cost > maximums[cell]:
+                maximums[cell] = total_cost
+
+    def group_by(self, *dimensions):
+        """Return a dictionary of CostSummary by group for the droids added.
+
+        dimensions are any of "model", "material" and "color". Each key is a
+        tuple holding the model name, material and color of the group, in
+        the order the dimensions were given. Groups with no droids are left
+        out. With no dimensions there is a single group keyed by ()."""
+        for dimension in dimensions:
+            if dimension not in DIMENSIONS:
+                raise ValueError(f"Unknown dimension: {dimension}")
+
+        groups = {}
+        for model_code, model_class in enumerate(MODEL_CLASSES):
+            for material_code, material in enumerate(Droid.Materials.ALL):
+                for color_code, color in enumerate(Droid.Colors.ALL):
+                    cell = _get_cell(model_code, material_code, color_code)
+                    if not self._counts[cell]:
+                        continue
+                    values = {
+                        "model": model_class.model_name,
+                        "material": material,
+                        "color": color,
+                    }
+                    key = tuple(values[dimension] for dimension in dimensions)
+                    summary = groups.get(key)
+                    if summary is None:
+                        summary = groups[key] = CostSummary()
+                    summary.merge(self._get_cell_summary(cell))
+        return groups
+
+    def summary(self):
+        """Return a CostSummary of every droid added"""
+        return self.group_by().get((), CostSummary())
+
+    def _get_cell_summary(self, cell):
+        """Get a CostSummary for one cell"""
+        return CostSummary(
+            self._counts[cell],
+            self._totals[cell],
+            self._minimums[cell],
+            self._maximums[cell],
+        )
+
+
+def _get_cell(model_code, material_code, color_code):
+    """Get the cell number for a combination of model, material and color"""
+    model_material = model_code * NUMBER_OF_MATERIALS + material_code
+    return model_material * NUMBER_OF_COLORS + color_code
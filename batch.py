@@ -0,0 +1,342 @@
+"""Batch Command module
+
+Runs droid commands read from a file or stdin one after the other, with no
+prompts or menus. Each line of input is a JSON object naming a command:
+
+    {"command": "add", "model": "Protocol", "material": "Carbonite",
+     "color": "White", "number_of_languages": 12}
+    {"command": "add", "droids": [{"model": "Utility", ...}, ...]}
+    {"command": "load", "path": "droids.csv"}
+    {"command": "list"}
+    {"command": "list-page", "offset": 0, "limit": 100}
+    {"command": "query", "model": "Utility", "color": "Red",
+     "options": ["toolbox"]}
+    {"command": "sort", "by": "cost"}
+    {"command": "sort-categories"}
+    {"command": "sort-cost"}
+    {"command": "aggregate", "by": ["model", "material"]}
+    {"command": "export", "path": "droids.txt"}
+
+Droids use the same fields as bulk load files. Each command writes exactly
+one JSON object on its own line of output. It always has "ok", and "error"
+when the command failed. An "id" given with a command is copied into its
+response so that responses can be matched up with commands. A failed command
+does not stop the ones after it."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import json
+from itertools import chain
+
+# First-party Imports
+from bulk_loader import (
+    MODEL_CODES,
+    OPTION_FIELDS,
+    RowError,
+    load_droids,
+    parse_row,
+    record_to_row,
+)
+from droids import MODEL_CLASSES
+
+# Number of droids in a page when a list-page command does not give a limit.
+DEFAULT_PAGE_SIZE = 100
+
+
+class CommandError(Exception):
+    """A batch command that could not be run"""
+
+
+class BatchReport:
+    """Result of running a batch of commands"""
+
+    def __init__(self):
+        """Constructor"""
+        self.commands = 0
+        self.failed = 0
+
+    @property
+    def has_errors(self):
+        """Whether any command failed"""
+        return self.failed > 0
+
+
+def run_batch(input_file, output_file, droid_collection, load_paths=()):
+    """Run every command in a text file of JSON Lines commands against a
+    droid collection, writing one JSON Lines response per command. The
+    files in load_paths are bulk loaded first, each reported the same way
+    as a load command."""
+    report = BatchReport()
+    commands = chain(
+        ((None, {"command": "load", "path": path}) for path in load_paths),
+        _read_commands(input_file),
+    )
+    for line_number, command in commands:
+        report.commands += 1
+        response = execute(command, droid_collection)
+        if not response["ok"]:
+            report.failed += 1
+            if line_number is not None:
+                response["line"] = line_number
+
+        output_file.write(json.dumps(response))
+        output_file.write("\n")
+
+    output_file.flush()
+    return report
+
+
+def parse_command(line):
+    """Parse a line of input into a command dict"""
+    try:
+        command = json.loads(line)
+    except ValueError as err:
+        raise CommandError(f"Invalid JSON: {getattr(err, 'msg', err)}") from err
+    if not isinstance(command, dict):
+        raise CommandError("Expected a JSON object")
+    if "command" not in command:
+        raise CommandError("Missing command")
+    return command
+
+
+def execute(command, droid_collection, commands=None):
+    """Run a parsed command against a droid collection and return its
+    response dict. command can also be the CommandError from parsing it.
+    commands is the dict of handlers to allow, COMMANDS by default."""
+    response = {}
+    try:
+        if isinstance(command, CommandError):
+            raise command
+        if "id" in command:
+            response["id"] = command["id"]
+        response["command"] = command["command"]
+        response["ok"] = True
+        response.update(run_command(command, droid_collection, commands))
+    except CommandError as err:
+        response["ok"] = False
+        response["error"] = str(err)
+    except Exception as err:  # pylint:disable=broad-exception-caught
+        # A bug hit by one command must not end the whole batch or drop a
+        # client of the server, so it is reported like any other failure.
+        response["ok"] = False
+        response["error"] = f"Internal error: {type(err).__name__}: {err}"
+    return response
+
+
+def run_command(command, droid_collection, commands=None):
+    """Run one command (dict) against a droid collection and return the
+    fields to add to its response"""
+    if commands is None:
+        commands = COMMANDS
+    name = command.get("command")
+    try:
+        handler = commands[name]
+    except (KeyError, TypeError) as err:
+        raise CommandError(f"Unknown command '{name}'") from err
+    return handler(command, droid_collection)
+
+
+def _read_commands(input_file):
+    """Yield (line number, command dict) for each line of input. Lines that
+    are not valid commands are yielded as a CommandError instead."""
+    for line_number, line in enumerate(input_file, start=1):
+        # Skip blank lines.
+        if not line.strip():
+            continue
+        try:
+            command = parse_command(line)
+        except CommandError as err:
+            command = err
+        yield line_number, command
+
+
+def _run_add(command, droid_collection):
+    """Add one droid given by the fields of the command, or every droid in
+    its "droids" list. Nothing is added unless every droid is valid."""
+    if "droids" in command:
+        rows = command["droids"]
+        if not isinstance(rows, list):
+            raise CommandError("droids must be a list")
+    else:
+        rows = [command]
+
+    records = []
+    for index, row in enumerate(rows):
+        # Say which droid of a list was wrong.
+        prefix = f"Droid {index}: " if "droids" in command else ""
+        if not isinstance(row, dict):
+            raise CommandError(f"{prefix}Expected a JSON object")
+        try:
+            records.append(parse_row(row))
+        except RowError as err:
+            raise CommandError(f"{prefix}{err.message}") from err
+
+    droid_collection.add_records(records)
+    return {"added": len(records), "size": len(droid_collection)}
+
+
+def _run_load(command, droid_collection):
+    """Bulk load a CSV or JSON Lines file of droids. Rows that fail
+    validation are skipped and listed in the errors of the response."""
+    path = command.get("path")
+    if not isinstance(path, str) or not path:
+        raise CommandError("Missing path")
+    try:
+        load_report = load_droids(path, droid_collection)
+    except OSError as err:
+        raise CommandError(f"Could not load {path}: {err.strerror}") from err
+    except ValueError as err:
+        raise CommandError(str(err)) from err
+    return {
+        "path": path,
+        "loaded": load_report.loaded,
+        "errors": [str(error) for error in load_report.errors],
+        "size": len(droid_collection),
+    }
+
+
+def _run_list(_, droid_collection):
+    """List every droid in the current order of the collection"""
+    return {
+        "droids": [
+            record_to_row(record[:5], record[5])
+            for record in droid_collection.iter_records(include_costs=True)
+        ]
+    }
+
+
+def _run_list_page(command, droid_collection):
+    """List one page of droids in the current order of the collection"""
+    offset = _get_count(command, "offset", 0)
+    limit = _get_count(command, "limit", DEFAULT_PAGE_SIZE)
+    # Only the droids on the page are read and priced.
+    droids = droid_collection.window(offset, limit)
+    return {
+        "offset": offset,
+        "size": len(droid_collection),
+        "droids": [
+            record_to_row(droid.to_record(), droid.total_cost) for droid in droids
+        ],
+    }
+
+
+def _run_query(command, droid_collection):
+    """List the droids matching every condition given. Any of model,
+    material, color and a list of options that must all be set can be
+    given."""
+    model = _get_name(command, "model")
+    if model is not None:
+        try:
+            model = MODEL_CLASSES[MODEL_CODES[model.lower()]]
+        except KeyError as err:
+            raise CommandError(f"Unknown model '{model}'") from err
+
+    option_names = command.get("options", [])
+    if not isinstance(option_names, list):
+        raise CommandError("options must be a list")
+    option_flags = dict(OPTION_FIELDS)
+    options = 0
+    for option in option_names:
+        if not isinstance(option, str) or option not in option_flags:
+            raise CommandError(f"Unknown option '{option}'")
+        options |= option_flags[option]
+
+    try:
+        droids = droid_collection.query(
+            model, _get_name(command, "material"), _get_name(command, "color"), options
+        )
+    except ValueError as err:
+        raise CommandError(str(err)) from err
+    return {
+        "count": len(droids),
+        "droids": [
+            record_to_row(droid.to_record(), droid.total_cost) for droid in droids
+        ],
+    }
+
+
+def _run_sort(command, droid_collection):
+    """Sort the collection by cost or into categories"""
+    sort_by = command.get("by")
+    if sort_by == "cost":
+        droid_collection.sort_by_total_cost()
+    elif sort_by == "categories":
+        droid_collection.sort_into_categories()
+    else:
+        raise CommandError(f"Unknown sort '{sort_by}'")
+    return {}
+
+
+def _run_aggregate(command, droid_collection):
+    """Summarize the total cost of the droids in each group"""
+    dimensions = command.get("by", [])
+    if not isinstance(dimensions, list):
+        raise CommandError("by must be a list")
+    try:
+        groups = droid_collection.group_by(*dimensions)
+    except (TypeError, ValueError) as err:
+        raise CommandError(str(err)) from err
+    return {
+        "groups": [
+            {**dict(zip(dimensions, key)), **summary.to_dict()}
+            for key, summary in groups.items()
+        ]
+    }
+
+
+def _run_sort_categories(_, droid_collection):
+    """Sort the collection into categories"""
+    droid_collection.sort_into_categories()
+    return {}
+
+
+def _run_sort_cost(_, droid_collection):
+    """Sort the collection by total cost"""
+    droid_collection.sort_by_total_cost()
+    return {}
+
+
+def _run_export(command, droid_collection):
+    """Write the printed form of the collection to a file"""
+    path = command.get("path")
+    if not isinstance(path, str) or not path:
+        raise CommandError("Missing path")
+    try:
+        droid_collection.export_to_file(path)
+    except OSError as err:
+        raise CommandError(f"Could not export to {path}: {err.strerror}") from err
+    return {"path": path, "size": len(droid_collection)}
+
+
+def _get_name(command, field):
+    """Get an optional name, such as a color, from a command"""
+    value = command.get(field)
+    if value is not None and not isinstance(value, str):
+        raise CommandError(f"{field} must be a string")
+    return value
+
+
+def _get_count(command, field, default):
+    """Get a whole number of zero or more from a command"""
+    value = command.get(field, default)
+    if isinstance(value, bool) or not isinstance(value, int) or value < 0:
+        raise CommandError(f"{field} must be a whole number of zero or more")
+    return value
+
+
+# Command handlers keyed by command name.
+COMMANDS = {
+    "add": _run_add,
+    "load": _run_load,
+    "list": _run_list,
+    "list-page": _run_list_page,
+    "query": _run_query,
+    "sort": _run_sort,
+    "sort-categories": _run_sort_categories,
+    "sort-cost": _run_sort_cost,
+    "aggregate": _run_aggregate,
+    "export": _run_export,
+}
@@ -0,0 +1,532 @@
+#!/usr/bin/env python
+"""Benchmark suite for the droid collection, sorting and data structures
+
+Run this file directly. For example:
+
+    python benchmarks.py --sizes 1000 100000
+    python benchmarks.py --sizes 1000 100000 --baseline benchmark_baseline.json
+    python benchmarks.py --sizes 1000 100000 --save-baseline benchmark_baseline.json
+
+When a baseline is given, any benchmark that is slower or uses more memory
+per item than the baseline by more than the tolerance is reported as a
+regression and the exit code is 1. Times are not compared directly. Every
+run first times a fixed reference workload, and each benchmark is compared
+as a multiple of that, so a slower or busier machine does not show up as a
+regression. A baseline that is missing or can not be read is an
+error with an exit code of 2, so a broken path never passes as a clean run.
+Pass --record as well to write the results as the baseline instead when
+there is none yet.
+
+benchmark_baseline.json holds a baseline for sizes 1000 and 100000."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import argparse
+import gc
+import json
+import os
+import random
+import sys
+import time
+import tracemalloc
+from itertools import cycle
+from operator import attrgetter
+
+# First-party Imports
+from columnar import ColumnarDroidCollection
+from datastructures import ArrayQueue, ArrayStack, NodeDataStructure, Queue, Stack
+from droids import MODEL_CLASSES, Droid, DroidCollection, droid_from_record
+from mergesort import MergeSort
+
+DEFAULT_SIZES = (1000, 100000, 1000000, 10000000)
+DEFAULT_SEED = 226
+# Allowed slow down or memory growth over the baseline before it counts as a
+# regression. 0.25 is 25 percent.
+DEFAULT_TOLERANCE = 0.25
+# Timing differences smaller than this many seconds are treated as noise.
+TIME_NOISE_FLOOR = 0.005
+# Number of values sorted by the reference workload that times are compared
+# against, and how many times it is run, keeping the fastest.
+REFERENCE_SIZE = 20000
+REFERENCE_REPEAT = 5
+# Memory budget given to the external sort benchmark, in bytes.
+EXTERNAL_SORT_BUDGET = 8 * 1024 * 1024
+
+BACKENDS = {
+    "list": DroidCollection,
+    "columnar": ColumnarDroidCollection,
+    # Not a collection. Runs the data structure and sorting benchmarks.
+    "structures": None,
+}
+
+
+class NullWriter:
+    """File like object that throws away everything written to it"""
+
+    def __init__(self):
+        """Constructor"""
+        self.characters = 0
+
+    def write(self, text):
+        """Count the characters and throw them away"""
+        self.characters += len(text)
+
+
+def generate_fleet_args(size, seed=DEFAULT_SEED):
+    """Return a list of (add method name, arguments) for a synthetic fleet.
+
+    The same size and seed always produce the same fleet."""
+    generator = random.Random(seed)
+    materials = Droid.Materials.ALL
+    colors = Droid.Colors.ALL
+
+    fleet = []
+    for _ in range(size):
+        model = generator.randrange(4)
+        material = generator.choice(materials)
+        color = generator.choice(colors)
+        # Draw all six option flags in one go.
+        flags = generator.getrandbits(6)
+        toolbox = bool(flags & 1)
+        computer_connection = bool(flags & 2)
+        scanner = bool(flags & 4)
+
+        if model == 0:
+            fleet.append(
+                ("add_protocol", (material, color, generator.randrange(40)))
+            )
+        elif model == 1:
+            fleet.append(
+                (
+                    "add_utility",
+                    (material, color, toolbox, computer_connection, scanner),
+                )
+            )
+        elif model == 2:
+            fleet.append(
+                (
+                    "add_janitor",
+                    (
+                        material,
+                        color,
+                        toolbox,
+                        computer_connection,
+                        scanner,
+                        bool(flags & 8),
+                        bool(flags & 16),
+                    ),
+                )
+            )
+        else:
+            fleet.append(
+                (
+                    "add_astromech",
+                    (
+                        material,
+                        color,
+                        toolbox,
+                        computer_connection,
+                        scanner,
+                        bool(flags & 32),
+                        generator.randrange(200),
+                    ),
+                )
+            )
+    return fleet
+
+
+def add_fleet(droid_collection, fleet_args):
+    """Add a generated fleet to a collection using the add methods"""
+    add_methods = {
+        name: getattr(droid_collection, name)
+        for name in ("add_protocol", "add_utility", "add_janitor", "add_astromech")
+    }
+    for name, args in fleet_args:
+        add_methods[name](*args)
+
+
+def build_fleet(collection_class, size, seed=DEFAULT_SEED):
+    """Create a collection holding a synthetic fleet"""
+    droid_collection = collection_class()
+    add_fleet(droid_collection, generate_fleet_args(size, seed))
+    return droid_collection
+
+
+# Each benchmark is a setup function. It receives the collection class and
+# fleet size, does any work that should not be timed, and returns the
+# function to time.
+
+
+def setup_add(collection_class, size):
+    """Time adding a fleet one droid at a time"""
+    fleet_args = generate_fleet_args(size)
+    droid_collection = collection_class()
+    return lambda: add_fleet(droid_collection, fleet_args)
+
+
+def setup_calculate_total_cost(collection_class, size):
+    """Time calling calculate_total_cost on every droid"""
+    droid_collection = build_fleet(collection_class, size)
+
+    def run():
+        for droid in droid_collection:
+            droid.calculate_total_cost()
+
+    return run
+
+
+def setup_sort_by_total_cost(collection_class, size):
+    """Time sorting a freshly built fleet by total cost"""
+    droid_collection = build_fleet(collection_class, size)
+    return droid_collection.sort_by_total_cost
+
+
+def setup_resort_after_add(collection_class, size):
+    """Time sorting by total cost again after adding one droid, with the
+    cost index kept"""
+    droid_collection = build_fleet(collection_class, size)
+    droid_collection.enable_cost_index()
+    droid_collection.sort_by_total_cost()
+    add_fleet(droid_collection, generate_fleet_args(1, DEFAULT_SEED + 1))
+    return droid_collection.sort_by_total_cost
+
+
+def setup_sort_into_categories(collection_class, size):
+    """Time sorting a freshly built fleet into categories"""
+    droid_collection = build_fleet(collection_class, size)
+    return droid_collection.sort_into_categories
+
+
+def setup_cheapest(collection_class, size):
+    """Time picking the 100 cheapest droids out of a freshly built fleet"""
+    droid_collection = build_fleet(collection_class, size)
+    return lambda: droid_collection.cheapest(100)
+
+
+def setup_group_by(collection_class, size):
+    """Time a group by query against the running totals of a fleet"""
+    droid_collection = build_fleet(collection_class, size)
+    droid_collection.enable_aggregates()
+    droid_collection.cost_summary()
+    return lambda: droid_collection.group_by("model", "color")
+
+
+def setup_render(collection_class, size):
+    """Time rendering the whole fleet as text"""
+    droid_collection = build_fleet(collection_class, size)
+    return lambda: droid_collection.write_to(NullWriter())
+
+
+def setup_stack(_, size):
+    """Time pushing and then popping size items on a Stack"""
+
+    def run():
+        stack = Stack()
+        for item in range(size):
+            stack.push(item)
+        while not stack.is_empty:
+            stack.pop()
+
+    return run
+
+
+def setup_queue(_, size):
+    """Time enqueuing and then dequeuing size items on a Queue"""
+
+    def run():
+        queue = Queue()
+        for item in range(size):
+            queue.enqueue(item)
+        while not queue.is_empty:
+            queue.dequeue()
+
+    return run
+
+
+def setup_array_stack(_, size):
+    """Time pushing and then draining size items on an ArrayStack"""
+
+    def run():
+        stack = ArrayStack()
+        stack.push_many(range(size))
+        for _ in stack.drain():
+            pass
+
+    return run
+
+
+def setup_array_queue(_, size):
+    """Time enqueuing and then draining size items on an ArrayQueue"""
+
+    def run():
+        queue = ArrayQueue()
+        queue.enqueue_many(range(size))
+        for _ in queue.drain():
+            pass
+
+    return run
+
+
+def setup_merge_sort(_, size):
+    """Time the original MergeSort comparing droids directly"""
+    droids = list(build_fleet(DroidCollection, size))
+    for droid in droids:
+        droid.calculate_total_cost()
+    return lambda: MergeSort().sort(droids)
+
+
+def setup_merge_sort_key(_, size):
+    """Time MergeSort with the total cost extracted as a key"""
+    droids = list(build_fleet(DroidCollection, size))
+    for droid in droids:
+        droid.calculate_total_cost()
+    return lambda: MergeSort().sort(droids, key=attrgetter("total_cost"))
+
+
+def setup_external_sort(_, size):
+    """Time the external sort, with a memory budget small enough that it
+    spills runs to disk once there are more than about 37,000 droids"""
+    # Imported here so the other benchmarks do not need the snapshot module.
+    from external_sort import external_sort  # pylint:disable=import-outside-toplevel
+
+    records = list(build_fleet(ColumnarDroidCollection, size).iter_records())
+
+    def run():
+        for _ in external_sort(records, memory_budget=EXTERNAL_SORT_BUDGET):
+            pass
+
+    return run
+
+
+def setup_allocate_droids(_, size):
+    """Time creating size droid objects of every model"""
+    records = [
+        (model_code, index % 4, index % 4, index % 64, index % 50)
+        for index, model_code in zip(range(size), cycle(range(len(MODEL_CLASSES))))
+    ]
+    return lambda: [droid_from_record(record) for record in records]
+
+
+def setup_allocate_nodes(_, size):
+    """Time creating size data structure Node objects"""
+    return lambda: [NodeDataStructure.Node() for _ in range(size)]
+
+
+# Benchmarks run against each droid collection backend.
+COLLECTION_BENCHMARKS = {
+    "add": setup_add,
+    "calculate_total_cost": setup_calculate_total_cost,
+    "sort_by_total_cost": setup_sort_by_total_cost,
+    "resort_after_add": setup_resort_after_add,
+    "sort_into_categories": setup_sort_into_categories,
+    "cheapest": setup_cheapest,
+    "group_by": setup_group_by,
+    "render": setup_render,
+}
+# Benchmarks run for the "structures" backend.
+STRUCTURE_BENCHMARKS = {
+    "stack": setup_stack,
+    "queue": setup_queue,
+    "array_stack": setup_array_stack,
+    "array_queue": setup_array_queue,
+    "merge_sort": setup_merge_sort,
+    "merge_sort_key": setup_merge_sort_key,
+    "external_sort": setup_external_sort,
+    "allocate_droids": setup_allocate_droids,
+    "allocate_nodes": setup_allocate_nodes,
+}
+BENCHMARKS = {**COLLECTION_BENCHMARKS, **STRUCTURE_BENCHMARKS}
+
+
+def measure_reference():
+    """Return the fastest seconds taken by the reference workload, a merge
+    sort of a fixed list of integers. It does the same kind of interpreted
+    work as the benchmarks, so it slows down along with them on a slower or
+    busier machine."""
+    values = list(range(REFERENCE_SIZE))
+    random.Random(DEFAULT_SEED).shuffle(values)
+    seconds = None
+    for _ in range(REFERENCE_REPEAT):
+        unsorted = list(values)
+        gc.collect()
+        start = time.perf_counter()
+        MergeSort().sort(unsorted)
+        elapsed = time.perf_counter() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+    return seconds
+
+
+def measure(setup, collection_class, size, track_memory=True, repeat=1):
+    """Run one benchmark. Returns a dict with the fastest seconds taken out
+    of repeat runs and the peak bytes allocated while it ran (None when
+    memory is not tracked)."""
+    seconds = None
+    for _ in range(repeat):
+        run = setup(collection_class, size)
+        gc.collect()
+        start = time.perf_counter()
+        run()
+        elapsed = time.perf_counter() - start
+        if seconds is None or elapsed < seconds:
+            seconds = elapsed
+
+    peak_bytes = None
+    if track_memory:
+        # Memory tracing slows everything down, so it gets its own run
+        # against a fresh setup rather than skewing the timing above.
+        run = setup(collection_class, size)
+        gc.collect()
+        tracemalloc.start()
+        try:
+            run()
+            peak_bytes = tracemalloc.get_traced_memory()[1]
+        finally:
+            tracemalloc.stop()
+
+    result = {"seconds": seconds, "peak_bytes": peak_bytes}
+    if peak_bytes is not None and size:
+        result["bytes_per_item"] = peak_bytes / size
+    return result
+
+
+def run_benchmarks(backends, benchmark_names, sizes, track_memory=True, repeat=1):
+    """Run every benchmark for every backend and size. Returns nested dicts
+    of results keyed by backend, then benchmark name, then size. Each result
+    also holds its time as a multiple of the reference workload."""
+    reference_seconds = measure_reference()
+    print(f"Reference workload: {reference_seconds:.4f} s")
+    results = {}
+    for backend in backends:
+        if BACKENDS[backend] is None:
+            backend_benchmarks = STRUCTURE_BENCHMARKS
+        else:
+            backend_benchmarks = COLLECTION_BENCHMARKS
+        for name in benchmark_names:
+            if name not in backend_benchmarks:
+                continue
+            for size in sizes:
+                result = measure(
+                    BENCHMARKS[name], BACKENDS[backend], size, track_memory, repeat
+                )
+                result["relative_seconds"] = result["seconds"] / reference_seconds
+                results.setdefault(backend, {}).setdefault(name, {})[
+                    str(size)
+                ] = result
+                print_result(backend, name, size, result)
+    return results
+
+
+def compare_to_baseline(results, baseline, tolerance):
+    """Return a list of regression messages for results that are worse than
+    the baseline by more than the tolerance. Times are compared relative to
+    the reference workload of each run, and memory per item."""
+    regressions = []
+    for backend, benchmarks in results.items():
+        for name, sizes in benchmarks.items():
+            for size, result in sizes.items():
+                expected = baseline.get(backend, {}).get(name, {}).get(size)
+                if expected is None:
+                    continue
+                for measurement in ("relative_seconds", "bytes_per_item"):
+                    actual = result.get(measurement)
+                    allowed = expected.get(measurement)
+                    if actual is None or allowed is None:
+                        continue
+                    # Runs too short to time reliably are not compared.
+                    if (
+                        measurement == "relative_seconds"
+                        and result["seconds"] - expected["seconds"] < TIME_NOISE_FLOOR
+                    ):
+                        continue
+                    if actual > allowed * (1 + tolerance):
+                        regressions.append(
+                            f"{backend} {name} {size}: {measurement} "
+                            f"{actual:.6g} > baseline {allowed:.6g}"
+                        )
+    return regressions
+
+
+def print_result(backend, name, size, result):
+    """Print one benchmark result"""
+    peak = result["peak_bytes"]
+    peak_text = "-" if peak is None else f"{peak / (1024 * 1024):.1f} MiB"
+    per_item = result.get("bytes_per_item")
+    per_item_text = "-" if per_item is None else f"{per_item:.0f} B/item"
+    print(
+        f"{backend:<10} {name:<22} {size:>10,} "
+        f"{result['seconds']:>10.4f} s {peak_text:>12} {per_item_text:>12}"
+    )
+    sys.stdout.flush()
+
+
+def main(*args):
+    """Run the benchmark suite"""
+    parser = argparse.ArgumentParser(description="Droid benchmark suite")
+    parser.add_argument(
+        "--sizes", type=int, nargs="+", default=list(DEFAULT_SIZES), metavar="N"
+    )
+    parser.add_argument(
+        "--backends", nargs="+", default=list(BACKENDS), choices=list(BACKENDS)
+    )
+    parser.add_argument(
+        "--benchmarks", nargs="+", default=list(BENCHMARKS), choices=list(BENCHMARKS)
+    )
+    parser.add_argument(
+        "--no-memory", action="store_true", help="skip peak memory measurement"
+    )
+    parser.add_argument("--baseline", metavar="FILE", help="compare against FILE")
+    parser.add_argument(
+        "--record",
+        action="store_true",
+        help="write the results to the --baseline FILE if it does not exist yet",
+    )
+    parser.add_argument(
+        "--save-baseline", metavar="FILE", help="write the results to FILE"
+    )
+    parser.add_argument("--tolerance", type=float, default=DEFAULT_TOLERANCE)
+    parser.add_argument(
+        "--repeat", type=int, default=1, help="time each benchmark N times, keep best"
+    )
+    options = parser.parse_args(list(args))
+
+    results = run_benchmarks(
+        options.backends,
+        options.benchmarks,
+        options.sizes,
+        not options.no_memory,
+        options.repeat,
+    )
+
+    if options.save_baseline:
+        with open(options.save_baseline, "w", encoding="utf-8") as file:
+            json.dump(results, file, indent=2, sort_keys=True)
+
+    if options.baseline:
+        if options.record and not os.path.exists(options.baseline):
+            with open(options.baseline, "w", encoding="utf-8") as file:
+                json.dump(results, file, indent=2, sort_keys=True)
+            print(f"No baseline found at {options.baseline}. Recorded this run.")
+            return 0
+        try:
+            with open(options.baseline, "r", encoding="utf-8") as file:
+                baseline = json.load(file)
+        except (OSError, ValueError) as err:
+            print(f"Could not read baseline {options.baseline}: {err}", file=sys.stderr)
+            return 2
+        regressions = compare_to_baseline(results, baseline, options.tolerance)
+        for regression in regressions:
+            print(f"REGRESSION: {regression}")
+        if regressions:
+            return 1
+        print("No regressions against the baseline.")
+
+    return 0
+
+
+# Prevent running on import.
+if __name__ == "__main__":
+    sys.exit(main(*sys.argv[1:]))
@@ -0,0 +1,253 @@
+"""Bulk Droid Loader module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import csv
+import json
+import os
+
+# First-party Imports
+from droids import (
+    COLOR_CODES,
+    MATERIAL_CODES,
+    MAX_RECORD_COUNT,
+    MODEL_CLASSES,
+    MODEL_OPTION_MASKS,
+    Droid,
+)
+from droids import MODEL_CODES as MODEL_CODES_BY_NAME
+
+# Number of records handed to the collection at a time.
+DEFAULT_BATCH_SIZE = 10000
+
+# Largest count that fits in the compact record format.
+MAX_COUNT = MAX_RECORD_COUNT
+
+# Field names used in the files. CSV files need a header row with these names
+# and JSON Lines files use them as object keys.
+MODEL_FIELD = "model"
+MATERIAL_FIELD = "material"
+COLOR_FIELD = "color"
+LANGUAGES_FIELD = "number_of_languages"
+SHIPS_FIELD = "number_of_ships"
+# Option fields along with the bit flag they set.
+OPTION_FIELDS = (
+    ("toolbox", Droid.Options.TOOLBOX),
+    ("computer_connection", Droid.Options.COMPUTER_CONNECTION),
+    ("scanner", Droid.Options.SCANNER),
+    ("broom", Droid.Options.BROOM),
+    ("vacuum", Droid.Options.VACUUM),
+    ("navigation", Droid.Options.NAVIGATION),
+)
+
+# Model codes keyed by lower case model name.
+MODEL_CODES = {name.lower(): code for name, code in MODEL_CODES_BY_NAME.items()}
+# Option bit flags that each model code actually has. Any other options in a
+# row are ignored, just like the add methods of the collection ignore them.
+MODEL_OPTIONS = MODEL_OPTION_MASKS
+# Field holding the count (languages or ships) for each model code, if any.
+COUNT_FIELDS = {
+    MODEL_CODES["protocol"]: LANGUAGES_FIELD,
+    MODEL_CODES["astromech"]: SHIPS_FIELD,
+}
+# Strings accepted for a true or false option value.
+TRUE_STRINGS = frozenset(("true", "t", "yes", "y", "1"))
+FALSE_STRINGS = frozenset(("false", "f", "no", "n", "0", ""))
+
+
+class RowError(Exception):
+    """A row in a bulk load file that could not be loaded"""
+
+    def __init__(self, message, line_number=None):
+        """Constructor"""
+        super().__init__(message)
+        self.message = message
+        self.line_number = line_number
+
+    def __str__(self):
+        """String method"""
+        return f"Line {self.line_number}: {self.message}"
+
+
+class LoadReport:
+    """Result of a bulk load"""
+
+    def __init__(self):
+        """Constructor"""
+        self.loaded = 0
+        self.errors = []
+
+    @property
+    def has_errors(self):
+        """Whether any rows failed to load"""
+        return len(self.errors) > 0
+
+
+def load_droids(path, droid_collection, file_format=None, batch_size=None):
+    """Stream the droids in a CSV or JSON Lines file into a droid collection.
+
+    The format is worked out from the file extension unless file_format is
+    given as "csv" or "jsonl". Rows that fail validation are skipped and
+    reported in the returned LoadReport along with their line numbers."""
+    if file_format is None:
+        file_format = _detect_format(path)
+    if batch_size is None:
+        batch_size = DEFAULT_BATCH_SIZE
+
+    if file_format == "csv":
+        row_reader = _read_csv_rows
+    elif file_format == "jsonl":
+        row_reader = _read_json_lines_rows
+    else:
+        raise ValueError(f"Unknown bulk load format: {file_format}")
+
+    report = LoadReport()
+    batch = []
+    with open(path, "r", encoding="utf-8", newline="") as file:
+        for line_number, row in row_reader(file):
+            try:
+                # Rows that could not even be read come through as errors.
+                if isinstance(row, RowError):
+                    raise row
+                batch.append(parse_row(row))
+            except RowError as err:
+                err.line_number = line_number
+                report.errors.append(err)
+                continue
+
+            # Hand the records over a batch at a time rather than one by one.
+            if len(batch) >= batch_size:
+                droid_collection.add_records(batch)
+                report.loaded += len(batch)
+                batch = []
+
+    # Add whatever is left in the final partial batch.
+    if batch:
+        droid_collection.add_records(batch)
+        report.loaded += len(batch)
+
+    return report
+
+
+def parse_row(row):
+    """Validate a row (dict of field name to value) and convert it to a
+    compact droid record tuple"""
+    model_code = _parse_choice(row, MODEL_FIELD, MODEL_CODES, lower=True)
+    material_code = _parse_choice(row, MATERIAL_FIELD, MATERIAL_CODES)
+    color_code = _parse_choice(row, COLOR_FIELD, COLOR_CODES)
+
+    # Only look at the options that this model of droid has.
+    options = 0
+    model_options = MODEL_OPTIONS[model_code]
+    for field, flag in OPTION_FIELDS:
+        if flag & model_options and _parse_bool(row, field):
+            options |= flag
+
+    count = 0
+    if model_code in COUNT_FIELDS:
+        count = _parse_count(row, COUNT_FIELDS[model_code])
+
+    return (model_code, material_code, color_code, options, count)
+
+
+def record_to_row(record, total_cost=None):
+    """Convert a compact droid record tuple to a row (dict of field name to
+    value) that parse_row would turn back into the same record. The total
+    cost is added to the row when it is given."""
+    model_code, material_code, color_code, options, count = record
+    model_class = MODEL_CLASSES[model_code]
+    row = {
+        MODEL_FIELD: model_class.model_name,
+        MATERIAL_FIELD: Droid.Materials.ALL[material_code],
+        COLOR_FIELD: Droid.Colors.ALL[color_code],
+    }
+    # Only include the options and count that this model of droid has.
+    model_options = MODEL_OPTIONS[model_code]
+    for field, flag in OPTION_FIELDS:
+        if flag & model_options:
+            row[field] = bool(options & flag)
+    if model_code in COUNT_FIELDS:
+        row[COUNT_FIELDS[model_code]] = count
+    if total_cost is not None:
+        row["total_cost"] = total_cost
+    return row
+
+
+def _detect_format(path):
+    """Work out the file format from the file extension"""
+    extension = os.path.splitext(path)[1].lower()
+    if extension == ".csv":
+        return "csv"
+    if extension in (".jsonl", ".ndjson"):
+        return "jsonl"
+    raise ValueError(f"Can not tell the bulk load format of {path}")
+
+
+def _read_csv_rows(file):
+    """Yield (line number, row) for each row of a CSV file"""
+    reader = csv.DictReader(file)
+    for row in reader:
+        yield reader.line_num, row
+
+
+def _read_json_lines_rows(file):
+    """Yield (line number, row) for each line of a JSON Lines file"""
+    for line_number, line in enumerate(file, start=1):
+        # Skip blank lines.
+        if not line.strip():
+            continue
+        try:
+            row = json.loads(line)
+        except json.JSONDecodeError as err:
+            row = RowError(f"Invalid JSON: {err.msg}")
+        if not isinstance(row, (dict, RowError)):
+            row = RowError("Expected a JSON object")
+        yield line_number, row
+
+
+def _parse_choice(row, field, choices, lower=False):
+    """Get a field that must be one of a set of choices and return its code"""
+    value = row.get(field)
+    if value is None:
+        raise RowError(f"Missing {field}")
+    key = str(value).strip()
+    if lower:
+        key = key.lower()
+    try:
+        return choices[key]
+    except KeyError as err:
+        raise RowError(f"Unknown {field} '{value}'") from err
+
+
+def _parse_bool(row, field):
+    """Get a true or false option field. Missing fields are false."""
+    value = row.get(field)
+    if value is None or isinstance(value, bool):
+        return bool(value)
+    text = str(value).strip().lower()
+    if text in TRUE_STRINGS:
+        return True
+    if text in FALSE_STRINGS:
+        return False
+    raise RowError(f"Invalid {field} '{value}'. Expected true or false")
+
+
+def _parse_count(row, field):
+    """Get a count field that must be a non negative integer"""
+    value = row.get(field)
+    if value is None or value == "":
+        raise RowError(f"Missing {field}")
+    if isinstance(value, bool) or (
+        isinstance(value, float) and not value.is_integer()
+    ):
+        raise RowError(f"Invalid {field} '{value}'. Expected an integer")
+    try:
+        count = int(value)
+    except (TypeError, ValueError) as err:
+        raise RowError(f"Invalid {field} '{value}'. Expected an integer") from err
+    if count < 0 or count > MAX_COUNT:
+        raise RowError(f"Invalid {field} '{value}'. Out of range")
+    return count
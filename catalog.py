@@ -0,0 +1,349 @@
+"""Pricing Catalog module
+
+Droid prices are read from a JSON catalog file rather than being written into
+the droid classes. The default catalog is pricing_catalog.json next to this
+module. A catalog looks like this, with every material, color and model
+listed:
+
+    {
+        "materials": {"Carbonite": 100.0, ...},
+        "colors": {"White": 10.0, ...},
+        "models": {
+            "Protocol": {"base_cost": 120.0, "cost_per_language": 25.0},
+            "Utility": {"base_cost": 130.0, "cost_per_option": 35.0},
+            ...
+        }
+    }
+
+When a catalog is loaded it is compiled into lookup tables, so pricing a droid
+is a single table lookup plus the cost of its languages or ships."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import math
+import os
+import zlib
+from array import array
+
+# Catalog used when no other catalog has been loaded.
+DEFAULT_CATALOG_PATH = os.path.join(
+    os.path.dirname(os.path.abspath(__file__)), "pricing_catalog.json"
+)
+
+# Every combination of the six option bit flags.
+NUMBER_OF_OPTION_SETS = 64
+
+# Price keys for the count stored in the records of each model, if any.
+COUNT_PRICE_KEYS = {
+    "Protocol": "cost_per_language",
+    "Astromech": "cost_per_ship",
+}
+
+# Catalog in use. Loaded from DEFAULT_CATALOG_PATH the first time it is
+# needed, unless set_catalog is called first. Not a constant, as
+# set_catalog replaces it, so it is not named like one.
+_active_catalog = None  # pylint:disable=invalid-name
+
+
+class CatalogError(ValueError):
+    """Pricing catalog is not valid"""
+
+
+class PricingCatalog:
+    """Droid prices compiled into lookup tables.
+
+    base_cost_table holds the cost of every combination of model, material,
+    color and options, indexed by
+    ((model * materials + material) * colors + color) * 64 + options.
+    count_cost_table holds the cost of each language or ship, by model.
+    pricing_functions holds a function for each model, by model code, that
+    prices a droid from its material code, color code, options and count."""
+
+    def __init__(self, prices, path=None):
+        """Constructor. prices is the parsed contents of a catalog file."""
+        self.prices = prices
+        self.path = path
+        # Modification time of the file when it was last read, used to tell
+        # when it needs reloading.
+        self.modified_time = None
+        (
+            self.base_cost_table,
+            self.count_cost_table,
+            self.number_of_materials,
+            self.number_of_colors,
+        ) = _compile(prices)
+        self.pricing_functions = tuple(
+            _make_pricing_function(self, model_code)
+            for model_code in range(len(self.count_cost_table))
+        )
+        # Short checksum of the compiled prices. Two catalogs with the same
+        # fingerprint price every droid the same.
+        self.fingerprint = zlib.crc32(
+            self.base_cost_table.tobytes() + self.count_cost_table.tobytes()
+        )
+
+    def __reduce__(self):
+        """Pickle the prices rather than the compiled functions, so that a
+        catalog can be sent to worker processes"""
+        return (PricingCatalog, (self.prices, self.path))
+
+    def price(self, model_code, material_code, color_code, option_bits, count):
+        """Return the total cost of a droid given as a compact record"""
+        return self.pricing_functions[model_code](
+            material_code, color_code, option_bits, count
+        )
+
+    def get_cell(self, model_code, material_code, color_code, option_bits):
+        """Get the index of base_cost_table for a combination of model,
+        material, color and options"""
+        model_material = model_code * self.number_of_materials + material_code
+        model_material_color = model_material * self.number_of_colors + color_code
+        return model_material_color * NUMBER_OF_OPTION_SETS + option_bits
+
+    def compare(self, other):
+        """Return a CatalogChange describing the prices that differ between
+        this catalog and another one"""
+        changed_cells = {
+            cell
+            for cell, (old_cost, new_cost) in enumerate(
+                zip(self.base_cost_table, other.base_cost_table)
+            )
+            if old_cost != new_cost
+        }
+        changed_count_models = {
+            model_code
+            for model_code, (old_cost, new_cost) in enumerate(
+                zip(self.count_cost_table, other.count_cost_table)
+            )
+            if old_cost != new_cost
+        }
+        return CatalogChange(changed_cells, changed_count_models, other.get_cell)
+
+
+class CatalogChange:
+    """Which prices changed when one catalog replaced another"""
+
+    def __init__(self, changed_cells, changed_count_models, get_cell):
+        """Constructor"""
+        # Indexes of base_cost_table whose cost changed.
+        self.changed_cells = changed_cells
+        # Model codes whose cost per language or ship changed.
+        self.changed_count_models = changed_count_models
+        # Function turning a record into an index of base_cost_table.
+        self._get_cell = get_cell
+
+    def __bool__(self):
+        """Whether any price changed"""
+        return bool(self.changed_cells or self.changed_count_models)
+
+    def affects(self, record):
+        """Whether the total cost of a droid, given as a compact record, is
+        changed"""
+        model_code, material_code, color_code, option_bits, count = record
+        if count and model_code in self.changed_count_models:
+            return True
+        cell = self._get_cell(model_code, material_code, color_code, option_bits)
+        return cell in self.changed_cells
+
+
+def get_catalog():
+    """Return the catalog in use, loading the default catalog if no catalog
+    has been loaded yet"""
+    if _active_catalog is None:
+        set_catalog(load_catalog(DEFAULT_CATALOG_PATH))
+    return _active_catalog
+
+
+def set_catalog(catalog):
+    """Start pricing droids with a catalog. Returns a CatalogChange from the
+    catalog it replaces, or None if there was none.
+
+    NOTE: Droids that already have a total cost keep it. Pass the change to
+    DroidCollection.reprice to update the droids it affects."""
+    global _active_catalog  # pylint:disable=global-statement
+    old_catalog = _active_catalog
+    _active_catalog = catalog
+    if old_catalog is None:
+        return None
+    return old_catalog.compare(catalog)
+
+
+def load_catalog(path):
+    """Read and compile a catalog file"""
+    # Imported here so that the JSON parser, and the regular expression
+    # engine it loads, are not part of start up. Nothing needs a catalog
+    # until the first droid is priced.
+    import json  # pylint:disable=import-outside-toplevel
+
+    modified_time = os.stat(path).st_mtime_ns
+    with open(path, encoding="utf-8") as file:
+        try:
+            prices = json.load(file)
+        except ValueError as err:
+            raise CatalogError(f"{path} is not valid JSON: {err}") from err
+
+    try:
+        catalog = PricingCatalog(prices, path)
+    except CatalogError as err:
+        raise CatalogError(f"{path}: {err}") from err
+    catalog.modified_time = modified_time
+    return catalog
+
+
+def reload_catalog():
+    """Load the catalog in use again if its file has changed since it was
+    read. Returns a CatalogChange describing the prices that changed, or
+    None when the file has not changed.
+
+    If the new file is not valid, a CatalogError is raised and the catalog
+    in use is kept. It is not tried again until the file changes again."""
+    catalog = _active_catalog
+    if catalog is None or catalog.path is None:
+        return None
+    try:
+        modified_time = os.stat(catalog.path).st_mtime_ns
+    except OSError:
+        # The file has gone away. Keep using the prices already loaded.
+        return None
+    if modified_time == catalog.modified_time:
+        return None
+
+    catalog.modified_time = modified_time
+    return set_catalog(load_catalog(catalog.path))
+
+
+def _compile(prices):
+    """Check the prices in a catalog and build its lookup tables"""
+    # Imported here as the droids module imports this one.
+    # pylint:disable=import-outside-toplevel,cyclic-import
+    from droids import MODEL_CLASSES, MODEL_OPTION_MASKS, Droid
+
+    if not isinstance(prices, dict):
+        raise CatalogError("catalog must be a JSON object")
+    _check_keys("catalog", prices, ("materials", "colors", "models"))
+    material_costs = _read_costs(prices, "materials", Droid.Materials.ALL)
+    color_costs = _read_costs(prices, "colors", Droid.Colors.ALL)
+    model_prices = _read_model_prices(
+        prices["models"], MODEL_CLASSES, MODEL_OPTION_MASKS
+    )
+
+    base_cost_table = array("d")
+    count_cost_table = array("d")
+    for model_code, model_class in enumerate(MODEL_CLASSES):
+        model_price = model_prices[model_class.model_name]
+
+        # Only options that this model has cost anything.
+        model_options = MODEL_OPTION_MASKS[model_code]
+
+        options_costs = []
+        for option_bits in range(NUMBER_OF_OPTION_SETS):
+            options_cost = 0
+            flags = option_bits & model_options
+            # Add each option one at a time, lowest flag first.
+            while flags:
+                options_cost += model_price["cost_per_option"]
+                flags &= flags - 1
+            options_costs.append(options_cost)
+
+        for material_cost in material_costs:
+            for color_cost in color_costs:
+                for options_cost in options_costs:
+                    cost = model_price["base_cost"] + material_cost + color_cost
+                    if model_options:
+                        cost += options_cost
+                    base_cost_table.append(cost)
+
+        count_key = COUNT_PRICE_KEYS.get(model_class.model_name)
+        count_cost_table.append(model_price[count_key] if count_key else 0.0)
+
+    return (
+        base_cost_table,
+        count_cost_table,
+        len(Droid.Materials.ALL),
+        len(Droid.Colors.ALL),
+    )
+
+
+def _read_costs(prices, section, names):
+    """Read the cost of each name in a section, in the order of names"""
+    costs = prices[section]
+    if not isinstance(costs, dict):
+        raise CatalogError(f"{section} must be a JSON object")
+    _check_keys(section, costs, names)
+    return [_check_cost(f"{section}.{name}", costs[name]) for name in names]
+
+
+def _read_model_prices(models, model_classes, model_option_masks):
+    """Read and check the prices of each model. model_option_masks holds the
+    option flags each model can have, by model code."""
+    if not isinstance(models, dict):
+        raise CatalogError("models must be a JSON object")
+    _check_keys("models", models, [model.model_name for model in model_classes])
+
+    model_prices = {}
+    for model_code, model_class in enumerate(model_classes):
+        name = model_class.model_name
+        model_price = models[name]
+        if not isinstance(model_price, dict):
+            raise CatalogError(f"models.{name} must be a JSON object")
+
+        # Work out which prices this model needs from what it can have.
+        keys = ["base_cost"]
+        if model_option_masks[model_code]:
+            keys.append("cost_per_option")
+        if name in COUNT_PRICE_KEYS:
+            keys.append(COUNT_PRICE_KEYS[name])
+        _check_keys(f"models.{name}", model_price, keys)
+
+        model_prices[name] = {
+            key: _check_cost(f"models.{name}.{key}", model_price[key])
+            for key in keys
+        }
+    return model_prices
+
+
+def _check_keys(section, values, expected):
+    """Make sure a section has exactly the expected keys"""
+    missing = [key for key in expected if key not in values]
+    if missing:
+        raise CatalogError(f"{section} is missing {', '.join(missing)}")
+    unknown = [key for key in values if key not in expected]
+    if unknown:
+        raise CatalogError(f"{section} has unknown {', '.join(unknown)}")
+
+
+def _check_cost(name, cost):
+    """Make sure a cost is a finite number and return it as a float"""
+    if isinstance(cost, bool) or not isinstance(cost, (int, float)):
+        raise CatalogError(f"{name} must be a number")
+    if not math.isfinite(cost):
+        raise CatalogError(f"{name} must be a finite number")
+    return float(cost)
+
+
+def _make_pricing_function(catalog, model_code):
+    """Build the function that prices droids of one model"""
+    # The part of the base cost table covering this model.
+    model_size = (
+        catalog.number_of_materials * catalog.number_of_colors * NUMBER_OF_OPTION_SETS
+    )
+    start = model_code * model_size
+    base_costs = catalog.base_cost_table[start : start + model_size]
+    count_cost = catalog.count_cost_table[model_code]
+    material_size = catalog.number_of_colors * NUMBER_OF_OPTION_SETS
+
+    def price(material_code, color_code, option_bits, count):
+        """Return the total cost of a droid of this model"""
+        return (
+            base_costs[
+                material_code * material_size
+                + color_code * NUMBER_OF_OPTION_SETS
+                + option_bits
+            ]
+            + count * count_cost
+        )
+
+    return price
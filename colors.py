@@ -6,8 +6,15 @@
 
 # System imports
 import os
+import sys
+from contextlib import contextmanager
 
-os.system("")  # Required to get the terminal to ALWAYS show colors instead of raw escape codes.
+# Windows console constants used to turn on escape code processing.
+STD_OUTPUT_HANDLE = -11
+ENABLE_VIRTUAL_TERMINAL_PROCESSING = 0x0004
+
+# Number of characters a buffered console holds before writing them out.
+DEFAULT_BUFFER_SIZE = 64 * 1024
 
 
 # Decorator to convert Style class to a Singleton
@@ -33,43 +40,171 @@ class Style:
     RESET = "\033[0m"
     CLEAR = "\033[H\033[2J"
 
-    def __getattribute__(self, name):
-        """Override default dunder method"""
-        value = super().__getattribute__(name)
-        print(value, end="")
-        return value
+
+class Console:
+    """Writes colored messages to an output stream.
+
+    Each message is composed into a single string, color codes included, and
+    written in one call. Color codes are left out when the stream is not a
+    terminal, unless the FORCE_COLOR environment variable is set. Setting
+    NO_COLOR turns them off everywhere.
+
+    With the IMMEDIATE flush policy every message is written straight away.
+    With the BUFFERED policy messages are collected and written together once
+    buffer_size characters are waiting or flush is called."""
+
+    IMMEDIATE = "immediate"
+    BUFFERED = "buffered"
+
+    def __init__(
+        self,
+        stream=None,
+        use_color=None,
+        flush_policy=IMMEDIATE,
+        buffer_size=DEFAULT_BUFFER_SIZE,
+    ):
+        """Constructor. When stream is None, whatever sys.stdout is at the
+        time of writing is used. When use_color is None, it is worked out
+        from the stream."""
+        self._stream = stream
+        self._use_color = use_color
+        self.flush_policy = flush_policy
+        self.buffer_size = buffer_size
+        self._buffer = []
+        self._buffered_size = 0
+        # Stream that color support was last worked out for, and the answer.
+        self._color_stream = None
+        self._color_stream_supports_color = False
+
+    @property
+    def stream(self):
+        """The stream being written to"""
+        if self._stream is None:
+            return sys.stdout
+        return self._stream
+
+    @property
+    def use_color(self):
+        """Whether color codes are written"""
+        if self._use_color is not None:
+            return self._use_color
+        stream = self.stream
+        if stream is not self._color_stream:
+            self._color_stream = stream
+            self._color_stream_supports_color = _supports_color(stream)
+        return self._color_stream_supports_color
+
+    def styled(self, message, style):
+        """Return the message wrapped in a style and a reset, if colors are
+        being used"""
+        if self.use_color:
+            return f"{style}{message}{Style.RESET}"
+        return str(message)
+
+    def print_styled(self, message, style):
+        """Write a message in a style, followed by a new line"""
+        self.write(f"{self.styled(message, style)}\n")
+
+    def write(self, text):
+        """Write text following the flush policy"""
+        if self.flush_policy == self.IMMEDIATE:
+            self.stream.write(text)
+            return
+        self._buffer.append(text)
+        self._buffered_size += len(text)
+        if self._buffered_size >= self.buffer_size:
+            self._write_buffer()
+
+    def flush(self):
+        """Write out anything buffered and flush the stream"""
+        self._write_buffer()
+        self.stream.flush()
+
+    @contextmanager
+    def buffered(self, buffer_size=None):
+        """Context manager that buffers everything written inside it and
+        flushes it all at the end"""
+        old_policy = self.flush_policy
+        old_buffer_size = self.buffer_size
+        self.flush_policy = self.BUFFERED
+        if buffer_size is not None:
+            self.buffer_size = buffer_size
+        try:
+            yield self
+        finally:
+            self.flush()
+            self.flush_policy = old_policy
+            self.buffer_size = old_buffer_size
+
+    def _write_buffer(self):
+        """Write everything in the buffer to the stream in one call"""
+        if self._buffer:
+            self.stream.write("".join(self._buffer))
+            self._buffer = []
+            self._buffered_size = 0
+
+
+def _supports_color(stream):
+    """Work out whether a stream should be sent color codes"""
+    if "NO_COLOR" in os.environ:
+        return False
+    if "FORCE_COLOR" in os.environ:
+        return True
+    isatty = getattr(stream, "isatty", None)
+    try:
+        if not (isatty and isatty()):
+            return False
+    except ValueError:
+        # The stream has been closed.
+        return False
+    if sys.platform == "win32":
+        return _enable_windows_escape_codes()
+    return True
+
+
+def _enable_windows_escape_codes():
+    """Ask the Windows console to process escape codes rather than show them
+    as raw text. Returns whether it worked. This replaces running an empty
+    os.system command, which did the same thing as a side effect of starting
+    a whole shell process."""
+    import ctypes  # pylint:disable=import-outside-toplevel
+
+    kernel32 = ctypes.windll.kernel32
+    handle = kernel32.GetStdHandle(STD_OUTPUT_HANDLE)
+    mode = ctypes.c_ulong()
+    if not kernel32.GetConsoleMode(handle, ctypes.byref(mode)):
+        return False
+    if mode.value & ENABLE_VIRTUAL_TERMINAL_PROCESSING:
+        return True
+    return bool(
+        kernel32.SetConsoleMode(handle, mode.value | ENABLE_VIRTUAL_TERMINAL_PROCESSING)
+    )
+
+
+# Console used by the print functions below.
+console = Console()
 
 
 def print_success(message):
     """Print success message"""
-    Style.GREEN  # pylint:disable=W0104
-    print(message)
-    Style.RESET  # pylint:disable=W0104
+    console.print_styled(message, Style.GREEN)
 
 
 def print_warning(message):
     """Print warning message"""
-    Style.YELLOW  # pylint:disable=W0104
-    print(message)
-    Style.RESET  # pylint:disable=W0104
+    console.print_styled(message, Style.YELLOW)
 
 
 def print_error(message):
     """Print error message"""
-    Style.RED  # pylint:disable=W0104
-    print(message)
-    Style.RESET  # pylint:disable=W0104
+    console.print_styled(message, Style.RED)
 
 
 def print_primary(message):
     """Print primary message"""
-    Style.BLUE  # pylint:disable=W0104
-    print(message)
-    Style.RESET  # pylint:disable=W0104
+    console.print_styled(message, Style.BLUE)
 
 
 def print_info(message):
     """Print info message"""
-    Style.CYAN  # pylint:disable=W0104
-    print(message)
-    Style.RESET  # pylint:disable=W0104
+    console.print_styled(message, Style.CYAN)
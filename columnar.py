@@ -0,0 +1,475 @@
+"""Columnar Droid Collection module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import heapq
+from array import array
+from itertools import repeat
+
+# First-party Imports
+from catalog import get_catalog
+from droids import (
+    CATEGORY_ORDER,
+    COLOR_CODES,
+    MATERIAL_CODES,
+    MAX_RECORD_COUNT,
+    MODEL_HAS_COUNT,
+    MODEL_OPTION_MASKS,
+    RECORD_COLUMN_TYPES,
+    AstromechDroid,
+    Droid,
+    DroidCollection,
+    JanitorDroid,
+    ProtocolDroid,
+    UtilityDroid,
+    check_window,
+    droid_from_record,
+)
+from pricing import price_records
+
+
+def check_record_columns(models, materials, colors, counts):
+    """Make sure the model, material and color codes and the counts of
+    records, split into columns, are all ones the pricing catalog can price
+    and the columns can hold. Raises ValueError if not."""
+    catalog = get_catalog()
+    for values, limit, message in (
+        (models, len(catalog.pricing_functions), "Unknown model code"),
+        (materials, catalog.number_of_materials, "Unknown material type."),
+        (colors, catalog.number_of_colors, "Unknown color"),
+        (
+            counts,
+            MAX_RECORD_COUNT + 1,
+            f"Number of languages or ships must be from 0 to {MAX_RECORD_COUNT}",
+        ),
+    ):
+        if min(values) < 0 or max(values) >= limit:
+            raise ValueError(message)
+
+
+class ColumnarDroidCollection(DroidCollection):
+    """Stores droids as typed arrays (one array per attribute) instead of a
+    list of droid objects. Droid objects are only built when a caller asks
+    for one, such as when iterating or printing the collection."""
+
+    # Rows are priced in one batch and sorted by the built in sort, which is
+    # quicker than sending them to worker processes and merging the results.
+    parallel_sort_helps = False
+
+    def __init__(self):
+        """Constructor"""
+        # pylint:disable=super-init-not-called
+        # NOTE: The parent constructor is not called on purpose. There is no
+        # list of droid objects in this collection.
+
+        # One typed array per droid attribute. Row n of every array together
+        # makes up the droid that was added n-th.
+        self._models = array("B")
+        self._materials = array("B")
+        self._colors = array("B")
+        self._options = array("B")
+        # Number of languages for protocol droids, number of ships for
+        # astromech droids and zero for everything else.
+        self._counts = array("I")
+        self._total_costs = array("d")
+        # Number of rows at the start of the arrays whose total cost has
+        # been calculated. Rows are only ever appended, so every row at or
+        # after this one still needs to be priced.
+        self._priced_rows = 0
+
+        # The current order of the collection as a list of row numbers.
+        # Sorting only rearranges this array. The columns are never moved.
+        self._order = array("I")
+
+        # Secondary indexes used by query. Created by enable_indexes. Row
+        # ids in the indexes are the row numbers of the columns.
+        self._index = None
+        # Cost index entries are row numbers too.
+        self._init_cost_index()
+        self._init_aggregates()
+        # Number of changes made. See DroidCollection.
+        self.version = 0
+
+    def _init_aggregates(self):
+        """Set up the state of the running aggregates. Overrides parent."""
+        super()._init_aggregates()
+        # Number of rows at the start of the columns that have been added to
+        # the running totals. Like pricing, new rows are added in one batch
+        # the next time the totals are read.
+        self._aggregated_rows = 0
+
+    def add_protocol(self, material, color, number_of_languages):
+        """Add protocol droid to internal collection"""
+        self._add_row(
+            ProtocolDroid.model_code, material, color, 0, number_of_languages
+        )
+
+    def add_utility(self, material, color, toolbox, computer_connection, scanner):
+        """Add Utility droid to internal collection"""
+        options = self._pack_utility_options(toolbox, computer_connection, scanner)
+        self._add_row(UtilityDroid.model_code, material, color, options, 0)
+
+    def add_janitor(
+        self, material, color, toolbox, computer_connection, scanner, broom, vacuum
+    ):
+        """Add Janitor droid to internal collection"""
+        options = self._pack_utility_options(toolbox, computer_connection, scanner)
+        if broom:
+            options |= Droid.Options.BROOM
+        if vacuum:
+            options |= Droid.Options.VACUUM
+        self._add_row(JanitorDroid.model_code, material, color, options, 0)
+
+    def add_astromech(
+        self,
+        material,
+        color,
+        toolbox,
+        computer_connection,
+        scanner,
+        navigation,
+        number_of_ships,
+    ):
+        """Add Astromech droid to internal collection"""
+        options = self._pack_utility_options(toolbox, computer_connection, scanner)
+        if navigation:
+            options |= Droid.Options.NAVIGATION
+        self._add_row(
+            AstromechDroid.model_code, material, color, options, number_of_ships
+        )
+
+    def add_record(self, record):
+        """Add a droid in compact record form to the collection"""
+        model_code, material_code, color_code, options, count = record
+        # Check the whole row before any column grows, so a bad record leaves
+        # every column the same length.
+        check_record_columns((model_code,), (material_code,), (color_code,), (count,))
+        # Keep only what the model has, the same as the to_record of a droid.
+        options &= MODEL_OPTION_MASKS[model_code]
+        if not MODEL_HAS_COUNT[model_code]:
+            count = 0
+        record = (model_code, material_code, color_code, options, count)
+
+        # Append each attribute to its column.
+        self._models.append(model_code)
+        self._materials.append(material_code)
+        self._colors.append(color_code)
+        self._options.append(options)
+        self._counts.append(count)
+        self._total_costs.append(0.0)
+
+        # Add the new row number to the end of the current order.
+        self._order.append(len(self._models) - 1)
+        self.version += 1
+
+        if self._index is not None:
+            self._index.add(record)
+
+    def add_records(self, records):
+        """Add a batch of droids in compact record form to the collection"""
+        # Split the records into columns so that each column can be extended
+        # in one call.
+        columns = list(zip(*records))
+        if not columns:
+            return
+        models, materials, colors, options, counts = columns
+        check_record_columns(models, materials, colors, counts)
+        # Keep only what each model has, the same as the to_record of a droid.
+        masks = MODEL_OPTION_MASKS
+        options = [option & masks[model] for model, option in zip(models, options)]
+        has_count = MODEL_HAS_COUNT
+        counts = [
+            count if has_count[model] else 0 for model, count in zip(models, counts)
+        ]
+
+        # Build every new column before extending any of the existing ones,
+        # so a value that does not fit its column leaves them all unchanged.
+        new_columns = [
+            array(typecode, column)
+            for typecode, column in zip(
+                RECORD_COLUMN_TYPES, (models, materials, colors, options, counts)
+            )
+        ]
+
+        first_row = len(self._models)
+        for column, new_column in zip(
+            (self._models, self._materials, self._colors, self._options, self._counts),
+            new_columns,
+        ):
+            column.extend(new_column)
+        self._total_costs.extend(repeat(0.0, len(models)))
+        self._order.extend(range(first_row, len(self._models)))
+        self.version += 1
+
+        if self._index is not None:
+            for record in zip(models, materials, colors, options, counts):
+                self._index.add(record)
+
+    def __len__(self):
+        """Number of droids in the collection"""
+        return len(self._order)
+
+    def __iter__(self):
+        """Iterate over the droids in their current order, building each
+        droid object as it is needed"""
+        self._price_rows()
+        for row in self._order:
+            yield self._build_droid(row)
+
+    def __getitem__(self, index):
+        """Get the droid at the index of the current order"""
+        return self._build_droid(self._order[index])
+
+    def window(self, offset, count):
+        """Return a list of up to count droids, starting at position offset
+        of the current order. Overrides parent.
+
+        Rows are not priced in a batch first, so only the droids in the
+        window are priced, and only if their total cost is read."""
+        check_window(offset, count)
+        return [self._build_droid(row) for row in self._order[offset : offset + count]]
+
+    def get_record(self, row):
+        """Get the compact record for a row"""
+        return (
+            self._models[row],
+            self._materials[row],
+            self._colors[row],
+            self._options[row],
+            self._counts[row],
+        )
+
+    def iter_records(self, include_costs=False):
+        """Yield each droid in its current order as a compact record tuple.
+        When include_costs is True the total cost is added onto the end of
+        each record. Overrides parent."""
+        if include_costs:
+            self._price_rows()
+            for row in self._order:
+                yield self.get_record(row) + (self._total_costs[row],)
+        else:
+            for row in self._order:
+                yield self.get_record(row)
+
+    def _index_all(self):
+        """Add every row to the indexes. Overrides parent."""
+        for row in range(len(self._models)):
+            self._index.add(self.get_record(row))
+
+    def _droids_for_rows(self, row_ids):
+        """Turn index row ids into droids. Overrides parent."""
+        self._price_rows()
+        return [self._build_droid(row) for row in row_ids]
+
+    def record_columns(self):
+        """Return the droids in their current order as compact records split
+        into typed arrays, one per record field. Overrides parent."""
+        order = self._order
+        return tuple(
+            array(column.typecode, map(column.__getitem__, order))
+            for column in (
+                self._models,
+                self._materials,
+                self._colors,
+                self._options,
+                self._counts,
+            )
+        )
+
+    def iter_by_category(self):
+        """Iterate over the droids in categorical order without changing the
+        order of the collection. Overrides parent."""
+        self._price_rows()
+        for row in self._categorized_order():
+            yield self._build_droid(row)
+
+    def sort_into_categories(self):
+        """Sort the collection of droids by category"""
+        self._order = self._categorized_order()
+        self._cost_index = None
+        self.version += 1
+
+    def _categorized_order(self):
+        """Return the current order rearranged into categorical order"""
+
+        # One bucket of row numbers for each model code.
+        buckets = [array("I") for _ in CATEGORY_ORDER]
+
+        # Single pass through the current order dropping each row into the
+        # bucket for its model.
+        models = self._models
+        for row in self._order:
+            buckets[models[row]].append(row)
+
+        # Rebuild the order one category at a time. Each bucket is reversed
+        # to match the last in, first out order of the original stacks.
+        new_order = array("I")
+        for model_code in CATEGORY_ORDER:
+            bucket = buckets[model_code]
+            bucket.reverse()
+            new_order.extend(bucket)
+
+        return new_order
+
+    def sort_by_total_cost(self):
+        """Sort the droids by the total cost"""
+        self.version += 1
+
+        # When a cost index is kept, the sorted order is already in it.
+        if self._keep_cost_index:
+            self._order = array("I", self._get_cost_index())
+            return
+
+        # Make sure every row has been priced before sorting.
+        self._price_rows()
+
+        # Sort the row numbers using the total cost column as the key. The
+        # built in sort is stable just like MergeSort, so droids with the
+        # same total cost stay in the same relative order.
+        self._order = array(
+            "I", sorted(self._order, key=self._total_costs.__getitem__)
+        )
+
+    def cheapest(self, count):
+        """Return a list of the count cheapest droids, cheapest first,
+        without changing the order of the collection. Overrides parent."""
+        self._price_rows()
+        # Select row numbers using the total cost column as the key so only
+        # the chosen rows are ever turned into droid objects.
+        rows = heapq.nsmallest(count, self._order, key=self._total_costs.__getitem__)
+        return [self._build_droid(row) for row in rows]
+
+    def most_expensive(self, count):
+        """Return a list of the count most expensive droids, most expensive
+        first, without changing the order of the collection. Overrides
+        parent."""
+        self._price_rows()
+        rows = heapq.nlargest(count, self._order, key=self._total_costs.__getitem__)
+        return [self._build_droid(row) for row in rows]
+
+    def reorder(self, positions):
+        """Rearrange the collection so that the droid at positions[i] of the
+        current order ends up at index i. Overrides parent."""
+        order = self._order
+        self._order = array("I", [order[position] for position in positions])
+        self._cost_index = None
+        self.version += 1
+
+    def _get_aggregates(self):
+        """Get the running totals, first adding any rows that are missing
+        from them. Overrides parent."""
+        aggregates = super()._get_aggregates()
+        start = self._aggregated_rows
+        if start < len(self._models):
+            self._price_rows()
+            aggregates.add_many(
+                self._models[start:],
+                self._materials[start:],
+                self._colors[start:],
+                self._total_costs[start:],
+            )
+            self._aggregated_rows = len(self._models)
+        return aggregates
+
+    def _aggregate_all(self):
+        """Rows are added to the running totals by _get_aggregates.
+        Overrides parent."""
+
+    def reprice(self, change):
+        """Recalculate the total cost of only the rows whose price changed
+        when the pricing catalog was replaced. Overrides parent."""
+        # Rows that have not been priced yet will use the new prices anyway.
+        price = get_catalog().price
+        total_costs = self._total_costs
+        affected = 0
+        for row in range(self._priced_rows):
+            record = self.get_record(row)
+            if change.affects(record):
+                total_costs[row] = price(*record)
+                affected += 1
+        if affected:
+            self._discard_cost_views()
+            self.version += 1
+        return affected
+
+    def _cost_index_pairs(self, start):
+        """Return a (total cost, row) pair for each row from position start
+        of the current order on. Overrides parent."""
+        self._price_rows()
+        costs = self._total_costs
+        return [(costs[row], row) for row in self._order[start:]]
+
+    def _droid_for_entry(self, entry):
+        """Build the droid for a row. Overrides parent."""
+        return self._build_droid(entry)
+
+    def _get_entries(self):
+        """Return the current order of rows and its length, pricing any new
+        rows first so that the droids built for them have a total cost.
+        Overrides parent."""
+        self._price_rows()
+        entries = self._order
+        return entries, len(entries)
+
+    def _price_rows(self):
+        """Calculate the total cost of any rows that have not been priced"""
+        start = self._priced_rows
+        if start < len(self._models):
+            # Price all of the new rows at once using the batch pricing
+            # lookup tables rather than building a droid for each row.
+            self._total_costs[start:] = price_records(
+                self._models[start:],
+                self._materials[start:],
+                self._colors[start:],
+                self._options[start:],
+                self._counts[start:],
+            )
+            self._priced_rows = len(self._models)
+
+    def _build_droid(self, row):
+        """Build a droid object for a row. A row that has not been priced yet
+        is left for the droid to price itself if its total cost is read."""
+        droid = droid_from_record(self.get_record(row))
+        if row < self._priced_rows:
+            droid.cache_total_cost(self._total_costs[row])
+        return droid
+
+    def _add_row(self, model_code, material, color, options, count):
+        """Convert the material and color to codes and add the row"""
+        self.add_record(
+            (
+                model_code,
+                self._get_material_code(material),
+                self._get_color_code(color),
+                options,
+                count,
+            )
+        )
+
+    def _pack_utility_options(self, toolbox, computer_connection, scanner):
+        """Pack the options shared by all utility droids into bit flags"""
+        options = 0
+        if toolbox:
+            options |= Droid.Options.TOOLBOX
+        if computer_connection:
+            options |= Droid.Options.COMPUTER_CONNECTION
+        if scanner:
+            options |= Droid.Options.SCANNER
+        return options
+
+    def _get_material_code(self, material):
+        """Get the code for a material"""
+        try:
+            return MATERIAL_CODES[material]
+        except (KeyError, TypeError) as err:
+            raise ValueError("Unknown material type.") from err
+
+    def _get_color_code(self, color):
+        """Get the code for a color"""
+        try:
+            return COLOR_CODES[color]
+        except (KeyError, TypeError) as err:
+            raise ValueError("Unknown color") from err
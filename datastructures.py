@@ -4,6 +4,11 @@
 # CIS 226
 # 6-4-2023
 
+# System Imports
+from bisect import bisect_left, bisect_right
+from itertools import accumulate
+from operator import itemgetter
+
 
 class NodeDataStructure:
     """Base class for Data Structures that need to use a Node"""
@@ -11,6 +16,10 @@ class NodeDataStructure:
     class Node:
         """Used to store data inside a data structure"""
 
+        # Fixed attribute slots instead of a per-instance __dict__, since a
+        # data structure can hold a very large number of nodes.
+        __slots__ = ("data", "next")
+
         def __init__(self):
             """Constructor"""
             self.data = None
@@ -30,6 +39,10 @@ class Stack(NodeDataStructure):
         """Return whether stack is empty."""
         return self._head is None
 
+    def __len__(self):
+        """Number of items on the stack"""
+        return self._size
+
     def push(self, data):
         """Push method"""
         # Create a new node that points to the same place that head points to.
@@ -76,6 +89,10 @@ class Queue(NodeDataStructure):
         """Return whether queue is empty."""
         return self._head is None
 
+    def __len__(self):
+        """Number of items in the queue"""
+        return self._size
+
     def enqueue(self, data):
         """Push method"""
         # Create a new node that points to the same place that tail points to.
@@ -115,3 +132,308 @@ class Queue(NodeDataStructure):
         # Return None as the size must already be zero.
         # Alternatively, could raise an exception.
         return None
+
+
+class ArrayStack:
+    """Stack allowing push and pop functionality, stored in a growable list
+    instead of linked nodes"""
+
+    def __init__(self, iterable=None):
+        """Constructor. Items in iterable are pushed in order."""
+        # The top of the stack is the end of the list.
+        self._items = [] if iterable is None else list(iterable)
+
+    @property
+    def is_empty(self):
+        """Return whether stack is empty."""
+        return not self._items
+
+    def __len__(self):
+        """Number of items on the stack"""
+        return len(self._items)
+
+    def __iter__(self):
+        """Iterate from the top of the stack to the bottom without removing
+        anything"""
+        return reversed(self._items)
+
+    def push(self, data):
+        """Push method"""
+        self._items.append(data)
+
+    def push_many(self, iterable):
+        """Push every item in iterable, in order"""
+        self._items.extend(iterable)
+
+    # Same as push_many, to match list.
+    extend = push_many
+
+    def pop(self):
+        """Pop method"""
+        # Return None if the stack is empty, just like Stack.
+        if self._items:
+            return self._items.pop()
+        return None
+
+    def peek(self):
+        """Return the top item without removing it, or None if empty"""
+        if self._items:
+            return self._items[-1]
+        return None
+
+    def drain(self):
+        """Pop every item, yielding them from the top of the stack down"""
+        items = self._items
+        while items:
+            yield items.pop()
+
+
+class ArrayQueue:
+    """Queue allowing enqueue and dequeue functionality, stored in a circular
+    buffer instead of linked nodes"""
+
+    # Starting size of the buffer.
+    INITIAL_CAPACITY = 16
+
+    def __init__(self, iterable=None):
+        """Constructor. Items in iterable are enqueued in order."""
+        self._buffer = [None] * self.INITIAL_CAPACITY
+        # Index of the front of the queue in the buffer.
+        self._head = 0
+        self._size = 0
+        if iterable is not None:
+            self.enqueue_many(iterable)
+
+    @property
+    def is_empty(self):
+        """Return whether queue is empty."""
+        return self._size == 0
+
+    def __len__(self):
+        """Number of items in the queue"""
+        return self._size
+
+    def __iter__(self):
+        """Iterate from the front of the queue to the back without removing
+        anything"""
+        buffer = self._buffer
+        capacity = len(buffer)
+        for offset in range(self._size):
+            yield buffer[(self._head + offset) % capacity]
+
+    def enqueue(self, data):
+        """Enqueue method"""
+        if self._size == len(self._buffer):
+            self._resize(2 * len(self._buffer))
+        self._buffer[(self._head + self._size) % len(self._buffer)] = data
+        self._size += 1
+
+    def enqueue_many(self, iterable):
+        """Enqueue every item in iterable, in order"""
+        items = list(iterable)
+        needed = self._size + len(items)
+        # Grow the buffer at most once for the whole batch.
+        if needed > len(self._buffer):
+            capacity = len(self._buffer)
+            while capacity < needed:
+                capacity *= 2
+            self._resize(capacity)
+
+        # Copy the items in with at most two slice assignments: up to the end
+        # of the buffer, then wrapping around to the start.
+        capacity = len(self._buffer)
+        tail = (self._head + self._size) % capacity
+        first_part = min(len(items), capacity - tail)
+        self._buffer[tail : tail + first_part] = items[:first_part]
+        self._buffer[: len(items) - first_part] = items[first_part:]
+        self._size += len(items)
+
+    # Same as enqueue_many, to match list.
+    extend = enqueue_many
+
+    def dequeue(self):
+        """Dequeue method"""
+        # Return None if the queue is empty, just like Queue.
+        if self._size == 0:
+            return None
+        data = self._buffer[self._head]
+        # Clear the slot so the buffer does not keep the item alive.
+        self._buffer[self._head] = None
+        self._head = (self._head + 1) % len(self._buffer)
+        self._size -= 1
+        return data
+
+    def peek(self):
+        """Return the front item without removing it, or None if empty"""
+        if self._size == 0:
+            return None
+        return self._buffer[self._head]
+
+    def drain(self):
+        """Dequeue every item, yielding them from the front of the queue"""
+        while self._size:
+            yield self.dequeue()
+
+    def _resize(self, capacity):
+        """Move the items into a new buffer, with the front at index 0"""
+        items = list(self)
+        self._buffer = items + [None] * (capacity - len(items))
+        self._head = 0
+
+
+class SortedList:
+    """List of values kept in order of a sort key as they are added.
+
+    The values are stored in chunks, each with a matching list of keys, and
+    the largest key of every chunk is kept in a list of its own. Finding a
+    position is a binary search over those largest keys and then one inside
+    a single chunk, and an insert only shifts the items of that one chunk.
+    That keeps adding close to logarithmic even with millions of values.
+    Values with equal keys stay in the order they were added."""
+
+    # Chunks are split in half once they grow past twice this size.
+    CHUNK_SIZE = 1000
+
+    def __init__(self, pairs=None):
+        """Constructor. pairs is an optional iterable of (key, value) pairs
+        to add."""
+        self._keys = []
+        self._values = []
+        # Largest key in each chunk.
+        self._maxes = []
+        self._size = 0
+        # Number of values before each chunk, used to look values up by
+        # position. None until it is needed after a change.
+        self._offsets = None
+        if pairs is not None:
+            self.update(pairs)
+
+    @property
+    def is_empty(self):
+        """Return whether the list is empty."""
+        return self._size == 0
+
+    def __len__(self):
+        """Number of values in the list"""
+        return self._size
+
+    def __iter__(self):
+        """Iterate over the values in key order"""
+        for chunk in self._values:
+            yield from chunk
+
+    def __getitem__(self, index):
+        """Get the value at a position in key order"""
+        if index < 0:
+            index += self._size
+        if index < 0 or index >= self._size:
+            raise IndexError("sorted list index out of range")
+        offsets = self._get_offsets()
+        chunk_index = bisect_right(offsets, index) - 1
+        return self._values[chunk_index][index - offsets[chunk_index]]
+
+    def items(self):
+        """Iterate over the (key, value) pairs in key order"""
+        for keys, values in zip(self._keys, self._values):
+            yield from zip(keys, values)
+
+    def add(self, key, value):
+        """Add a value, after any values with an equal key"""
+        maxes = self._maxes
+        if not maxes:
+            self._keys.append([key])
+            self._values.append([value])
+            maxes.append(key)
+        else:
+            # The value goes in the first chunk with a key bigger than it.
+            # When there is none it goes on the end of the last chunk.
+            chunk_index = bisect_right(maxes, key)
+            if chunk_index == len(maxes):
+                chunk_index -= 1
+                self._keys[chunk_index].append(key)
+                self._values[chunk_index].append(value)
+                maxes[chunk_index] = key
+            else:
+                keys = self._keys[chunk_index]
+                position = bisect_right(keys, key)
+                keys.insert(position, key)
+                self._values[chunk_index].insert(position, value)
+
+            if len(self._keys[chunk_index]) > 2 * self.CHUNK_SIZE:
+                self._split_chunk(chunk_index)
+
+        self._size += 1
+        self._offsets = None
+
+    def update(self, pairs):
+        """Add every (key, value) pair in an iterable"""
+        if self._size:
+            for key, value in pairs:
+                self.add(key, value)
+            return
+
+        # When the list is empty the pairs are sorted in one go and cut into
+        # chunks. The sort is stable, so equal keys keep the order they came
+        # in, the same as adding them one at a time.
+        pairs = sorted(pairs, key=itemgetter(0))
+        for start in range(0, len(pairs), self.CHUNK_SIZE):
+            chunk = pairs[start : start + self.CHUNK_SIZE]
+            self._keys.append([key for key, _ in chunk])
+            self._values.append([value for _, value in chunk])
+            self._maxes.append(chunk[-1][0])
+        self._size = len(pairs)
+        self._offsets = None
+
+    def clear(self):
+        """Remove every value"""
+        self._keys = []
+        self._values = []
+        self._maxes = []
+        self._size = 0
+        self._offsets = None
+
+    def rank(self, key):
+        """Number of values with a key less than the given key"""
+        chunk_index = bisect_left(self._maxes, key)
+        if chunk_index == len(self._maxes):
+            return self._size
+        return self._get_offsets()[chunk_index] + bisect_left(
+            self._keys[chunk_index], key
+        )
+
+    def irange(self, minimum, maximum):
+        """Iterate in key order over the values with a key between minimum
+        and maximum, both included"""
+        chunk_index = bisect_left(self._maxes, minimum)
+        if chunk_index == len(self._maxes):
+            return
+        position = bisect_left(self._keys[chunk_index], minimum)
+        for keys, values in zip(
+            self._keys[chunk_index:], self._values[chunk_index:]
+        ):
+            # Everything in a chunk is in range if its last key is.
+            if keys[-1] <= maximum:
+                yield from values[position:]
+            else:
+                end = bisect_right(keys, maximum, position)
+                yield from values[position:end]
+                return
+            position = 0
+
+    def _split_chunk(self, chunk_index):
+        """Split a chunk that has grown too big into two halves"""
+        keys = self._keys[chunk_index]
+        values = self._values[chunk_index]
+        half = len(keys) // 2
+        self._keys[chunk_index : chunk_index + 1] = [keys[:half], keys[half:]]
+        self._values[chunk_index : chunk_index + 1] = [values[:half], values[half:]]
+        self._maxes[chunk_index : chunk_index + 1] = [keys[half - 1], keys[-1]]
+
+    def _get_offsets(self):
+        """Get the number of values before each chunk"""
+        if self._offsets is None:
+            self._offsets = [0]
+            self._offsets.extend(
+                accumulate(len(chunk) for chunk in self._values[:-1])
+            )
+        return self._offsets
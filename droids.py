@@ -5,27 +5,80 @@
 # 6-4-2023
 
 # System Imports
+import heapq
 import os
 from abc import ABC, abstractmethod
+from array import array
+from operator import attrgetter
 
 # First-party Imports
 from abstract_droid import AbstractDroid
-from datastructures import Stack, Queue
+from catalog import get_catalog
+from datastructures import SortedList
 from mergesort import MergeSort
 
+# Number of characters rendered before DroidCollection.write_to writes them.
+WRITE_BUFFER_SIZE = 64 * 1024
+
+# Number of droids on a page when no page size is given.
+DEFAULT_PAGE_SIZE = 20
+
+
+def _pricing_property(attribute, doc):
+    """Build a property for an attribute that the total cost depends on.
+    Setting the property marks the cached total cost of the droid as stale."""
+
+    def set_value(droid, value):
+        setattr(droid, attribute, value)
+        droid.invalidate_total_cost()
+
+    return property(attrgetter(attribute), set_value, doc=doc)
+
 
 class Droid(AbstractDroid, ABC):
     """Base Droid class. Also abstract as it does not make sense to allow it
     to be instantiated."""
 
-    MODEL_COST = 0
     model_name = "Droid"
+    model_code = None
+
+    # Use fixed attribute slots instead of a per-instance __dict__. This
+    # makes each droid smaller and faster to create. Every child class lists
+    # only the attributes that it adds.
+    __slots__ = ("_material", "_color", "_total_cost", "_cost_is_stale")
 
     def __init__(self, material, color, *args, **kwargs):
         """Constructor"""
         super().__init__(*args, **kwargs)
         self._material = material
         self._color = color
+        # Nothing has been priced yet. Set once here rather than tracking each
+        # attribute the constructors assign.
+        self._cost_is_stale = True
+
+    material = _pricing_property("_material", "Material of the droid")
+    color = _pricing_property("_color", "Color of the droid")
+
+    @property
+    def total_cost(self):
+        """Total cost of the droid. Calculated the first time it is needed
+        and then cached until one of the pricing attributes changes."""
+        if self._cost_is_stale:
+            self.calculate_total_cost()
+        return self._total_cost
+
+    @total_cost.setter
+    def total_cost(self, value):
+        """Set the total cost. The value is kept, rather than calculated
+        again, until one of the pricing attributes changes."""
+        self._total_cost = value
+        self._cost_is_stale = False
+
+    def cache_total_cost(self, total_cost):
+        """Store an already calculated total cost so that it does not need
+        to be calculated again"""
+        self._total_cost = total_cost
+        self._cost_is_stale = False
 
     def __str__(self):
         """String method"""
@@ -48,6 +101,10 @@ class Droid(AbstractDroid, ABC):
         QUADRANIUM = "Quadranium"
         TEARS_OF_A_JEDI = "Tears Of A Jedi"
 
+        # All materials in code order. The index of a material in this tuple
+        # is the code used to store it in compact records.
+        ALL = (CARBONITE, VANADIUM, QUADRANIUM, TEARS_OF_A_JEDI)
+
     class Colors:
         """Storage of color constants"""
 
@@ -59,51 +116,68 @@ class Droid(AbstractDroid, ABC):
         GREEN = "Green"
         BLUE = "Blue"
 
-    @abstractmethod
+        # All colors in code order. The index of a color in this tuple is the
+        # code used to store it in compact records.
+        ALL = (WHITE, RED, GREEN, BLUE)
+
+    class Options:
+        """Storage of option bit flag constants used in compact records"""
+
+        def __new__(cls):
+            raise TypeError("Can not make instance of Options class")
+
+        TOOLBOX = 1
+        COMPUTER_CONNECTION = 2
+        SCANNER = 4
+        BROOM = 8
+        VACUUM = 16
+        NAVIGATION = 32
+
     def calculate_total_cost(self):
         """Calculate the total cost and store it in the total_cost attribute"""
-        self.total_cost = (
-            self.MODEL_COST + self._get_material_cost() + self._get_color_cost()
-        )
+        # The prices come from the pricing catalog, which has already worked
+        # out the cost of every combination of model, material, color and
+        # options. Looking the droid up there is all that is needed.
+        _, material_code, color_code, option_bits, count = self.to_record()
+        price = get_catalog().pricing_functions[self.model_code]
+        self.cache_total_cost(price(material_code, color_code, option_bits, count))
+
+    def invalidate_total_cost(self):
+        """Throw away the cached total cost so that it is calculated again the
+        next time it is read, such as after the prices change"""
+        self._cost_is_stale = True
 
     @abstractmethod
     def _droid_info_str(self):
         """Returns subclass specific attributes as a string"""
         raise NotImplementedError()
 
-    def _get_material_cost(self):
-        """Get the material cost based on value of instance's material"""
-        material_cost = 50.00
-
-        if self._material == self.Materials.CARBONITE:
-            material_cost = 100.00
-        elif self._material == self.Materials.VANADIUM:
-            material_cost = 120.00
-        elif self._material == self.Materials.QUADRANIUM:
-            material_cost = 150.00
-        elif self._material == self.Materials.TEARS_OF_A_JEDI:
-            material_cost = 200.00
-        else:
-            raise ValueError("Unknown material type.")
-
-        return material_cost
-
-    def _get_color_cost(self):
-        """Get the color cost based on value of instance's color"""
-        color_cost = 5.00
-
-        if self._color == self.Colors.WHITE:
-            color_cost = 10.00
-        elif self._color == self.Colors.RED:
-            color_cost = 20.00
-        elif self._color == self.Colors.GREEN:
-            color_cost = 40.00
-        elif self._color == self.Colors.BLUE:
-            color_cost = 50.00
-        else:
-            raise ValueError("Unknown color")
-
-        return color_cost
+    def to_record(self):
+        """Return the droid as a compact record tuple of
+        (model code, material code, color code, option bits, count)"""
+        try:
+            material_code = MATERIAL_CODES[self._material]
+        except KeyError as err:
+            raise ValueError("Unknown material type.") from err
+        try:
+            color_code = COLOR_CODES[self._color]
+        except KeyError as err:
+            raise ValueError("Unknown color") from err
+        return (
+            self.model_code,
+            material_code,
+            color_code,
+            self._get_option_bits(),
+            self._get_record_count(),
+        )
+
+    def _get_option_bits(self):
+        """Return the droid options packed into bit flags"""
+        return 0
+
+    def _get_record_count(self):
+        """Return the count stored in the record (languages or ships)"""
+        return 0
 
     # Rich comparison methods. Required if we want to be able to compare
     # one droid with another.
@@ -129,9 +203,14 @@ class Droid(AbstractDroid, ABC):
 class ProtocolDroid(Droid):
     """Represent a Protocol Droid"""
 
-    MODEL_COST = 120.00
-    COST_PER_LANGUAGE = 25.00
     model_name = "Protocol"
+    model_code = 0
+
+    __slots__ = ("_number_of_languages",)
+
+    number_of_languages = _pricing_property(
+        "_number_of_languages", "Number of languages the droid speaks"
+    )
 
     def __init__(self, material, color, number_of_languages):
         """Constructor"""
@@ -140,26 +219,38 @@ class ProtocolDroid(Droid):
         # Set the number of languages
         self._number_of_languages = number_of_languages
 
+    @classmethod
+    def from_record(cls, record):
+        """Create a droid from a compact record tuple"""
+        _, material_code, color_code, _, number_of_languages = record
+        return cls(
+            Droid.Materials.ALL[material_code],
+            Droid.Colors.ALL[color_code],
+            number_of_languages,
+        )
+
+    def _get_record_count(self):
+        """Return the number of languages. Overrides parent."""
+        return self._number_of_languages
+
     def _droid_info_str(self):
         """Return droid specific attributes as a string. Overrides parent."""
         return f"Number of Languages: {self._number_of_languages}{os.linesep}"
 
-    def _calculate_language_cost(self):
-        """Calculate and return the cost of languages"""
-        return self._number_of_languages * self.COST_PER_LANGUAGE
-
-    def calculate_total_cost(self):
-        """Calculate the total cost and store it in the total_cost attribute"""
-        super().calculate_total_cost()
-        self.total_cost += self._calculate_language_cost()
-
 
 class UtilityDroid(Droid):
     """Represents a Utility Droid"""
 
-    MODEL_COST = 130.00
-    COST_PER_OPTION = 35.00
     model_name = "Utility"
+    model_code = 1
+
+    __slots__ = ("_has_toolbox", "_has_computer_connection", "_has_scanner")
+
+    has_toolbox = _pricing_property("_has_toolbox", "Whether it has a toolbox")
+    has_computer_connection = _pricing_property(
+        "_has_computer_connection", "Whether it has a computer connection"
+    )
+    has_scanner = _pricing_property("_has_scanner", "Whether it has a scanner")
 
     def __init__(
         self, material, color, has_toolbox, has_computer_connection, has_scanner
@@ -172,38 +263,50 @@ class UtilityDroid(Droid):
         self._has_computer_connection = has_computer_connection
         self._has_scanner = has_scanner
 
-    def _droid_info_str(self):
-        """Return droid specific attributes as a string. Overrides parent."""
-        return (
-            f"Has Tool Box: {self._has_toolbox}{os.linesep}"
-            f"Has Computer Connection: {self._has_computer_connection}{os.linesep}"
-            f"Has Scanner: {self._has_scanner}{os.linesep}"
+    @classmethod
+    def from_record(cls, record):
+        """Create a droid from a compact record tuple"""
+        _, material_code, color_code, options, _ = record
+        return cls(
+            Droid.Materials.ALL[material_code],
+            Droid.Colors.ALL[color_code],
+            bool(options & Droid.Options.TOOLBOX),
+            bool(options & Droid.Options.COMPUTER_CONNECTION),
+            bool(options & Droid.Options.SCANNER),
         )
 
-    def _calculate_options_cost(self):
-        """Calculate and return the cost of options selected for the droid"""
-        options_cost = 0
+    def _get_option_bits(self):
+        """Return the droid options packed into bit flags. Overrides parent."""
+        option_bits = 0
 
         if self._has_toolbox:
-            options_cost += self.COST_PER_OPTION
+            option_bits |= self.Options.TOOLBOX
         if self._has_computer_connection:
-            options_cost += self.COST_PER_OPTION
+            option_bits |= self.Options.COMPUTER_CONNECTION
         if self._has_scanner:
-            options_cost += self.COST_PER_OPTION
+            option_bits |= self.Options.SCANNER
 
-        return options_cost
+        return option_bits
 
-    def calculate_total_cost(self):
-        """Calculate the total cost and store it in the total_cost attribute"""
-        super().calculate_total_cost()
-        self.total_cost += self._calculate_options_cost()
+    def _droid_info_str(self):
+        """Return droid specific attributes as a string. Overrides parent."""
+        return (
+            f"Has Tool Box: {self._has_toolbox}{os.linesep}"
+            f"Has Computer Connection: {self._has_computer_connection}{os.linesep}"
+            f"Has Scanner: {self._has_scanner}{os.linesep}"
+        )
 
 
 class JanitorDroid(UtilityDroid):
     """Represents a Janitor Droid"""
 
-    MODEL_COST = 160.00
     model_name = "Janitor"
+    model_code = 2
+
+    __slots__ = ("_has_broom", "_has_vacuum")
+
+    has_broom = _pricing_property("_has_broom", "Whether it has a broom")
+    has_vacuum = _pricing_property("_has_vacuum", "Whether it has a vacuum")
 
     def __init__(
         self,
@@ -224,6 +327,31 @@ class JanitorDroid(UtilityDroid):
         self._has_broom = has_broom
         self._has_vacuum = has_vacuum
 
+    @classmethod
+    def from_record(cls, record):
+        """Create a droid from a compact record tuple"""
+        _, material_code, color_code, options, _ = record
+        return cls(
+            Droid.Materials.ALL[material_code],
+            Droid.Colors.ALL[color_code],
+            bool(options & Droid.Options.TOOLBOX),
+            bool(options & Droid.Options.COMPUTER_CONNECTION),
+            bool(options & Droid.Options.SCANNER),
+            bool(options & Droid.Options.BROOM),
+            bool(options & Droid.Options.VACUUM),
+        )
+
+    def _get_option_bits(self):
+        """Return the droid options packed into bit flags. Overrides parent."""
+        option_bits = super()._get_option_bits()
+
+        if self._has_broom:
+            option_bits |= self.Options.BROOM
+        if self._has_vacuum:
+            option_bits |= self.Options.VACUUM
+
+        return option_bits
+
     def _droid_info_str(self):
         """Return droid specific attributes as a string. Overrides parent."""
         return (
@@ -232,24 +360,21 @@ class JanitorDroid(UtilityDroid):
             f"Has Vacuum: {self._has_vacuum}{os.linesep}"
         )
 
-    def _calculate_options_cost(self):
-        """Calculate and return the cost of options selected for the droid"""
-        options_cost = super()._calculate_options_cost()
-
-        if self._has_broom:
-            options_cost += self.COST_PER_OPTION
-        if self._has_vacuum:
-            options_cost += self.COST_PER_OPTION
-
-        return options_cost
-
 
 class AstromechDroid(UtilityDroid):
     """Represents a Astromech Droid"""
 
-    MODEL_COST = 200.00
-    COST_PER_SHIP = 45.00
     model_name = "Astromech"
+    model_code = 3
+
+    __slots__ = ("_has_navigation", "_number_of_ships")
+
+    has_navigation = _pricing_property(
+        "_has_navigation", "Whether it has a navigation system"
+    )
+    number_of_ships = _pricing_property(
+        "_number_of_ships", "Number of ships the droid can navigate"
+    )
 
     def __init__(
         self,
@@ -270,6 +395,33 @@ class AstromechDroid(UtilityDroid):
         self._has_navigation = has_navigation
         self._number_of_ships = number_of_ships
 
+    @classmethod
+    def from_record(cls, record):
+        """Create a droid from a compact record tuple"""
+        _, material_code, color_code, options, number_of_ships = record
+        return cls(
+            Droid.Materials.ALL[material_code],
+            Droid.Colors.ALL[color_code],
+            bool(options & Droid.Options.TOOLBOX),
+            bool(options & Droid.Options.COMPUTER_CONNECTION),
+            bool(options & Droid.Options.SCANNER),
+            bool(options & Droid.Options.NAVIGATION),
+            number_of_ships,
+        )
+
+    def _get_option_bits(self):
+        """Return the droid options packed into bit flags. Overrides parent."""
+        option_bits = super()._get_option_bits()
+
+        if self._has_navigation:
+            option_bits |= self.Options.NAVIGATION
+
+        return option_bits
+
+    def _get_record_count(self):
+        """Return the number of ships. Overrides parent."""
+        return self._number_of_ships
+
     def _droid_info_str(self):
         """Return droid specific attributes as a string. Overrides parent."""
         return (
@@ -278,41 +430,158 @@ class AstromechDroid(UtilityDroid):
             f"Number Of Ships: {self._number_of_ships}{os.linesep}"
         )
 
-    def _calculate_options_cost(self):
-        """Calculate and return the cost of options selected for the droid"""
-        options_cost = super()._calculate_options_cost()
 
-        if self._has_navigation:
-            options_cost += self.COST_PER_OPTION
+# Lookup tables used to convert between droids and compact records.
+MATERIAL_CODES = {material: code for code, material in enumerate(Droid.Materials.ALL)}
+COLOR_CODES = {color: code for code, color in enumerate(Droid.Colors.ALL)}
+# Droid classes indexed by their model code.
+MODEL_CLASSES = (ProtocolDroid, UtilityDroid, JanitorDroid, AstromechDroid)
+# Array type codes for each field of a compact record when stored as columns.
+RECORD_COLUMN_TYPES = ("B", "B", "B", "B", "I")
+# Largest count (languages or ships) that fits in a compact record column.
+MAX_RECORD_COUNT = 2**32 - 1
+# Model codes keyed by model name.
+MODEL_CODES = {
+    model_class.model_name: model_class.model_code for model_class in MODEL_CLASSES
+}
+# Option bit flags that each model has, by model code. Building a droid from
+# a record ignores any other bits, so to_record never has them.
+MODEL_OPTION_MASKS = tuple(
+    model_class.from_record((model_code, 0, 0, 0xFF, 0)).to_record()[3]
+    for model_code, model_class in enumerate(MODEL_CLASSES)
+)
+# Whether each model keeps a count (languages or ships) in its records, by
+# model code. The count of every other model is always zero.
+MODEL_HAS_COUNT = tuple(
+    model_class.from_record((model_code, 0, 0, 0, 1)).to_record()[4] == 1
+    for model_code, model_class in enumerate(MODEL_CLASSES)
+)
+# Model codes in the order that sort_into_categories places them.
+CATEGORY_ORDER = (
+    AstromechDroid.model_code,
+    JanitorDroid.model_code,
+    UtilityDroid.model_code,
+    ProtocolDroid.model_code,
+)
+
+
+def droid_from_record(record):
+    """Create the correct type of droid from a compact record tuple"""
+    return MODEL_CLASSES[record[0]].from_record(record)
+
+
+def cheapest_droids(droids, count):
+    """Return a list of the count cheapest droids from an iterable of droids,
+    cheapest first.
+
+    Only a heap of count droids is kept while the droids are read, so any
+    iterator can be passed in and it takes O(n log count) time. Droids with
+    the same total cost keep the order they were read in, which matches the
+    start of the list that sort_by_total_cost would give."""
+    return heapq.nsmallest(count, droids, key=attrgetter("total_cost"))
+
+
+def most_expensive_droids(droids, count):
+    """Return a list of the count most expensive droids from an iterable of
+    droids, most expensive first. Droids with the same total cost keep the
+    order they were read in. See cheapest_droids."""
+    return heapq.nlargest(count, droids, key=attrgetter("total_cost"))
+
+
+def render_droids(droids):
+    """Yield the printed form of each droid in an iterable of droids, one
+    droid at a time"""
+    # Form the string for each droid. The total cost of the droid is
+    # calculated the first time it is read and cached after that, so
+    # rendering an unchanged droid again does not redo any pricing.
+    for droid in droids:
+        yield (
+            f"****************************{os.linesep}"
+            f"{str(droid)}{os.linesep}"
+            f"****************************{os.linesep}"
+            f"{os.linesep}"
+        )
 
-        return options_cost
 
-    def _calculate_ships_cost(self):
-        """Calculate and return the cost of ships"""
-        return self.COST_PER_SHIP * self._number_of_ships
+def write_droids(file, droids, buffer_size=WRITE_BUFFER_SIZE):
+    """Write the printed form of an iterable of droids to a file like object.
 
-    def calculate_total_cost(self):
-        """Calculate the total cost and store it in the total_cost attribute"""
-        super().calculate_total_cost()
-        self.total_cost += self._calculate_ships_cost()
+    Droids are rendered one at a time and written in chunks of roughly
+    buffer_size characters, so the whole listing is never held in memory as
+    a single string."""
+    chunk = []
+    chunk_size = 0
+    for block in render_droids(droids):
+        chunk.append(block)
+        chunk_size += len(block)
+        # Once the chunk is big enough, write it out and start a new one.
+        if chunk_size >= buffer_size:
+            file.write("".join(chunk))
+            chunk = []
+            chunk_size = 0
+    # Write out whatever is left over.
+    if chunk:
+        file.write("".join(chunk))
+
+
+def check_window(offset, count):
+    """Make sure a window of droids is valid"""
+    if offset < 0:
+        raise ValueError("Offset can not be negative")
+    if count < 0:
+        raise ValueError("Count can not be negative")
 
 
 class DroidCollection:
     """Stores droids that have been created"""
 
+    # Whether a large collection sorts by total cost quicker by handing its
+    # droids to worker processes than by sorting them here. Pricing droid
+    # objects one at a time is slow enough that it does. See parallel_sort.
+    parallel_sort_helps = True
+
     def __init__(self):
         """Constructor"""
         self._collection = []
+        # One list of droids per model code, kept up to date as droids are
+        # added. Each list holds its droids in the same relative order as
+        # the collection. Set to None when a sort shuffles the collection,
+        # and rebuilt the next time it is needed.
+        self._categories = [[] for _ in MODEL_CLASSES]
+        # Secondary indexes used by query. Created by enable_indexes.
+        self._index = None
+        # Droids in index row id order, so a row id can be turned back into
+        # its droid.
+        self._indexed_droids = []
+        self._init_cost_index()
+        self._init_aggregates()
+        # Number of changes made to the droids or their order. Comparing it
+        # before and after tells whether anything changed, such as when
+        # deciding whether a snapshot needs to be saved again.
+        self.version = 0
+
+    def _init_cost_index(self):
+        """Set up the state of the cost index. See enable_cost_index."""
+        # Whether a cost index is being kept.
+        self._keep_cost_index = False
+        # Droids keyed by total cost. None until it is first used, and set
+        # back to None when the collection is shuffled in a way that changes
+        # the order droids with the same cost would sort in.
+        self._cost_index = None
+        # Number of droids at the start of the current order that are in the
+        # cost index. Droids are only ever added on the end, so everything
+        # after this still needs adding.
+        self._cost_indexed_size = 0
 
     def add_protocol(self, material, color, number_of_languages):
         """Add protocol droid to internal collection"""
-        self._collection.append(
+        self._add_droid(
             ProtocolDroid(material, color, number_of_languages),
         )
 
     def add_utility(self, material, color, toolbox, computer_connection, scanner):
         """Add Utility droid to internal collection"""
-        self._collection.append(
+        self._add_droid(
             UtilityDroid(material, color, toolbox, computer_connection, scanner)
         )
 
@@ -320,7 +589,7 @@ class DroidCollection:
         self, material, color, toolbox, computer_connection, scanner, broom, vacuum
     ):
         """Add Janitor droid to internal collection"""
-        self._collection.append(
+        self._add_droid(
             JanitorDroid(
                 material,
                 color,
@@ -343,7 +612,7 @@ class DroidCollection:
         number_of_ships,
     ):
         """Add Astromech droid to internal collection"""
-        self._collection.append(
+        self._add_droid(
             AstromechDroid(
                 material,
                 color,
@@ -355,137 +624,424 @@ class DroidCollection:
             )
         )
 
+    def _init_aggregates(self):
+        """Set up the state of the running aggregates. See enable_aggregates."""
+        # Running cost totals used by group_by. Created by enable_aggregates.
+        self._aggregates = None
+
+    def add_record(self, record):
+        """Add a droid in compact record form to internal collection"""
+        self._add_droid(droid_from_record(record))
+
+    def add_records(self, records):
+        """Add a batch of droids in compact record form to internal collection"""
+        droids = [droid_from_record(record) for record in records]
+        self._collection.extend(droids)
+        self.version += 1
+        if self._categories is not None:
+            for droid in droids:
+                self._categories[droid.model_code].append(droid)
+        if self._index is not None:
+            for droid in droids:
+                self._index_droid(droid)
+        if self._aggregates is not None:
+            for droid in droids:
+                self._aggregate_droid(droid)
+
+    def _add_droid(self, droid):
+        """Add a droid to the end of the collection and its category"""
+        self._collection.append(droid)
+        self.version += 1
+        if self._categories is not None:
+            self._categories[droid.model_code].append(droid)
+        if self._index is not None:
+            self._index_droid(droid)
+        if self._aggregates is not None:
+            self._aggregate_droid(droid)
+
+    def enable_indexes(self):
+        """Start keeping secondary indexes on the model, material, color and
+        options of the droids. Called automatically by the first query.
+
+        NOTE: Droids are indexed as they are added. Changing the attributes
+        of a droid already in the collection is not seen by the indexes."""
+        if self._index is None:
+            # Imported here so the indexes, and the regular expression engine
+            # they use, are only loaded by programs that query.
+            from indexes import DroidIndex  # pylint:disable=import-outside-toplevel
+
+            self._index = DroidIndex()
+            self._index_all()
+
+    def query(self, model=None, material=None, color=None, options=0):
+        """Return a list of the droids matching every condition given.
+
+        model can be a droid class or a model name, material and color are
+        values from Droid.Materials and Droid.Colors, and options is a mask
+        of Droid.Options flags that must all be set. Droids are returned in
+        the order they were indexed."""
+        row_ids = self._get_index().row_ids(
+            **self._query_conditions(model, material, color, options)
+        )
+        return self._droids_for_rows(row_ids)
+
+    def count_matching(self, model=None, material=None, color=None, options=0):
+        """Count the droids matching every condition given. See query."""
+        return self._get_index().count(
+            **self._query_conditions(model, material, color, options)
+        )
+
+    def _get_index(self):
+        """Get the secondary indexes, creating them on first use"""
+        self.enable_indexes()
+        return self._index
+
+    def _index_all(self):
+        """Add every droid already in the collection to the indexes"""
+        for droid in self._collection:
+            self._index_droid(droid)
+
+    def _index_droid(self, droid):
+        """Add a droid to the indexes"""
+        self._index.add(droid.to_record())
+        self._indexed_droids.append(droid)
+
+    def _droids_for_rows(self, row_ids):
+        """Turn index row ids into droids"""
+        return [self._indexed_droids[row_id] for row_id in row_ids]
+
+    def _query_conditions(self, model, material, color, options):
+        """Convert query arguments into record codes for the indexes"""
+        conditions = {"options": options}
+        if model is not None:
+            if isinstance(model, str):
+                if model not in MODEL_CODES:
+                    raise ValueError(f"Unknown model {model}")
+                conditions["model"] = MODEL_CODES[model]
+            else:
+                conditions["model"] = model.model_code
+        # The codes are looked up in dictionaries, so anything that is not a
+        # string is turned away before it can raise an unhashable TypeError.
+        if material is not None:
+            if not isinstance(material, str) or material not in MATERIAL_CODES:
+                raise ValueError("Unknown material type.")
+            conditions["material"] = MATERIAL_CODES[material]
+        if color is not None:
+            if not isinstance(color, str) or color not in COLOR_CODES:
+                raise ValueError("Unknown color")
+            conditions["color"] = COLOR_CODES[color]
+        return conditions
+
+    def enable_aggregates(self):
+        """Start keeping running totals of the cost of the droids for every
+        combination of model, material and color. Called automatically by
+        group_by and cost_summary.
+
+        NOTE: Droids are added to the totals as they are added to the
+        collection. Changing the attributes of a droid already in the
+        collection is not seen by the totals."""
+        if self._aggregates is None:
+            # Imported here as the aggregates module imports this one.
+            # pylint:disable=import-outside-toplevel,cyclic-import
+            from aggregates import CostAggregates
+
+            self._aggregates = CostAggregates()
+            self._aggregate_all()
+
+    def group_by(self, *dimensions):
+        """Return a dictionary of CostSummary objects, holding the count,
+        total, minimum, maximum and mean total cost of each group of droids.
+
+        dimensions are any of "model", "material" and "color". Each key is a
+        tuple of the model name, material and color of the group, in the
+        order the dimensions were given. Answered from the running totals,
+        so it does not scan the collection."""
+        return self._get_aggregates().group_by(*dimensions)
+
+    def cost_summary(self):
+        """Return a CostSummary of every droid in the collection"""
+        return self._get_aggregates().summary()
+
+    def _get_aggregates(self):
+        """Get the running totals, creating them if needed"""
+        self.enable_aggregates()
+        return self._aggregates
+
+    def _aggregate_all(self):
+        """Add every droid to the running totals"""
+        for droid in self._collection:
+            self._aggregate_droid(droid)
+
+    def _aggregate_droid(self, droid):
+        """Add a droid to the running totals"""
+        model_code, material_code, color_code = droid.to_record()[:3]
+        self._aggregates.add(model_code, material_code, color_code, droid.total_cost)
+
+    def reprice(self, change):
+        """Recalculate the total cost of only the droids whose price changed
+        when the pricing catalog was replaced. change is the CatalogChange
+        returned when the catalog was set or reloaded. Returns the number of
+        droids affected."""
+        affected = 0
+        for droid in self._collection:
+            if change.affects(droid.to_record()):
+                # Priced again the next time the total cost is read.
+                droid.invalidate_total_cost()
+                affected += 1
+        if affected:
+            self._discard_cost_views()
+            self.version += 1
+        return affected
+
+    def _discard_cost_views(self):
+        """Throw away everything built from the old total costs, so it is
+        built again from the new ones the next time it is used"""
+        self._cost_index = None
+        if self._aggregates is not None:
+            self._init_aggregates()
+            self.enable_aggregates()
+
+    def enable_cost_index(self):
+        """Start keeping the droids in an index ordered by total cost. Called
+        automatically by iter_by_cost, in_cost_range, cost_rank and
+        droid_at_cost_rank.
+
+        The index is built the first time it is used. After that, droids
+        added to the collection are inserted into it the next time it is
+        used. Each insert takes about logarithmic time. sort_by_total_cost
+        then reads the order straight out of the index and does not sort.
+
+        NOTE: Changing the attributes of a droid already in the collection is
+        not seen by the cost index."""
+        self._keep_cost_index = True
+
+    def iter_by_cost(self):
+        """Iterate over the droids from cheapest to most expensive without
+        changing the order of the collection. Droids with the same total
+        cost come out in the order sort_by_total_cost would put them in."""
+        for entry in self._get_cost_index():
+            yield self._droid_for_entry(entry)
+
+    def in_cost_range(self, minimum, maximum):
+        """Return a list of the droids with a total cost between minimum and
+        maximum, both included, from cheapest to most expensive"""
+        return [
+            self._droid_for_entry(entry)
+            for entry in self._get_cost_index().irange(minimum, maximum)
+        ]
+
+    def cost_rank(self, total_cost):
+        """Return the number of droids that cost less than total_cost"""
+        return self._get_cost_index().rank(total_cost)
+
+    def droid_at_cost_rank(self, rank):
+        """Return the droid at a position in cheapest first order, so rank 0
+        is the cheapest droid and rank -1 the most expensive"""
+        return self._droid_for_entry(self._get_cost_index()[rank])
+
+    def _get_cost_index(self):
+        """Get the cost index, first building it or adding any droids that
+        are missing from it"""
+        self.enable_cost_index()
+        if self._cost_index is None:
+            self._cost_index = SortedList()
+            self._cost_indexed_size = 0
+        if self._cost_indexed_size < len(self):
+            # Droids are added in the order they sit in the collection, so
+            # droids with the same cost end up in the same relative order a
+            # stable sort of the collection would give them.
+            self._cost_index.update(self._cost_index_pairs(self._cost_indexed_size))
+            self._cost_indexed_size = len(self)
+        return self._cost_index
+
+    def _cost_index_pairs(self, start):
+        """Return a (total cost, entry) pair for each droid from position
+        start of the current order on"""
+        return [(droid.total_cost, droid) for droid in self._collection[start:]]
+
+    def _droid_for_entry(self, entry):
+        """Turn an entry of the cost index or of _get_entries back into its
+        droid"""
+        return entry
+
+    def _get_entries(self):
+        """Return the sequence of entries in the current order, and its
+        length. Used by snapshots.
+
+        The sequence is only ever added to or replaced by a new one, never
+        rearranged in place, so its first length entries stay the same for
+        good."""
+        entries = self._collection
+        return entries, len(entries)
+
+    def iter_records(self, include_costs=False):
+        """Yield each droid in its current order as a compact record tuple.
+        When include_costs is True the total cost is added onto the end of
+        each record."""
+        for droid in self:
+            if include_costs:
+                yield droid.to_record() + (droid.total_cost,)
+            else:
+                yield droid.to_record()
+
+    def record_columns(self):
+        """Return the droids in their current order as compact records split
+        into typed arrays, one per record field"""
+        columns = tuple(array(typecode) for typecode in RECORD_COLUMN_TYPES)
+        for record in self.iter_records():
+            for column, value in zip(columns, record):
+                column.append(value)
+        return columns
+
     def is_empty(self):
         """Whether the collection is empty or not"""
-        return len(self._collection) <= 0
+        return len(self) <= 0
+
+    def __len__(self):
+        """Number of droids in the collection"""
+        return len(self._collection)
+
+    def __iter__(self):
+        """Iterate over the droids in their current order"""
+        return iter(self._collection)
 
     def __str__(self):
         """String method"""
-
-        # Init the return string.
-        return_string = ""
-        # Loop through all droids and form the return string.
-        for droid in self._collection:
-            # Calculate the total cost of the droid. Since we are using inheritance
-            # an polymorphism, the program will automatically know which version
-            # of calculate_total_cost it needs to call based on which particular
-            # type it is looking at during the for loop.
-            droid.calculate_total_cost()
-            # Create the string now that the total cost has been calculated
-            return_string += f"****************************{os.linesep}"
-            return_string += f"{str(droid)}{os.linesep}"
-            return_string += f"****************************{os.linesep}"
-            return_string += f"{os.linesep}"
-        # Return completed string.
-        return return_string
+        # Join all of the rendered droid blocks in one go. Adding them onto
+        # a string one at a time would copy the string over and over.
+        return "".join(self.iter_rendered())
+
+    def iter_rendered(self):
+        """Yield the printed form of each droid, one droid at a time"""
+        return render_droids(self)
+
+    def write_to(self, file, buffer_size=WRITE_BUFFER_SIZE):
+        """Write the printed form of the collection to a file like object,
+        in chunks of roughly buffer_size characters. See write_droids."""
+        write_droids(file, self, buffer_size)
+
+    def export_to_file(self, path):
+        """Write the printed form of the collection to a file"""
+        # newline="" so the os.linesep line endings are written as is.
+        with open(path, "w", encoding="utf-8", newline="") as file:
+            self.write_to(file)
+
+    def iter_by_category(self):
+        """Iterate over the droids in categorical order without changing the
+        order of the collection. This is the order that sort_into_categories
+        puts the collection in."""
+        for model_code in CATEGORY_ORDER:
+            # Each category comes out newest first, the same as popping the
+            # droids off of a stack would.
+            yield from reversed(self._get_categories()[model_code])
 
     def sort_into_categories(self):
         """Sort the collection of droids by category"""
 
-        # Create a stack for each type of droid.
-        protocol_stack = Stack()
-        utility_stack = Stack()
-        janitor_stack = Stack()
-        astromech_stack = Stack()
-
-        # Create a queue to hold the droids as we pop them off the stacks
-        droid_queue = Queue()
-
-        # For each Droid in the droid collection
-        for droid in self._collection:
-            # The testing of the droids must occur in this order.
-            # It must be done in the order of most specific to least.
-
-            # If we were to test a droid that IS of type Astromech against
-            # Utility BEFORE we test against Astromech, it would pass and be put
-            # into the Utility stack and not the Astromech. That is why it is
-            # important to test from most specific to least.
-
-            # If the droid is an Astromech, push it on the astromech stack
-            if isinstance(droid, AstromechDroid):
-                astromech_stack.push(droid)
-            # Else if the droid is a Janitor droid, push it on the janitor stack.
-            elif isinstance(droid, JanitorDroid):
-                janitor_stack.push(droid)
-            # Check for Utility
-            elif isinstance(droid, UtilityDroid):
-                utility_stack.push(droid)
-            # Check for Protocol
-            elif isinstance(droid, ProtocolDroid):
-                protocol_stack.push(droid)
-            # Unknown type of droid
-            else:
-                raise TypeError("Unknown droid type.")
-
-        # Now that the droids are all in their respective stacks, we can do
-        # the work of popping them off of the stacks and adding them to the
-        # queue.
-        # It is required that they be popped off from each stack in this
-        # order so that they have the correct order going into the queue.
-
-        # This is a primer pop. It gest the first droid off the stack.
-        # Which could be None if the stack is empty.
-        current_astromech = astromech_stack.pop()
-        # While the droid that is popped off is not None
-        while current_astromech is not None:
-            # Add the popped droid to the queue
-            droid_queue.enqueue(current_astromech)
-            # Pop off the next droid for the loop test
-            current_astromech = astromech_stack.pop()
-
-        # See above lines for Astromech. It is the same except for Janitor
-        current_janitor = janitor_stack.pop()
-        while current_janitor is not None:
-            droid_queue.enqueue(current_janitor)
-            current_janitor = janitor_stack.pop()
-
-        # See above lines for Astromech. It is the same except for Utility
-        current_utility = utility_stack.pop()
-        while current_utility is not None:
-            droid_queue.enqueue(current_utility)
-            current_utility = utility_stack.pop()
-
-        # See above lines for Astromech. It is the same except for Protocol
-        current_protocol = protocol_stack.pop()
-        while current_protocol is not None:
-            droid_queue.enqueue(current_protocol)
-            current_protocol = protocol_stack.pop()
-
-        # Now that the droids have all been removed from the stacks and put
-        # into the queue, we need to dequeue them all and put them back into
-        # the original list
-
-        # Set a counter to 0
-        counter = 0
-
-        # This is primer dequeue that will get the first droid out of the
-        # queue.
-        droid = droid_queue.dequeue()
-        # While the dequeued droid is not None.
-        while droid is not None:
-            # Add the droid to the droid collection using the int counter
-            # as the index.
-            self._collection[counter] = droid
-            # Increment the counter
-            counter += 1
-            # Dequeue the next droid off the queue so it can be used in the
-            # while condition
-            droid = droid_queue.dequeue()
+        # The droids are already split up by category, so the sorted
+        # collection is just the categories joined together in this order:
+        # Astromech, Janitor, Utility, Protocol. Each category is reversed
+        # to put it in the last in, first out order of a stack.
+        categories = self._get_categories()
+        sorted_collection = []
+        for model_code in CATEGORY_ORDER:
+            category = categories[model_code]
+            category.reverse()
+            sorted_collection.extend(category)
+
+        # Every category was reversed in place, so they still match the
+        # relative order of the droids in the newly sorted collection.
+        self._collection = sorted_collection
+        self.version += 1
+        # Droids with the same cost are in a new relative order now, so the
+        # cost index has to be rebuilt before it is used again.
+        self._cost_index = None
+
+    def _get_categories(self):
+        """Get the droids split up by category, rebuilding the categories
+        with a single pass over the collection if a sort threw them out"""
+        if self._categories is None:
+            categories = [[] for _ in MODEL_CLASSES]
+            for droid in self._collection:
+                # The model code of the droid is the index of its category.
+                # No need to test the type of the droid one by one.
+                if droid.model_code is None:
+                    raise TypeError("Unknown droid type.")
+                categories[droid.model_code].append(droid)
+            self._categories = categories
+        return self._categories
 
     def sort_by_total_cost(self):
         """Sort the droids by the total cost using Merge Sort."""
 
+        self.version += 1
+
+        # When a cost index is kept, the sorted order is already in it.
+        if self._keep_cost_index:
+            self._collection = list(self._get_cost_index())
+            self._categories = None
+            return
+
         # Create a new merger sorter instance
         merge_sorter = MergeSort()
-        # Make sure that `calculate_total_cost` gets called on each droid
-        # before sorting. Otherwise, they will all be zero and the sort won't
-        # do anything.
-        for droid in self._collection:
-            droid.calculate_total_cost()
-
-        # Call the sort method on the MergeSort instance and pass it the
-        # list to sort.
-        merge_sorter.sort(self._collection)
+        # NOTE: There is no need to call `calculate_total_cost` on each droid
+        # first. Each droid calculates its total cost the first time it is
+        # compared and reuses the cached value after that.
+
+        # Call the sort method on the MergeSort instance and pass it a copy
+        # of the list to sort. Using the total cost as the key means each
+        # droid's cost is read once rather than on every comparison. Sorting
+        # a copy and swapping it in leaves the current list as it is for any
+        # snapshot reading it. See _get_entries.
+        sorted_collection = list(self._collection)
+        merge_sorter.sort(sorted_collection, key=attrgetter("total_cost"))
+        self._collection = sorted_collection
+
+        # The sort changed the relative order of the droids within each
+        # category, so the categories need to be rebuilt before next use.
+        self._categories = None
+
+    def window(self, offset, count):
+        """Return a list of up to count droids, starting at position offset
+        of the current order. Only these droids are priced. Passing offset
+        plus the number of droids returned as the next offset walks through
+        the whole collection a window at a time."""
+        check_window(offset, count)
+        return self._collection[offset : offset + count]
+
+    def page(self, number, page_size=DEFAULT_PAGE_SIZE):
+        """Return a list of the droids on a page of the current order. Pages
+        are numbered from 1."""
+        if number < 1:
+            raise ValueError("Page numbers start at 1")
+        return self.window((number - 1) * page_size, page_size)
+
+    def page_count(self, page_size=DEFAULT_PAGE_SIZE):
+        """Number of pages the collection fills. An empty collection still
+        has one empty page."""
+        if page_size < 1:
+            raise ValueError("Page size must be at least 1")
+        return max(1, -(-len(self) // page_size))
+
+    def cheapest(self, count):
+        """Return a list of the count cheapest droids, cheapest first,
+        without sorting or changing the order of the collection"""
+        return cheapest_droids(self, count)
+
+    def most_expensive(self, count):
+        """Return a list of the count most expensive droids, most expensive
+        first, without sorting or changing the order of the collection"""
+        return most_expensive_droids(self, count)
+
+    def reorder(self, positions):
+        """Rearrange the collection so that the droid at positions[i] of the
+        current order ends up at index i"""
+        collection = self._collection
+        self._collection = [collection[position] for position in positions]
+        self.version += 1
+        # The relative order within the categories may have changed.
+        self._categories = None
+        self._cost_index = None
 
     def load_default_droids(self):
         """Load some default droids into the collection so it is not empty"""
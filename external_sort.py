@@ -0,0 +1,167 @@
+"""External Sort module
+
+Sorts more droids by total cost than fit in memory. The droids are read in
+runs small enough to sort in memory with MergeSort, and each sorted run is
+spilled to a temporary file as fixed width snapshot records. The runs are
+then merged together, a buffer of records from each at a time, while the
+sorted droids are streamed out. When there are too many runs to merge at
+once, groups of them are merged into longer runs first.
+
+Like MergeSort, the sort is stable. Droids with the same total cost come out
+in the order they went in, so the result is exactly the same as
+sort_by_total_cost."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import heapq
+import os
+import tempfile
+from itertools import islice
+from operator import itemgetter
+
+# First-party Imports
+from catalog import get_catalog
+from mergesort import MergeSort
+from snapshot import CHUNK_RECORDS, RECORD_WITH_COST, SnapshotReader, save_records
+
+# Memory the sort aims to stay within when no budget is given, in bytes.
+DEFAULT_MEMORY_BUDGET = 256 * 1024 * 1024
+
+# Rough memory taken by each record of a run while it is being sorted, in
+# bytes. This is the record tuple and its total cost along with the lists
+# MergeSort sorts it with.
+RUN_BYTES_PER_RECORD = 224
+
+# Smallest read buffer worth giving each run during a merge, in bytes.
+MIN_MERGE_BUFFER = 64 * 1024
+# Most runs merged at once, to stay well clear of open file limits.
+MAX_MERGE_RUNS = 64
+
+# Key function that gets the total cost off the end of a record.
+get_total_cost = itemgetter(5)
+
+
+def sort_snapshot(
+    source_path, destination_path, memory_budget=DEFAULT_MEMORY_BUDGET, temp_dir=None
+):
+    """Sort a snapshot file by total cost into a new snapshot file, without
+    loading it into memory. Returns the number of droids sorted.
+
+    The source can be the same file as the destination. Every record has
+    been read by the time the sorted file replaces it, and the source is
+    closed first, as Windows will not replace a file that is memory mapped.
+    Temporary files are made in temp_dir, or the system temporary directory
+    when it is None."""
+    with SnapshotReader(source_path) as reader:
+        return save_records(
+            external_sort(reader.iter_records(), memory_budget, temp_dir),
+            destination_path,
+            before_replace=reader.close,
+        )
+
+
+def external_sort(records, memory_budget=DEFAULT_MEMORY_BUDGET, temp_dir=None):
+    """Yield an iterable of compact records sorted by total cost, each with
+    its total cost on the end. Records that do not already end with a total
+    cost are priced with the pricing catalog in use.
+
+    memory_budget is roughly how many bytes of memory the sort may use.
+    Nothing is written to disk when every record fits in a single run."""
+    run_size = max(1, memory_budget // RUN_BYTES_PER_RECORD)
+    # Give each run being merged an equal share of the budget as its read
+    # buffer, in whole records.
+    merge_runs = max(2, min(MAX_MERGE_RUNS, memory_budget // MIN_MERGE_BUFFER))
+    buffer_records = max(1, memory_budget // merge_runs // RECORD_WITH_COST.size)
+    price = get_catalog().price
+
+    records = iter(records)
+    with tempfile.TemporaryDirectory(prefix="droids-", dir=temp_dir) as directory:
+        run_paths = []
+        while True:
+            run = [
+                record if len(record) > 5 else record + (price(*record),)
+                for record in islice(records, run_size)
+            ]
+            if not run:
+                break
+            # A new MergeSort each time, so that the buffers it keeps do not
+            # hold on to the last run while the next one is read.
+            MergeSort().sort(run, key=get_total_cost)
+
+            # Everything fit in the first run. No need for any files.
+            if not run_paths and len(run) < run_size:
+                yield from run
+                return
+
+            run_paths.append(_spill_run(run, directory, len(run_paths)))
+            # Let go of this run before reading the next one.
+            run = None
+
+        # Merge groups of runs into longer runs until they can all be merged
+        # at once. Each group keeps its place, so the sort stays stable.
+        while len(run_paths) > merge_runs:
+            run_paths = [
+                _merge_into_run(
+                    run_paths[start : start + merge_runs],
+                    buffer_records,
+                    directory,
+                    f"merge-{start}-{len(run_paths)}",
+                )
+                for start in range(0, len(run_paths), merge_runs)
+            ]
+
+        yield from _merge_runs(run_paths, buffer_records)
+
+
+def _spill_run(run, directory, number):
+    """Write a sorted run to a temporary file and return its path"""
+    path = os.path.join(directory, f"run-{number}")
+    _write_run(run, path)
+    return path
+
+
+def _write_run(records, path):
+    """Write records to a run file as fixed width snapshot records"""
+    pack = RECORD_WITH_COST.pack
+    records = iter(records)
+    with open(path, "wb") as file:
+        while True:
+            chunk = b"".join(
+                pack(*record) for record in islice(records, CHUNK_RECORDS)
+            )
+            if not chunk:
+                break
+            file.write(chunk)
+
+
+def _merge_into_run(run_paths, buffer_records, directory, name):
+    """Merge runs into one longer run file, deleting the runs merged"""
+    path = os.path.join(directory, name)
+    _write_run(_merge_runs(run_paths, buffer_records), path)
+    for run_path in run_paths:
+        os.remove(run_path)
+    return path
+
+
+def _merge_runs(run_paths, buffer_records):
+    """Yield the records of sorted run files merged into one sorted stream"""
+    # heapq.merge takes from the earlier run when total costs tie, which
+    # keeps the merge stable like the two way merge in MergeSort.
+    return heapq.merge(
+        *(_read_run(path, buffer_records) for path in run_paths),
+        key=get_total_cost,
+    )
+
+
+def _read_run(path, buffer_records):
+    """Yield the records of a run file, reading buffer_records at a time"""
+    buffer_size = buffer_records * RECORD_WITH_COST.size
+    with open(path, "rb") as file:
+        while True:
+            chunk = file.read(buffer_size)
+            if not chunk:
+                break
+            yield from RECORD_WITH_COST.iter_unpack(chunk)
@@ -0,0 +1,138 @@
+"""Secondary Index module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import re
+
+# Fields of a compact droid record that are indexed, by position in the
+# record tuple.
+MODEL_FIELD = 0
+MATERIAL_FIELD = 1
+COLOR_FIELD = 2
+OPTIONS_FIELD = 3
+
+# Matches any byte of a bitmap that has at least one bit set.
+NON_ZERO_BYTE = re.compile(rb"[^\x00]")
+
+
+class Bitmap:
+    """Growable set of row ids stored as one bit per row"""
+
+    def __init__(self):
+        """Constructor"""
+        self._bytes = bytearray()
+
+    def add(self, row_id):
+        """Set the bit for a row id"""
+        byte_index = row_id >> 3
+        # Grow by at least double so adding rows one at a time stays cheap.
+        if byte_index >= len(self._bytes):
+            self._bytes.extend(bytes(max(byte_index + 1, 2 * len(self._bytes))))
+        self._bytes[byte_index] |= 1 << (row_id & 7)
+
+    def to_int(self):
+        """Return the bitmap as an int, with row id n as bit n"""
+        return int.from_bytes(self._bytes, "little")
+
+
+class DroidIndex:
+    """Bitmap indexes on the model, material, color and option flags of
+    compact droid records.
+
+    Each record added is given the next row id, starting at zero. Queries
+    AND the bitmaps for each condition together, so their cost depends on
+    the number of rows and not on how many rows match."""
+
+    def __init__(self):
+        """Constructor"""
+        self._size = 0
+        # Bitmap for every value seen, keyed by field then by value.
+        self._bitmaps = {
+            MODEL_FIELD: {},
+            MATERIAL_FIELD: {},
+            COLOR_FIELD: {},
+            OPTIONS_FIELD: {},
+        }
+
+    def __len__(self):
+        """Number of rows in the index"""
+        return self._size
+
+    def add(self, record):
+        """Index a record and return the row id given to it"""
+        row_id = self._size
+        self._size += 1
+
+        for field in (MODEL_FIELD, MATERIAL_FIELD, COLOR_FIELD):
+            self._get_bitmap(field, record[field]).add(row_id)
+
+        # Each option flag that is set gets its own bitmap.
+        options = record[OPTIONS_FIELD]
+        while options:
+            flag = options & -options
+            self._get_bitmap(OPTIONS_FIELD, flag).add(row_id)
+            options ^= flag
+
+        return row_id
+
+    def match(self, model=None, material=None, color=None, options=0):
+        """Return an int bitmap of the row ids matching every condition that
+        is not None. options is a mask of option flags that must all be set."""
+        result = (1 << self._size) - 1
+
+        conditions = [
+            (MODEL_FIELD, model),
+            (MATERIAL_FIELD, material),
+            (COLOR_FIELD, color),
+        ]
+        while options:
+            flag = options & -options
+            conditions.append((OPTIONS_FIELD, flag))
+            options ^= flag
+
+        for field, value in conditions:
+            if value is None:
+                continue
+            bitmap = self._bitmaps[field].get(value)
+            # Nothing has ever had this value, so nothing can match.
+            if bitmap is None:
+                return 0
+            result &= bitmap.to_int()
+            if not result:
+                return 0
+
+        return result
+
+    def count(self, **conditions):
+        """Count the rows matching the conditions. See match."""
+        return self.match(**conditions).bit_count()
+
+    def row_ids(self, **conditions):
+        """Return a list of the row ids matching the conditions, in
+        ascending order. See match."""
+        result = self.match(**conditions)
+        data = result.to_bytes((self._size + 7) >> 3, "little")
+
+        row_ids = []
+        # Jump straight to the bytes that have a bit set rather than checking
+        # every row one at a time.
+        for found in NON_ZERO_BYTE.finditer(data):
+            byte_index = found.start()
+            byte = data[byte_index]
+            base = byte_index << 3
+            while byte:
+                low_bit = byte & -byte
+                row_ids.append(base + low_bit.bit_length() - 1)
+                byte ^= low_bit
+        return row_ids
+
+    def _get_bitmap(self, field, value):
+        """Get the bitmap for a field value, creating it if needed"""
+        bitmaps = self._bitmaps[field]
+        bitmap = bitmaps.get(value)
+        if bitmap is None:
+            bitmap = bitmaps[value] = Bitmap()
+        return bitmap
@@ -0,0 +1,433 @@
+"""Instrumentation module
+
+Opt in counters and timings for the paths the program really runs:
+comparisons and moves made by MergeSort, the droids each sort puts in
+order, the droids priced, values and chunks added to the cost index, and how
+long each MergeSort sort and each main menu action takes. They can be
+written out as JSON or in the Prometheus text format.
+
+NOTE: The columnar backend sorts with the built in sorted, whose comparisons
+can not be counted from outside. Its sorts show up in the droids sorted and
+the menu action times, but not in the MergeSort counters.
+
+Nothing is counted until install is called. Installing swaps counting
+versions in for the methods being measured, the same way the startup
+profiler swaps in its own import function, and uninstalling puts the
+originals back. While it is not installed, the measured code runs exactly
+as it would without this module."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import math
+from bisect import bisect_left
+from contextlib import contextmanager
+from functools import wraps
+from operator import attrgetter
+from time import perf_counter
+
+# Prefix added to the name of every metric when exported.
+METRIC_PREFIX = "droids_"
+
+# Help text for each counter, by counter name.
+COUNTERS = {
+    "mergesort_merges_total": "Merges of two sorted runs made by MergeSort",
+    "mergesort_comparisons_total": "Comparisons made while merging in MergeSort",
+    "mergesort_moves_total": "Items copied while merging in MergeSort",
+    "cost_sort_droids_total": "Droids put in order by sorts by total cost",
+    "category_sort_droids_total": "Droids put in order by sorts into categories",
+    "droids_priced_total": "Droid total costs calculated",
+    "cost_index_inserts_total": "Droids added to the cost index",
+    "cost_index_chunks_total": "Chunks allocated by the cost index",
+}
+
+# Help text for each histogram, by histogram name.
+HISTOGRAMS = {
+    "mergesort_sort_seconds": "Time taken by each MergeSort sort",
+    "menu_action_seconds": "Time taken by each main menu action",
+}
+
+# Upper bounds of the histogram buckets, in seconds. Every histogram also
+# has a last bucket with no upper bound.
+BUCKET_BOUNDS = (0.001, 0.005, 0.01, 0.05, 0.1, 0.5, 1.0, 5.0, 10.0, 60.0)
+
+
+class Histogram:
+    """Counts of the values observed that fall in each bucket, along with
+    their count and total"""
+
+    def __init__(self, bounds=BUCKET_BOUNDS):
+        """Constructor"""
+        self.bounds = bounds
+        # One count per bound, plus the last bucket with no upper bound.
+        self.bucket_counts = [0] * (len(bounds) + 1)
+        self.count = 0
+        self.total = 0.0
+
+    def observe(self, value):
+        """Add a value to the histogram"""
+        self.bucket_counts[bisect_left(self.bounds, value)] += 1
+        self.count += 1
+        self.total += value
+
+    def cumulative_counts(self):
+        """Yield (upper bound, number of values at or below it) for every
+        bucket, ending with an upper bound of infinity"""
+        running = 0
+        for bound, bucket_count in zip(self.bounds + (math.inf,), self.bucket_counts):
+            running += bucket_count
+            yield bound, running
+
+
+class Instrumentation:
+    """Counters and histograms for the hot paths of the program"""
+
+    def __init__(self):
+        """Constructor"""
+        self.enabled = False
+        self.counters = dict.fromkeys(COUNTERS, 0)
+        # Histograms keyed by (histogram name, label name, label value).
+        self.histograms = {}
+        # (class, attribute name, original value) for every method replaced
+        # by install, so uninstall can put them back.
+        self._originals = []
+
+    def install(self):
+        """Start counting and timing"""
+        if self.enabled:
+            return
+        # Imported here so this module can be imported before the modules it
+        # measures, and as droids imports datastructures and mergesort.
+        # pylint:disable=import-outside-toplevel,protected-access
+        from columnar import ColumnarDroidCollection
+        from datastructures import SortedList
+        from droids import Droid, DroidCollection
+        from mergesort import MergeSort
+
+        counters = self.counters
+        self._replace(MergeSort, "sort", self._make_timed_sort)
+        self._replace(MergeSort, "_merge", _make_counted_merge(counters))
+        self._replace(
+            MergeSort, "_merge_runs", _make_counted_merge_runs(counters)
+        )
+
+        # Both backends sort in their own way, so both are counted.
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            self._replace(
+                collection_class,
+                "sort_by_total_cost",
+                _make_size_counter(counters, "cost_sort_droids_total"),
+            )
+            self._replace(
+                collection_class,
+                "sort_into_categories",
+                _make_size_counter(counters, "category_sort_droids_total"),
+            )
+
+        # Droid objects are priced one at a time, and the columnar backend
+        # prices the rows it has not priced yet in one batch.
+        self._replace(
+            Droid,
+            "calculate_total_cost",
+            _make_call_counter(counters, "droids_priced_total"),
+        )
+        self._replace(
+            ColumnarDroidCollection,
+            "_price_rows",
+            _make_growth_counter(
+                counters, "droids_priced_total", attrgetter("_priced_rows")
+            ),
+        )
+
+        # The cost index is a SortedList. update adds each pair with add once
+        # the list has values, so each is only counted by the outermost call.
+        count_inserts = _make_growth_counter(counters, "cost_index_inserts_total", len)
+        count_chunks = _make_growth_counter(
+            counters, "cost_index_chunks_total", lambda values: len(values._maxes)
+        )
+        for method_name in ("add", "update"):
+            self._replace(SortedList, method_name, count_inserts)
+            self._replace(SortedList, method_name, count_chunks)
+        self.enabled = True
+
+    def uninstall(self):
+        """Stop counting and timing. The values so far are kept."""
+        while self._originals:
+            owner, name, original = self._originals.pop()
+            setattr(owner, name, original)
+        self.enabled = False
+
+    def reset(self):
+        """Set every counter back to zero and empty every histogram"""
+        for name in self.counters:
+            self.counters[name] = 0
+        self.histograms.clear()
+
+    def observe(self, name, label, value, seconds):
+        """Add a time to a histogram, for one value of its label"""
+        key = (name, label, value)
+        histogram = self.histograms.get(key)
+        if histogram is None:
+            histogram = self.histograms[key] = Histogram()
+        histogram.observe(seconds)
+
+    @contextmanager
+    def timed(self, name, label, value):
+        """Context manager that adds the time taken by its body to a
+        histogram. Does nothing when not installed."""
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self.observe(name, label, value, perf_counter() - start)
+
+    def to_dict(self):
+        """Return every counter and histogram as a dictionary"""
+        histograms = {}
+        for (name, label, value), histogram in sorted(self.histograms.items()):
+            histograms.setdefault(name, []).append(
+                {
+                    "labels": {label: value},
+                    "count": histogram.count,
+                    "sum": histogram.total,
+                    "buckets": [
+                        {"le": _format_bound(bound), "count": count}
+                        for bound, count in histogram.cumulative_counts()
+                    ],
+                }
+            )
+        return {"counters": dict(self.counters), "histograms": histograms}
+
+    def to_json(self):
+        """Return every counter and histogram as JSON"""
+        # Imported here so start up does not pay for it when nothing is
+        # exported.
+        import json  # pylint:disable=import-outside-toplevel
+
+        return json.dumps(self.to_dict(), indent=2)
+
+    def to_prometheus(self):
+        """Return every counter and histogram in the Prometheus text
+        exposition format"""
+        lines = []
+        for name, help_text in COUNTERS.items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} counter")
+            lines.append(f"{metric} {self.counters[name]}")
+
+        for name, help_text in HISTOGRAMS.items():
+            metric = METRIC_PREFIX + name
+            lines.append(f"# HELP {metric} {help_text}")
+            lines.append(f"# TYPE {metric} histogram")
+            for (histogram_name, label, value), histogram in sorted(
+                self.histograms.items()
+            ):
+                if histogram_name != name:
+                    continue
+                labels = f'{label}="{value}"'
+                for bound, count in histogram.cumulative_counts():
+                    lines.append(
+                        f'{metric}_bucket{{{labels},le="{_format_bound(bound)}"}} '
+                        f"{count}"
+                    )
+                lines.append(f"{metric}_sum{{{labels}}} {histogram.total!r}")
+                lines.append(f"{metric}_count{{{labels}}} {histogram.count}")
+        return "\n".join(lines) + "\n"
+
+    def write(self, path, output_format="json"):
+        """Write every counter and histogram to a file as "json" or
+        "prometheus" text"""
+        if output_format == "prometheus":
+            text = self.to_prometheus()
+        elif output_format == "json":
+            text = self.to_json() + "\n"
+        else:
+            raise ValueError(f"Unknown metrics format: {output_format}")
+        with open(path, "w", encoding="utf-8") as file:
+            file.write(text)
+
+    def _replace(self, owner, name, make_replacement):
+        """Replace a method of a class with one built from the original"""
+        original = owner.__dict__[name]
+        self._originals.append((owner, name, original))
+        setattr(owner, name, make_replacement(original))
+
+    def _make_timed_sort(self, sort):
+        """Build a MergeSort.sort that times each sort"""
+
+        @wraps(sort)
+        def timed_sort(merge_sorter, iterable, key=None, reverse=False):
+            mode = "key" if key is not None or reverse else "compare"
+            start = perf_counter()
+            try:
+                return sort(merge_sorter, iterable, key, reverse)
+            finally:
+                self.observe(
+                    "mergesort_sort_seconds", "mode", mode, perf_counter() - start
+                )
+
+        return timed_sort
+
+
+def _format_bound(bound):
+    """Format the upper bound of a histogram bucket for exporting"""
+    return "+Inf" if bound == math.inf else bound
+
+
+def _make_call_counter(counters, counter_name):
+    """Build a replacement for a method that counts how often it is called"""
+
+    def make(method):
+        @wraps(method)
+        def counted(*args, **kwargs):
+            counters[counter_name] += 1
+            return method(*args, **kwargs)
+
+        return counted
+
+    return make
+
+
+def _make_size_counter(counters, counter_name):
+    """Build a replacement for a collection method that adds the size of the
+    collection to a counter each time it is called"""
+
+    def make(method):
+        @wraps(method)
+        def counted(droid_collection, *args, **kwargs):
+            counters[counter_name] += len(droid_collection)
+            return method(droid_collection, *args, **kwargs)
+
+        return counted
+
+    return make
+
+
+def _make_growth_counter(counters, counter_name, get_size):
+    """Build replacements for methods that add how much get_size of the
+    object grew during the call to a counter. Calls made from inside another
+    call the same counter wraps are left to the outer call to count."""
+    active = []
+
+    def make(method):
+        @wraps(method)
+        def counted(obj, *args, **kwargs):
+            if active:
+                return method(obj, *args, **kwargs)
+            active.append(obj)
+            before = get_size(obj)
+            try:
+                return method(obj, *args, **kwargs)
+            finally:
+                active.pop()
+                counters[counter_name] += get_size(obj) - before
+
+        return counted
+
+    return make
+
+
+def _make_counted_merge(counters):
+    """Build a replacement for MergeSort._merge that counts its comparisons
+    and moves"""
+
+    def make(merge):
+        @wraps(merge)
+        def counted_merge(merge_sorter, iterable, lo, mid, hi):
+            # Merge the items wrapped, so that every comparison the merge
+            # really makes is counted, then put the items back.
+            _wrap(iterable, lo, hi + 1, counters)
+            try:
+                merge(merge_sorter, iterable, lo, mid, hi)
+            finally:
+                _unwrap(iterable, lo, hi + 1)
+            counters["mergesort_merges_total"] += 1
+            # Every item is copied into the aux list and back out again.
+            counters["mergesort_moves_total"] += 2 * (hi - lo + 1)
+
+        return counted_merge
+
+    return make
+
+
+def _make_counted_merge_runs(counters):
+    """Build a replacement for MergeSort._merge_runs that counts its
+    comparisons and moves"""
+
+    def make(merge_runs):
+        @wraps(merge_runs)
+        def counted_merge_runs(
+            merge_sorter,
+            source_keys,
+            source_items,
+            destination_keys,
+            destination_items,
+            lo,
+            mid,
+            hi,
+            reverse,
+        ):
+            # The keys are what the merge compares. The merge copies them,
+            # still wrapped, into the destination, so both are put back.
+            _wrap(source_keys, lo, hi, counters)
+            try:
+                merge_runs(
+                    merge_sorter,
+                    source_keys,
+                    source_items,
+                    destination_keys,
+                    destination_items,
+                    lo,
+                    mid,
+                    hi,
+                    reverse,
+                )
+            finally:
+                _unwrap(source_keys, lo, hi)
+                _unwrap(destination_keys, lo, hi)
+            counters["mergesort_merges_total"] += 1
+            counters["mergesort_moves_total"] += hi - lo
+
+        return counted_merge_runs
+
+    return make
+
+
+class _CountedValue:
+    """A value being merged by MergeSort, wrapped so that each comparison
+    made between two values is counted"""
+
+    __slots__ = ("value", "counters")
+
+    def __init__(self, value, counters):
+        """Constructor"""
+        self.value = value
+        self.counters = counters
+
+    def __lt__(self, other):
+        """Less than rich comparison method. MergeSort only uses this one."""
+        self.counters["mergesort_comparisons_total"] += 1
+        return self.value < other.value
+
+
+def _wrap(values, lo, hi, counters):
+    """Wrap values[lo:hi] in place so their comparisons are counted"""
+    values[lo:hi] = [_CountedValue(value, counters) for value in values[lo:hi]]
+
+
+def _unwrap(values, lo, hi):
+    """Put back the values wrapped by _wrap"""
+    values[lo:hi] = [
+        value.value if isinstance(value, _CountedValue) else value
+        for value in values[lo:hi]
+    ]
+
+
+# Instrumentation used by the program.
+instrumentation = Instrumentation()
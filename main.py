@@ -4,17 +4,27 @@
 import sys
 
 # First-Party Imports
-from program import main
+from startup import PROFILE_FLAG, profiler
+
+# Start timing before the program module is imported so the report covers
+# every module the program loads.
+if PROFILE_FLAG in sys.argv[1:]:
+    profiler.install()
+
+from program import main  # pylint:disable=wrong-import-position
 
 
 def run(*args):
     """Main entry point for program"""
-    # Call the main method for the program
-    main(*args)
+    # Call the main method for the program. Returns the exit status.
+    return main(*args)
 
 
 # Prevent running on import.
 if __name__ == "__main__":
-    run(*sys.argv[1:])
-else:
+    sys.exit(run(*sys.argv[1:]))
+# Worker processes started with the spawn start method, the default on Windows
+# and macOS, import this file again as __mp_main__. They only need the imports
+# above, so let them through without running anything.
+elif __name__ != "__mp_main__":
     raise ImportError("Run this file directly, don't import it!")
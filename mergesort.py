@@ -11,14 +11,30 @@ class MergeSort:
     def __init__(self):
         """Constructor"""
         self._aux = []
-
-    def sort(self, iterable):
-        """Public sort method"""
+        # Buffers used by the key based sort. They are kept between calls to
+        # sort and only grow when a longer list is sorted. Their slots are
+        # emptied at the end of each sort so they do not keep items alive.
+        self._key_buffer = []
+        self._item_buffer = []
+
+    def sort(self, iterable, key=None, reverse=False):
+        """Public sort method
+
+        With no key and no reverse the items are compared directly using the
+        recursive top down sort. When a key function is given, or reverse is
+        True, each key is extracted once up front and an iterative bottom up
+        merge sort is run over the keys instead. Both are stable."""
+
+        if key is not None or reverse:
+            self._sort_by_key(iterable, key, reverse)
+            return
 
         # Initialize aux list to a bunch of Nones.
         # That way we will not encounter any indexing errors.
         self._aux = [None for i in range(len(iterable))]
         self._sort(iterable, 0, len(iterable) - 1)
+        # Let go of the aux list so it does not keep the items alive.
+        self._aux = []
 
     def _sort(self, iterable, lo, hi):
         """Private recursive sort method"""
@@ -89,3 +105,112 @@ class MergeSort:
                 # finished list.
                 iterable[k] = self._aux[i]
                 i += 1
+
+    def _sort_by_key(self, iterable, key, reverse):
+        """Private iterative bottom up sort method using extracted keys"""
+
+        length = len(iterable)
+
+        # Decorate. Pull every item out along with its key so that the key
+        # function is only called once per item instead of once per
+        # comparison.
+        items = list(iterable)
+        if key is None:
+            keys = list(items)
+        else:
+            keys = [key(item) for item in items]
+
+        # Grow the reusable buffers if this list is longer than any list
+        # sorted before.
+        if len(self._item_buffer) < length:
+            extra = length - len(self._item_buffer)
+            self._key_buffer.extend([None] * extra)
+            self._item_buffer.extend([None] * extra)
+
+        # The merges alternate between the decorated lists and the buffers.
+        # Each pass reads from the source lists and writes into the
+        # destination lists, then they swap places for the next pass.
+        source_keys, source_items = keys, items
+        destination_keys, destination_items = self._key_buffer, self._item_buffer
+
+        # Start with runs of one element and double the run width each pass
+        # until a single run covers the whole list. No recursion needed.
+        width = 1
+        while width < length:
+            for lo in range(0, length, 2 * width):
+                mid = min(lo + width, length)
+                hi = min(lo + 2 * width, length)
+                self._merge_runs(
+                    source_keys,
+                    source_items,
+                    destination_keys,
+                    destination_items,
+                    lo,
+                    mid,
+                    hi,
+                    reverse,
+                )
+            source_keys, destination_keys = destination_keys, source_keys
+            source_items, destination_items = destination_items, source_items
+            width *= 2
+
+        # Undecorate. Copy the sorted items back into the original list.
+        iterable[:length] = source_items[:length]
+
+        # Empty the slots of the buffers that were used, keeping their size
+        # for the next sort but not the items or keys of this one.
+        empty = [None] * length
+        self._key_buffer[:length] = empty
+        self._item_buffer[:length] = empty
+
+    def _merge_runs(
+        self,
+        source_keys,
+        source_items,
+        destination_keys,
+        destination_items,
+        lo,
+        mid,
+        hi,
+        reverse,
+    ):
+        """Merge the sorted runs [lo, mid) and [mid, hi) of the source lists
+        into the same positions of the destination lists"""
+
+        # If the last key of the left run already comes before (or ties with)
+        # the first key of the right run, the two runs are already in order
+        # and can be copied across in one go.
+        if mid >= hi or not (
+            source_keys[mid - 1] < source_keys[mid]
+            if reverse
+            else source_keys[mid] < source_keys[mid - 1]
+        ):
+            destination_keys[lo:hi] = source_keys[lo:hi]
+            destination_items[lo:hi] = source_items[lo:hi]
+            return
+
+        i = lo
+        j = mid
+        k = lo
+        while i < mid and j < hi:
+            left_key = source_keys[i]
+            right_key = source_keys[j]
+            # Only take from the right run when its key strictly comes first.
+            # Taking from the left run on ties is what keeps the sort stable.
+            if left_key < right_key if reverse else right_key < left_key:
+                destination_keys[k] = right_key
+                destination_items[k] = source_items[j]
+                j += 1
+            else:
+                destination_keys[k] = left_key
+                destination_items[k] = source_items[i]
+                i += 1
+            k += 1
+
+        # One of the runs is used up. Copy whatever is left of the other one.
+        if i < mid:
+            destination_keys[k:hi] = source_keys[i:mid]
+            destination_items[k:hi] = source_items[i:mid]
+        else:
+            destination_keys[k:hi] = source_keys[j:hi]
+            destination_items[k:hi] = source_items[j:hi]
@@ -0,0 +1,110 @@
+"""Parallel Sort module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import heapq
+import os
+from array import array
+from concurrent.futures import ProcessPoolExecutor
+from concurrent.futures.process import BrokenProcessPool
+from itertools import repeat
+
+# First-party Imports
+from catalog import get_catalog
+from droids import RECORD_COLUMN_TYPES
+from pricing import price_records
+
+# Collections smaller than this are sorted in this process. Starting worker
+# processes costs more than it saves on small collections.
+MIN_PARALLEL_SIZE = 100000
+
+
+def parallel_sort_by_total_cost(droid_collection, workers=None):
+    """Sort a droid collection by total cost using a pool of worker processes.
+
+    The collection is split into one chunk per worker. Each chunk is sent to
+    a worker packed as fixed width snapshot records rather than as pickled
+    droids, and the worker prices and sorts it. The sorted runs are then
+    merged back together here. The result is exactly the same as the stable
+    serial sort_by_total_cost, which is also used when the worker processes
+    can not be started or die part way through.
+
+    Collections whose serial sort is quicker than sending the droids to other
+    processes, such as the columnar backend, are always sorted serially."""
+    if workers is None:
+        workers = os.cpu_count() or 1
+
+    length = len(droid_collection)
+    if (
+        workers <= 1
+        or length < MIN_PARALLEL_SIZE
+        or not droid_collection.parallel_sort_helps
+    ):
+        droid_collection.sort_by_total_cost()
+        return
+
+    # Split the collection, in its current order, into one chunk per worker.
+    # Each chunk is sent as the raw bytes of its typed record columns, along
+    # with the position of its first droid.
+    columns = droid_collection.record_columns()
+    chunk_size = -(-length // workers)
+    payloads = [
+        tuple(column[start : start + chunk_size].tobytes() for column in columns)
+        for start in range(0, length, chunk_size)
+    ]
+    starts = range(0, length, chunk_size)
+
+    # The workers are given the catalog in use, as a worker started fresh
+    # would otherwise load the default one.
+    catalog = get_catalog()
+    try:
+        with ProcessPoolExecutor(max_workers=workers) as executor:
+            runs = list(
+                executor.map(_sort_chunk, payloads, starts, repeat(catalog))
+            )
+    except (BrokenProcessPool, OSError):
+        # The collection has not been touched yet, so sort it here instead.
+        droid_collection.sort_by_total_cost()
+        return
+
+    droid_collection.reorder(_merge_runs(runs))
+
+
+def _sort_chunk(payload, start, catalog):
+    """Worker process function. Price and sort one chunk of record columns.
+
+    Returns the sorted total costs and the positions within the whole
+    collection they came from, both as bytes."""
+    models, materials, colors, options, counts = (
+        array(typecode, column_bytes)
+        for typecode, column_bytes in zip(RECORD_COLUMN_TYPES, payload)
+    )
+    total_costs = price_records(
+        models, materials, colors, options, counts, catalog=catalog
+    )
+
+    # The built in sort is stable, the same as MergeSort.
+    positions = sorted(range(len(total_costs)), key=total_costs.__getitem__)
+
+    sorted_costs = array("d", [total_costs[position] for position in positions])
+    return (
+        sorted_costs.tobytes(),
+        array("I", [position + start for position in positions]).tobytes(),
+    )
+
+
+def _merge_runs(runs):
+    """Merge the sorted runs from the workers into one list of positions
+    within the whole collection"""
+    # Each run is a stream of (total cost, position) pairs in order. Droids
+    # with the same cost are ordered by their position, which puts an earlier
+    # chunk first and keeps the order within a chunk, just like a serial
+    # stable sort.
+    streams = [
+        zip(array("d", cost_bytes), array("I", position_bytes))
+        for cost_bytes, position_bytes in runs
+    ]
+    return [position for _, position in heapq.merge(*streams)]
@@ -0,0 +1,76 @@
+"""Batch pricing module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+from array import array
+
+# Third-party Imports
+# NumPy is optional, see the README. When it is installed, whole columns are
+# priced with vectorized arithmetic. Without it, a plain Python loop over the
+# same lookup tables is used instead. That loop costs roughly 0.4 microseconds
+# a droid, about 4 seconds for 10 million, so pricing millions of droids well
+# under a second needs NumPy.
+try:
+    import numpy
+except ImportError:
+    numpy = None
+
+# First-party Imports
+from catalog import NUMBER_OF_OPTION_SETS, get_catalog
+
+
+def price_records(models, materials, colors, options, counts, catalog=None):
+    """Return an array('d') holding the total cost of every droid described
+    by the parallel model, material, color, options and count columns.
+
+    The lookup tables of the pricing catalog are used directly, so the
+    results are exactly the same as pricing each droid one at a time. The
+    catalog in use is used unless another one is given.
+
+    NOTE: Without NumPy this is a Python loop taking roughly 0.4 microseconds
+    a droid, several times slower than the vectorized version."""
+    if catalog is None:
+        catalog = get_catalog()
+    if numpy is not None:
+        return _price_records_vectorized(
+            catalog, models, materials, colors, options, counts
+        )
+
+    base_costs = catalog.base_cost_table
+    count_costs = catalog.count_cost_table
+    number_of_materials = catalog.number_of_materials
+    number_of_colors = catalog.number_of_colors
+    return array(
+        "d",
+        [
+            base_costs[
+                ((model * number_of_materials + material) * number_of_colors + color)
+                * NUMBER_OF_OPTION_SETS
+                + option_bits
+            ]
+            + count * count_costs[model]
+            for model, material, color, option_bits, count in zip(
+                models, materials, colors, options, counts
+            )
+        ],
+    )
+
+
+def _price_records_vectorized(catalog, models, materials, colors, options, counts):
+    """Price the columns with NumPy"""
+    models = numpy.asarray(models, dtype=numpy.intp)
+    index = models * catalog.number_of_materials + numpy.asarray(
+        materials, dtype=numpy.intp
+    )
+    index = index * catalog.number_of_colors + numpy.asarray(colors, dtype=numpy.intp)
+    index = index * NUMBER_OF_OPTION_SETS + numpy.asarray(options, dtype=numpy.intp)
+
+    base_costs = numpy.frombuffer(catalog.base_cost_table, dtype=numpy.float64)
+    count_costs = numpy.frombuffer(catalog.count_cost_table, dtype=numpy.float64)
+    totals = base_costs[index] + numpy.asarray(counts, dtype=numpy.float64) * (
+        count_costs[models]
+    )
+    return array("d", totals.tobytes())
@@ -4,22 +4,156 @@
 # CIS 226
 # 6-4-2023
 
+# System imports
+import os
+import sys
+from contextlib import ExitStack, nullcontext
+from types import SimpleNamespace
+
 # First-party imports
+from catalog import CatalogError, load_catalog, reload_catalog, set_catalog
 from droids import DroidCollection
+from startup import profiler
 from userinterface import UserInterface
 
+# NOTE: Modules only some runs need, such as the bulk loader, snapshots, the
+# parallel sort and the instrumentation, are imported where they are used.
+# That keeps start up quick for the plain interactive menu, which needs none
+# of them.
+# pylint:disable=import-outside-toplevel
+
+# Options used when the program is run without any command line arguments.
+# These must match the defaults in _parse_args.
+DEFAULT_OPTIONS = {
+    "columnar": False,
+    "cost_index": False,
+    "load": [],
+    "snapshot": None,
+    "workers": None,
+    "profile_startup": False,
+    "catalog": None,
+    "batch": None,
+    "output": None,
+    "serve": False,
+    "port": None,
+    "sort_snapshot": None,
+    "memory_budget": None,
+    "metrics": None,
+    "metrics_format": "json",
+}
+
+# Name each main menu action is timed under, by menu choice.
+MENU_ACTIONS = {
+    1: "create_droid",
+    2: "print_droid_list",
+    3: "sort_into_categories",
+    4: "sort_by_total_cost",
+}
+
 
 def main(*args):
     """Method to run program"""
 
-    # Create a new instance of droid collection
-    droid_collection = DroidCollection()
+    # Parse the command line arguments passed in from main.run
+    with profiler.phase("parse arguments"):
+        options = _parse_args(args)
+
+    # Count and time the work done by the run and write the figures out at
+    # the end, however the run ends
+    if options.metrics:
+        from instrumentation import instrumentation
+
+        instrumentation.install()
+        try:
+            return _run(options)
+        finally:
+            instrumentation.write(options.metrics, options.metrics_format)
+    return _run(options)
+
+
+def _run(options):
+    """Run the program with parsed options and return its exit status"""
+
+    # Price droids with the requested pricing catalog instead of the default
+    if options.catalog:
+        with profiler.phase("load pricing catalog"):
+            try:
+                set_catalog(load_catalog(options.catalog))
+            except (OSError, CatalogError) as err:
+                _report_catalog_error(options, err)
+                return 1
+
+    # Sort a snapshot file on disk and stop, without loading any droids
+    if options.sort_snapshot:
+        return _run_sort_snapshot(options)
+
+    # Memory map the snapshot from the last run if there is one. Otherwise
+    # create a new instance of droid collection using the requested storage
+    with profiler.phase("create droid collection"):
+        if options.snapshot and os.path.exists(options.snapshot):
+            from snapshot import SnapshotError, load_snapshot
+
+            try:
+                droid_collection = load_snapshot(options.snapshot)
+            except (OSError, SnapshotError) as err:
+                _report_snapshot_error(options, f"Snapshot not loaded: {err}")
+                return 1
+        else:
+            if options.columnar:
+                from columnar import ColumnarDroidCollection
+
+                droid_collection = ColumnarDroidCollection()
+            else:
+                droid_collection = DroidCollection()
+
+            # Load default droids to make testing easier. Batch runs start
+            # empty so that scripts only ever see the droids they add.
+            if not options.batch:
+                droid_collection.load_default_droids()
+
+        # Keep the droids in cost order as they are added when asked to, so
+        # sorting by total cost only has to insert the droids added since the
+        # last sort. It costs a lot of memory on large collections, so it is
+        # off by default. Runs that hand the sort to worker processes do not
+        # need it.
+        if options.cost_index and not options.workers:
+            droid_collection.enable_cost_index()
+
+    # Run the commands in the batch file instead of showing the menu
+    if options.batch:
+        return _run_batch_mode(options, droid_collection)
 
-    # Load default droids to make testing easier
-    droid_collection.load_default_droids()
+    # Serve the collection to network clients instead of showing the menu
+    if options.serve:
+        return _run_server_mode(options, droid_collection)
+
+    return _run_menu_mode(options, droid_collection)
+
+
+def _run_menu_mode(options, droid_collection):
+    """Show the main menu until the user exits and return the exit status
+    for the program"""
 
     # Create a new instance of the user interface
-    user_interface = UserInterface(droid_collection)
+    with profiler.phase("create user interface"):
+        user_interface = UserInterface(droid_collection)
+
+    # Bulk load any droid files passed on the command line
+    if options.load:
+        from bulk_loader import load_droids
+
+        with profiler.phase("bulk load droids"):
+            for path in options.load:
+                try:
+                    report = load_droids(path, droid_collection)
+                except (OSError, ValueError) as err:
+                    user_interface.display_load_error(path, err)
+                    return 1
+                user_interface.display_load_report(path, report)
+
+    # Start up is over once the menu is about to be shown
+    if options.profile_startup:
+        profiler.report(sys.stderr)
 
     # Display greeting to user
     user_interface.display_greeting()
@@ -29,22 +163,291 @@ def main(*args):
 
     # While the choice is not 3 (exit)
     while choice < 5:
-        # If 1, create droid
-        if choice == 1:
-            user_interface.create_droid()
-        # Else if 2, print list
-        elif choice == 2:
-            user_interface.print_droid_list()
-        # Else if 3, sort into categories
-        elif choice == 3:
-            droid_collection.sort_into_categories()
-            user_interface.display_sort_into_categories_success_message()
-        # Else if 4, sort by total cost
-        elif choice == 4:
-            droid_collection.sort_by_total_cost()
-            user_interface.display_sort_by_total_cost_success_message()
+        # Pick up any edits made to the pricing catalog file since the last
+        # menu choice
+        _reload_pricing_catalog(droid_collection, user_interface)
+
+        # Time the action under its name. This does nothing unless metrics
+        # were asked for.
+        with _time_menu_action(options, choice):
+            # If 1, create droid
+            if choice == 1:
+                user_interface.create_droid()
+            # Else if 2, print list
+            elif choice == 2:
+                user_interface.print_droid_list()
+            # Else if 3, sort into categories
+            elif choice == 3:
+                droid_collection.sort_into_categories()
+                user_interface.display_sort_into_categories_success_message()
+            # Else if 4, sort by total cost
+            elif choice == 4:
+                if options.workers:
+                    from parallel_sort import parallel_sort_by_total_cost
+
+                    parallel_sort_by_total_cost(droid_collection, options.workers)
+                else:
+                    droid_collection.sort_by_total_cost()
+                user_interface.display_sort_by_total_cost_success_message()
         # Re-prompt for input
         choice = user_interface.get_menu_choice(5, user_interface.display_main_menu)
 
+    # Save the collection so the next run can start from where this one
+    # left off.
+    if not _save_snapshot(options, droid_collection):
+        return 1
+
     # Display exiting program message.
     user_interface.display_exit_message()
+    return 0
+
+
+def _time_menu_action(options, choice):
+    """Return a context manager that times a main menu action when metrics
+    were asked for, and does nothing otherwise"""
+    if not options.metrics:
+        return nullcontext()
+
+    from instrumentation import instrumentation
+
+    return instrumentation.timed("menu_action_seconds", "action", MENU_ACTIONS[choice])
+
+
+def _run_batch_mode(options, droid_collection):
+    """Run the batch commands and return the exit status for the program"""
+    from batch import run_batch
+
+    if options.profile_startup:
+        profiler.report(sys.stderr)
+
+    # Files opened here are closed when the batch is done. Standard input and
+    # output are left open.
+    with ExitStack() as files:
+        input_file = sys.stdin
+        output_file = sys.stdout
+        try:
+            if options.batch != "-":
+                input_file = files.enter_context(open(options.batch, encoding="utf-8"))
+            if options.output:
+                output_file = files.enter_context(
+                    open(options.output, "w", encoding="utf-8")
+                )
+        except OSError as err:
+            print(f"Could not open {err.filename}: {err.strerror}", file=sys.stderr)
+            return 1
+        report = run_batch(input_file, output_file, droid_collection, options.load)
+
+    if not _save_snapshot(options, droid_collection):
+        return 1
+
+    return 1 if report.has_errors else 0
+
+
+def _run_server_mode(options, droid_collection):
+    """Serve the droid collection until interrupted and return the exit
+    status for the program"""
+    from bulk_loader import load_droids
+    from server import DEFAULT_HOST, DEFAULT_PORT, serve
+
+    for path in options.load:
+        try:
+            report = load_droids(path, droid_collection)
+        except (OSError, ValueError) as err:
+            print(f"Could not load {path}: {err}", file=sys.stderr)
+            return 1
+        print(f"Loaded {report.loaded} droids from {path}", file=sys.stderr)
+
+    if options.profile_startup:
+        profiler.report(sys.stderr)
+
+    port = DEFAULT_PORT if options.port is None else options.port
+    print(
+        f"Serving {len(droid_collection)} droids on {DEFAULT_HOST}:{port}. "
+        "Press Ctrl+C to stop.",
+        file=sys.stderr,
+    )
+    serve(droid_collection, DEFAULT_HOST, port)
+
+    if not _save_snapshot(options, droid_collection):
+        return 1
+
+    return 0
+
+
+def _run_sort_snapshot(options):
+    """Sort a snapshot file by total cost with the external sort and return
+    the exit status for the program"""
+    from external_sort import DEFAULT_MEMORY_BUDGET, sort_snapshot
+    from snapshot import SnapshotError
+
+    memory_budget = DEFAULT_MEMORY_BUDGET
+    if options.memory_budget is not None:
+        memory_budget = options.memory_budget * 1024 * 1024
+
+    source_path, destination_path = options.sort_snapshot
+    try:
+        count = sort_snapshot(source_path, destination_path, memory_budget)
+    except (OSError, SnapshotError) as err:
+        print(f"Could not sort {source_path}: {err}", file=sys.stderr)
+        return 1
+    print(
+        f"Sorted {count} droids from {source_path} into {destination_path}.",
+        file=sys.stderr,
+    )
+    return 0
+
+
+def _save_snapshot(options, droid_collection):
+    """Save the collection to the snapshot file, if one was given and the
+    collection changed. Returns False if it could not be saved."""
+    if not options.snapshot:
+        return True
+
+    from snapshot import MappedDroidCollection, SnapshotError, save_snapshot
+
+    # A snapshot that was loaded and never changed is already on disk just
+    # as it is. Writing all of it out again would only cost time.
+    if (
+        isinstance(droid_collection, MappedDroidCollection)
+        and droid_collection.reads_from(options.snapshot)
+        and droid_collection.version == 0
+    ):
+        return True
+
+    try:
+        save_snapshot(droid_collection, options.snapshot)
+    except (OSError, SnapshotError) as err:
+        _report_snapshot_error(options, f"Snapshot not saved: {err}")
+        return False
+    return True
+
+
+def _report_snapshot_error(options, message):
+    """Report a snapshot file that could not be loaded or saved"""
+    # Batch and server runs keep stdout for their responses.
+    if options.batch or options.serve:
+        print(message, file=sys.stderr)
+    else:
+        UserInterface.display_snapshot_error(message)
+
+
+def _report_catalog_error(options, error):
+    """Report a pricing catalog that could not be loaded at start up"""
+    # Batch and server runs keep stdout for their responses, and sorting a
+    # snapshot reports to stderr, so the error goes there instead.
+    if options.batch or options.serve or options.sort_snapshot:
+        print(f"Pricing catalog not loaded: {error}", file=sys.stderr)
+    else:
+        UserInterface.display_catalog_load_error(error)
+
+
+def _reload_pricing_catalog(droid_collection, user_interface):
+    """Reload the pricing catalog if its file has changed and reprice the
+    droids whose prices changed"""
+    try:
+        change = reload_catalog()
+    except (OSError, CatalogError) as err:
+        user_interface.display_catalog_error(err)
+        return
+    if change is not None:
+        user_interface.display_catalog_reloaded(droid_collection.reprice(change))
+
+
+def _parse_args(args):
+    """Parse the command line arguments"""
+    # argparse, and the regular expression engine it loads, is one of the
+    # slowest imports at start up, so it is skipped when there is nothing
+    # to parse.
+    if not args:
+        return SimpleNamespace(**DEFAULT_OPTIONS)
+
+    import argparse
+
+    parser = argparse.ArgumentParser(description="Droid Inventory System")
+    parser.add_argument(
+        "--columnar",
+        action="store_true",
+        help="store droids in compact typed arrays instead of droid objects",
+    )
+    parser.add_argument(
+        "--cost-index",
+        action="store_true",
+        help="keep a cost ordered index so repeated sorts by total cost only place "
+        "droids added since the last sort (uses more memory)",
+    )
+    parser.add_argument(
+        "--load",
+        action="append",
+        default=[],
+        metavar="FILE",
+        help="bulk load droids from a CSV or JSON Lines file (repeatable)",
+    )
+    parser.add_argument(
+        "--snapshot",
+        metavar="FILE",
+        help="start from this binary snapshot if it exists and save to it on exit "
+        "if the droids changed",
+    )
+    parser.add_argument(
+        "--workers",
+        type=int,
+        metavar="N",
+        help="sort large collections by total cost using N worker processes",
+    )
+    parser.add_argument(
+        "--catalog",
+        metavar="FILE",
+        help="price droids with this JSON pricing catalog, reloaded when it changes",
+    )
+    parser.add_argument(
+        "--batch",
+        metavar="FILE",
+        help="run the JSON Lines commands in FILE (- for stdin) instead of the menu",
+    )
+    parser.add_argument(
+        "--output",
+        metavar="FILE",
+        help="write batch responses to FILE instead of stdout",
+    )
+    parser.add_argument(
+        "--serve",
+        action="store_true",
+        help="serve the droids to JSON Lines clients on localhost instead of the menu",
+    )
+    parser.add_argument(
+        "--port",
+        type=int,
+        metavar="PORT",
+        help="port for --serve to listen on (default 8226)",
+    )
+    parser.add_argument(
+        "--sort-snapshot",
+        nargs=2,
+        metavar=("SOURCE", "DESTINATION"),
+        help="sort the droids in a snapshot file by total cost into a new snapshot "
+        "without loading them into memory, then exit",
+    )
+    parser.add_argument(
+        "--memory-budget",
+        type=int,
+        metavar="MB",
+        help="megabytes of memory --sort-snapshot may use (default 256)",
+    )
+    parser.add_argument(
+        "--metrics",
+        metavar="FILE",
+        help="count sort comparisons and data structure operations and time each "
+        "menu action, writing the figures to FILE on exit",
+    )
+    parser.add_argument(
+        "--metrics-format",
+        choices=("json", "prometheus"),
+        default="json",
+        help="format of the --metrics file (default json)",
+    )
+    parser.add_argument(
+        "--profile-startup",
+        action="store_true",
+        help="report the time taken by each import and start up step on stderr",
+    )
+    return parser.parse_args(list(args))
@@ -0,0 +1,192 @@
+"""Droid Server module
+
+Serves a droid collection to any number of clients at once over TCP on the
+local machine. Clients send the same JSON Lines commands as batch mode, one
+per line, and get one JSON Lines response per command in the order they
+were sent:
+
+    {"id": 1, "command": "add", "model": "Utility", "material": "Carbonite",
+     "color": "Red", "toolbox": true}
+    {"id": 2, "command": "query", "model": "Utility", "options": ["toolbox"]}
+    {"id": 3, "command": "list-page", "offset": 200, "limit": 100}
+    {"id": 4, "command": "sort", "by": "cost"}
+    {"id": 5, "command": "aggregate", "by": ["model"]}
+    {"id": 6, "command": "list"}
+
+A list command streams the whole collection as one {"droid": {...}} line per
+droid, followed by its response, which has the number of droids sent. The
+load and export commands are not served, as they read and write files on
+the machine running the server.
+
+Commands run on worker threads rather than on the event loop, so a client
+sorting or querying a large collection does not hold up the others. The
+collection is shared through a ThreadSafeDroidCollection: changes are made
+one at a time under its lock, and reads come from its snapshots."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import asyncio
+import json
+from itertools import islice
+
+# First-party Imports
+from batch import COMMANDS, CommandError, execute, parse_command
+from bulk_loader import record_to_row
+from threadsafe import ThreadSafeDroidCollection
+
+DEFAULT_HOST = "127.0.0.1"
+DEFAULT_PORT = 8226
+
+# Commands that clients of the server can run.
+SERVER_COMMANDS = {
+    name: handler
+    for name, handler in COMMANDS.items()
+    if name not in ("load", "export")
+}
+
+# Longest line a client can send. Adding many droids in one command makes for
+# long lines, so this is well above the 64 KiB that asyncio allows by default.
+MAX_LINE_LENGTH = 16 * 1024 * 1024
+
+# Number of droids written to a client between waits for it to catch up
+# while streaming a list.
+STREAM_CHUNK_SIZE = 500
+
+
+class DroidServer:
+    """Serves the commands in SERVER_COMMANDS on a droid collection shared
+    by every client.
+
+    The commands of one client run one after the other, in the order sent,
+    while the commands of different clients run at the same time on worker
+    threads. Each change is made whole under the lock of the thread safe
+    collection, so clients always see the collection in a state between two
+    changes. A list streams the snapshot taken when it started, so the
+    droids it sends are the ones in the collection, in its order, at that
+    point."""
+
+    def __init__(self, droid_collection, host=DEFAULT_HOST, port=DEFAULT_PORT):
+        """Constructor. The collection must not be used directly while the
+        server is running."""
+        self.droid_collection = ThreadSafeDroidCollection(droid_collection)
+        self.host = host
+        self.port = port
+        self.clients = 0
+        self._server = None
+
+    async def start(self):
+        """Start accepting clients. Returns the port being listened on,
+        which is useful when port 0 was asked for."""
+        self._server = await asyncio.start_server(
+            self._handle_client, self.host, self.port, limit=MAX_LINE_LENGTH
+        )
+        return self._server.sockets[0].getsockname()[1]
+
+    async def serve_forever(self):
+        """Start accepting clients, if not started already, and serve them
+        until cancelled"""
+        if self._server is None:
+            await self.start()
+        async with self._server:
+            await self._server.serve_forever()
+
+    async def close(self):
+        """Stop accepting clients"""
+        if self._server is not None:
+            self._server.close()
+            await self._server.wait_closed()
+
+    async def _handle_client(self, reader, writer):
+        """Run the commands sent by one client until it disconnects"""
+        self.clients += 1
+        try:
+            while True:
+                try:
+                    line = await reader.readline()
+                except ValueError:
+                    # The line was longer than MAX_LINE_LENGTH. There is no
+                    # telling where the next command starts, so give up.
+                    await self._send(writer, {"ok": False, "error": "Line too long"})
+                    break
+                if not line:
+                    break
+                # Skip blank lines.
+                if not line.strip():
+                    continue
+                await self._run_line(line, writer)
+        except ConnectionError:
+            # The client went away part way through a response.
+            pass
+        except asyncio.CancelledError:
+            # The server is shutting down. Returning quietly stops asyncio
+            # logging the cancellation as an error for every open client.
+            pass
+        finally:
+            self.clients -= 1
+            writer.close()
+
+    async def _run_line(self, line, writer):
+        """Run one command sent by a client and send its response"""
+        try:
+            command = parse_command(line)
+        except CommandError as err:
+            command = err
+        if isinstance(command, dict) and command.get("command") == "list":
+            await self._stream_list(command, writer)
+        else:
+            response = await asyncio.get_running_loop().run_in_executor(
+                None, execute, command, self.droid_collection, SERVER_COMMANDS
+            )
+            await self._send(writer, response)
+
+    async def _stream_list(self, command, writer):
+        """Send every droid to a client a chunk at a time, so that a large
+        collection is neither built up in memory nor left waiting in the
+        send buffer of a slow client"""
+        # Only droids in the collection when the list started are sent, even
+        # if other clients change it while it is being streamed.
+        records = self.droid_collection.snapshot().iter_records(include_costs=True)
+        loop = asyncio.get_running_loop()
+        sent = 0
+        while True:
+            # Render each chunk on a worker thread, like any other command.
+            chunk = await loop.run_in_executor(None, _render_chunk, records)
+            if not chunk:
+                break
+            writer.write(("\n".join(chunk) + "\n").encode("utf-8"))
+            sent += len(chunk)
+            # Wait here while the client is behind.
+            await writer.drain()
+
+        response = {}
+        if "id" in command:
+            response["id"] = command["id"]
+        response.update(command="list", ok=True, count=sent)
+        await self._send(writer, response)
+
+    @staticmethod
+    async def _send(writer, response):
+        """Send one response line to a client"""
+        writer.write(json.dumps(response).encode("utf-8") + b"\n")
+        await writer.drain()
+
+
+def _render_chunk(records):
+    """Render the next STREAM_CHUNK_SIZE records of an iterator as a list of
+    droid lines. The list is empty once there are no records left."""
+    return [
+        json.dumps({"droid": record_to_row(record[:5], record[5])})
+        for record in islice(records, STREAM_CHUNK_SIZE)
+    ]
+
+
+def serve(droid_collection, host=DEFAULT_HOST, port=DEFAULT_PORT):
+    """Serve a droid collection until interrupted"""
+    server = DroidServer(droid_collection, host, port)
+    try:
+        asyncio.run(server.serve_forever())
+    except KeyboardInterrupt:
+        pass
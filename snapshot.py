@@ -0,0 +1,483 @@
+"""Droid Collection Snapshot module
+
+A snapshot is a binary file holding a whole droid collection. It starts with
+a fixed size header followed by one fixed width record per droid, in the
+collection's current order:
+
+    header:  magic (4 bytes), version (uint16), flags (uint16), count (uint64),
+             pricing catalog fingerprint (uint32)
+    record:  model code (uint8), material code (uint8), color code (uint8),
+             option bits (uint8), languages or ships (uint32),
+             total cost (float64, only when the HAS_COSTS flag is set)
+
+Everything is little endian. The total costs are only used when the snapshot
+was written with the same pricing catalog as the one in use. Otherwise the
+droids are priced again. Version 1 snapshots have no fingerprint, so their
+costs are never used."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import mmap
+import os
+import struct
+import sys
+from array import array
+
+# First-party Imports
+from catalog import get_catalog
+from columnar import ColumnarDroidCollection
+from droids import MAX_RECORD_COUNT, MODEL_OPTION_MASKS, check_window, droid_from_record
+
+MAGIC = b"DRDS"
+VERSION = 2
+# Header flag set when every record includes a precomputed total cost.
+HAS_COSTS = 1
+
+HEADER = struct.Struct("<4sHHQI")
+# Header of version 1 snapshots, which is the same without the fingerprint.
+HEADER_V1 = struct.Struct("<4sHHQ")
+RECORD = struct.Struct("<BBBBI")
+RECORD_WITH_COST = struct.Struct("<BBBBId")
+
+# Number of records packed or unpacked in one go.
+CHUNK_RECORDS = 64 * 1024
+
+# Attributes of a ColumnarDroidCollection that only exist once a mapped
+# snapshot has been fully decoded.
+COLUMN_ATTRIBUTES = frozenset(
+    (
+        "_models",
+        "_materials",
+        "_colors",
+        "_options",
+        "_counts",
+        "_total_costs",
+        "_priced_rows",
+        "_order",
+    )
+)
+
+
+class SnapshotError(ValueError):
+    """Snapshot file is not valid"""
+
+
+def save_snapshot(droid_collection, path, include_costs=True):
+    """Write a droid collection to a snapshot file.
+
+    The file is written next to the destination first and then moved into
+    place, so a crash part way through never leaves a broken snapshot.
+
+    A mapped collection can be saved over the snapshot it is reading from.
+    Windows will not replace a file that is memory mapped, so the old file is
+    closed just before it is replaced, and the collection then reads from
+    the new one, which holds the same droids in the same order."""
+    release_file = None
+    if isinstance(droid_collection, MappedDroidCollection) and (
+        droid_collection.reads_from(path)
+    ):
+        release_file = droid_collection.release_file
+    save_records(
+        droid_collection.iter_records(include_costs),
+        path,
+        include_costs,
+        before_replace=release_file,
+    )
+    if release_file is not None:
+        droid_collection.reopen(path)
+
+
+def save_records(records, path, include_costs=True, before_replace=None):
+    """Write an iterable of compact records to a snapshot file, in the order
+    given. When include_costs is True, each record has its total cost, from
+    the pricing catalog in use, on the end. Returns the number of records
+    written. See save_snapshot.
+
+    before_replace is called, when given, once every record has been written
+    and just before the new file replaces the one at path. It is where
+    anything still mapping the file at path should close it."""
+    record_struct = RECORD_WITH_COST if include_costs else RECORD
+    flags = HAS_COSTS if include_costs else 0
+
+    fingerprint = get_catalog().fingerprint
+
+    temp_path = f"{path}.tmp"
+    count = 0
+    try:
+        with open(temp_path, "wb") as file:
+            # Write a header with a count of zero for now. It is rewritten
+            # with the real count once all of the records are written.
+            file.write(HEADER.pack(MAGIC, VERSION, flags, 0, fingerprint))
+
+            chunk = []
+            for record in records:
+                # The count is the only field a droid can hold that the
+                # record format can not, such as more ships than fit.
+                if not 0 <= record[4] <= MAX_RECORD_COUNT:
+                    raise SnapshotError(
+                        f"Droid {count + len(chunk) + 1} has a count of "
+                        f"{record[4]}, more than a snapshot can hold"
+                    )
+                try:
+                    chunk.append(record_struct.pack(*record))
+                except struct.error as err:
+                    raise SnapshotError(
+                        f"Droid {count + len(chunk) + 1} can not be saved: {err}"
+                    ) from err
+                if len(chunk) >= CHUNK_RECORDS:
+                    file.write(b"".join(chunk))
+                    count += len(chunk)
+                    chunk = []
+            if chunk:
+                file.write(b"".join(chunk))
+                count += len(chunk)
+
+            file.seek(0)
+            file.write(HEADER.pack(MAGIC, VERSION, flags, count, fingerprint))
+    except BaseException:
+        # Never leave a partly written file behind, however the write ends.
+        if os.path.exists(temp_path):
+            os.remove(temp_path)
+        raise
+
+    if before_replace is not None:
+        before_replace()
+    os.replace(temp_path, path)
+    return count
+
+
+def load_snapshot(path):
+    """Memory map a snapshot file and return it as a droid collection.
+
+    Nothing is decoded up front. The droids are read from the file as they
+    are needed until the collection is changed or sorted."""
+    return MappedDroidCollection(SnapshotReader(path))
+
+
+class SnapshotReader:
+    """Read only, memory mapped access to the records of a snapshot file"""
+
+    def __init__(self, path):
+        """Constructor"""
+        self.path = path
+        self._file = open(path, "rb")  # pylint:disable=consider-using-with
+        try:
+            self._map = mmap.mmap(self._file.fileno(), 0, access=mmap.ACCESS_READ)
+        except ValueError as err:
+            self._file.close()
+            raise SnapshotError(f"{path} is empty") from err
+
+        try:
+            self._read_header(path)
+        except SnapshotError:
+            self.close()
+            raise
+
+    def _read_header(self, path):
+        """Read and check the header"""
+        if len(self._map) < HEADER_V1.size:
+            raise SnapshotError(f"{path} is too small to be a snapshot")
+        magic, version, flags, count = HEADER_V1.unpack_from(self._map, 0)
+        if magic != MAGIC:
+            raise SnapshotError(f"{path} is not a droid snapshot")
+        if version == VERSION:
+            if len(self._map) < HEADER.size:
+                raise SnapshotError(f"{path} is too small to be a snapshot")
+            fingerprint = HEADER.unpack_from(self._map, 0)[4]
+            self._header_size = HEADER.size
+        elif version == 1:
+            fingerprint = None
+            self._header_size = HEADER_V1.size
+        else:
+            raise SnapshotError(f"{path} has unsupported version {version}")
+
+        # Whether the records in the file have a total cost on the end.
+        self._stores_costs = bool(flags & HAS_COSTS)
+        # Whether those costs can be used. They can not if the prices have
+        # changed since the snapshot was written.
+        self.has_costs = (
+            self._stores_costs and fingerprint == get_catalog().fingerprint
+        )
+        self._record_struct = RECORD_WITH_COST if self._stores_costs else RECORD
+        self._count = count
+
+        if len(self._map) != self._header_size + count * self._record_struct.size:
+            raise SnapshotError(f"{path} is truncated or corrupt")
+
+    @property
+    def closed(self):
+        """Whether the file has been closed"""
+        return self._map.closed
+
+    def __len__(self):
+        """Number of records in the snapshot"""
+        return self._count
+
+    def __enter__(self):
+        """Enter context manager"""
+        return self
+
+    def __exit__(self, *args):
+        """Exit context manager"""
+        self.close()
+
+    def close(self):
+        """Unmap and close the file"""
+        self._map.close()
+        self._file.close()
+
+    def read_record(self, index):
+        """Read the record at an index. When the snapshot has costs the total
+        cost is on the end of the record."""
+        if index < 0:
+            index += self._count
+        if index < 0 or index >= self._count:
+            raise IndexError("snapshot index out of range")
+        record = self._record_struct.unpack_from(
+            self._map, self._header_size + index * self._record_struct.size
+        )
+        if self._stores_costs and not self.has_costs:
+            return record[:5]
+        return record
+
+    def iter_records(self):
+        """Yield every record in order. When the snapshot has costs the total
+        cost is on the end of each record."""
+        size = self._record_struct.size
+        end = self._header_size + self._count * size
+        drop_costs = self._stores_costs and not self.has_costs
+        # Unpack a chunk of records at a time from a copy of that part of the
+        # map, so no buffer stays exported from the map between chunks.
+        for start in range(self._header_size, end, CHUNK_RECORDS * size):
+            chunk = self._map[start : min(start + CHUNK_RECORDS * size, end)]
+            if drop_costs:
+                for record in self._record_struct.iter_unpack(chunk):
+                    yield record[:5]
+            else:
+                yield from self._record_struct.iter_unpack(chunk)
+
+    def read_columns(self):
+        """Decode every record into typed arrays. Returns a tuple of the
+        models, materials, colors, options, counts and total costs arrays.
+        The total costs array is None when the snapshot has no costs."""
+        columns = (
+            array("B"),
+            array("B"),
+            array("B"),
+            array("B"),
+            array("I"),
+            array("d") if self.has_costs else None,
+        )
+
+        if sys.byteorder != "little" or columns[4].itemsize != 4:
+            # The bytes can not be copied straight into the arrays on this
+            # machine, so unpack them one record at a time.
+            for record in self.iter_records():
+                for column, value in zip(columns, record):
+                    column.append(value)
+            return columns
+
+        # Each field sits at the same offset in every record, so a strided
+        # view of the map picks out a whole column at once.
+        size = self._record_struct.size
+        with memoryview(self._map) as whole:
+            header_size = self._header_size
+            with whole[header_size : header_size + self._count * size] as body:
+                for offset in range(4):
+                    columns[offset].frombytes(body[offset::size].tobytes())
+                with body.cast("I") as words:
+                    columns[4].frombytes(words[1 :: size // 4].tobytes())
+                if self.has_costs:
+                    with body.cast("d") as doubles:
+                        columns[5].frombytes(doubles[1 :: size // 8].tobytes())
+        return columns
+
+
+class MappedDroidCollection(ColumnarDroidCollection):
+    """Columnar droid collection backed by a memory mapped snapshot.
+
+    Reading the collection decodes droids straight from the snapshot. The
+    first time anything needs the columns themselves, such as adding or
+    sorting, the whole snapshot is decoded into columns and the file is
+    closed."""
+
+    def __init__(self, reader):
+        """Constructor"""
+        # pylint:disable=super-init-not-called
+        # NOTE: The parent constructor is not called on purpose. The columns
+        # are created by _decode the first time they are used.
+        self._reader = reader
+        # Number of iterators still reading from the snapshot file. Decoding
+        # leaves the file open until they are done with it.
+        self._open_iterators = 0
+        self._index = None
+        self._init_cost_index()
+        self._init_aggregates()
+        # Number of changes made since the snapshot was loaded. Decoding
+        # the snapshot is not a change. See DroidCollection.
+        self.version = 0
+
+    def __getattr__(self, name):
+        """Only called when an attribute is missing. Decode the snapshot the
+        first time one of the columns is needed."""
+        if name not in COLUMN_ATTRIBUTES or "_reader" not in self.__dict__:
+            raise AttributeError(name)
+        self._decode()
+        return getattr(self, name)
+
+    @property
+    def is_decoded(self):
+        """Whether the snapshot has been decoded into columns"""
+        return "_order" in self.__dict__
+
+    def __len__(self):
+        """Number of droids in the collection"""
+        if self.is_decoded:
+            return super().__len__()
+        return len(self._reader)
+
+    def __iter__(self):
+        """Iterate over the droids in their current order"""
+        if self.is_decoded:
+            yield from super().__iter__()
+            return
+        for record in self._iter_reader_records():
+            yield self._build_mapped_droid(record)
+
+    def __getitem__(self, index):
+        """Get the droid at the index of the current order"""
+        if self.is_decoded:
+            return super().__getitem__(index)
+        return self._build_mapped_droid(self._reader.read_record(index))
+
+    def window(self, offset, count):
+        """Return a list of up to count droids, starting at position offset
+        of the current order. Only the records in the window are read from
+        the snapshot. Overrides parent."""
+        if self.is_decoded:
+            return super().window(offset, count)
+        check_window(offset, count)
+        stop = min(offset + count, len(self._reader))
+        return [
+            self._build_mapped_droid(self._reader.read_record(index))
+            for index in range(offset, stop)
+        ]
+
+    def iter_records(self, include_costs=False):
+        """Yield each droid as a compact record tuple. Overrides parent."""
+        if self.is_decoded:
+            yield from super().iter_records(include_costs)
+        elif include_costs == self._reader.has_costs:
+            yield from self._iter_reader_records()
+        elif include_costs:
+            # The snapshot has no costs, so price each droid as it is read.
+            for record in self._iter_reader_records():
+                yield record + (droid_from_record(record).total_cost,)
+        else:
+            for record in self._iter_reader_records():
+                yield record[:5]
+
+    def close(self):
+        """Close the snapshot file if it is still open"""
+        if not self.is_decoded:
+            self._reader.close()
+
+    def reads_from(self, path):
+        """Whether the snapshot file at path is still open for reading"""
+        return (
+            not self._reader.closed
+            and os.path.exists(path)
+            and os.path.samefile(self._reader.path, path)
+        )
+
+    def release_file(self):
+        """Close the snapshot file even if it is still needed, such as just
+        before it is replaced. See reopen."""
+        self._reader.close()
+
+    def reopen(self, path):
+        """Read from the snapshot file at path in place of the one closed by
+        release_file. The file must hold the same droids in the same order,
+        such as one just saved from this collection."""
+        if not self.is_decoded:
+            self._reader = SnapshotReader(path)
+
+    def _iter_reader_records(self):
+        """Yield the records of the snapshot file in order. Iteration carries
+        on over the records in the file even if the collection is decoded
+        and changed part way through, such as by another client of the
+        server, and the file is closed once the last iterator is done."""
+        reader = self._reader
+        self._open_iterators += 1
+        try:
+            yield from reader.iter_records()
+        finally:
+            self._open_iterators -= 1
+            if self.is_decoded and self._open_iterators == 0:
+                reader.close()
+
+    def _build_mapped_droid(self, record):
+        """Build a droid from a snapshot record"""
+        try:
+            droid = droid_from_record(record[:5])
+        except IndexError as err:
+            raise SnapshotError(
+                f"{self._reader.path} has a droid with an unknown code"
+            ) from err
+        if len(record) > 5:
+            droid.cache_total_cost(record[5])
+        return droid
+
+    def _decode(self):
+        """Decode the whole snapshot into columns and close the file"""
+        (
+            models,
+            materials,
+            colors,
+            options,
+            counts,
+            total_costs,
+        ) = self._reader.read_columns()
+        _check_columns(self._reader.path, models, materials, colors, options)
+        # Iterators part way through the file close it when they finish.
+        if self._open_iterators == 0:
+            self._reader.close()
+
+        self._models = models
+        self._materials = materials
+        self._colors = colors
+        self._options = options
+        self._counts = counts
+        if total_costs is None:
+            self._total_costs = array("d", bytes(8 * len(models)))
+            self._priced_rows = 0
+        else:
+            self._total_costs = total_costs
+            self._priced_rows = len(models)
+        self._order = array("I", range(len(models)))
+
+
+def _check_columns(path, models, materials, colors, options):
+    """Make sure decoded columns only hold codes the pricing catalog can
+    price and option bits their models have, so that a corrupt snapshot is
+    reported now rather than when one of its droids is built"""
+    catalog = get_catalog()
+    for column, limit, name in (
+        (models, len(catalog.pricing_functions), "model"),
+        (materials, catalog.number_of_materials, "material"),
+        (colors, catalog.number_of_colors, "color"),
+    ):
+        # Deleting every valid code leaves only the codes that are not.
+        if column.tobytes().translate(None, bytes(range(limit))):
+            raise SnapshotError(f"{path} has an unknown {name} code")
+
+    # Turn each model code into the option bits that model does not have.
+    # Read as two very long numbers, the options and those bits only share a
+    # set bit when some droid has an option its model does not.
+    missing_options = bytes(~mask & 0xFF for mask in MODEL_OPTION_MASKS)
+    not_allowed = models.tobytes().translate(missing_options.ljust(256, b"\xff"))
+    if int.from_bytes(options, "little") & int.from_bytes(not_allowed, "little"):
+        raise SnapshotError(f"{path} has a droid with an option its model lacks")
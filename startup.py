@@ -0,0 +1,117 @@
+"""Startup Profiling module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import builtins
+import sys
+from contextlib import contextmanager
+from time import perf_counter
+
+# Command line flag that turns the profiler on. main.py looks for it before
+# anything else is imported so the imports themselves can be timed.
+PROFILE_FLAG = "--profile-startup"
+
+
+class StartupProfiler:
+    """Times each module import and each named step of program start up.
+
+    While installed, every import of a module that has not been loaded yet
+    is timed. The time spent importing a module includes the modules it
+    imports in turn, and its self time is that total less the time spent in
+    those nested imports."""
+
+    def __init__(self):
+        """Constructor"""
+        self.enabled = False
+        self._start_time = None
+        self._original_import = None
+        # List of [module name, depth, total seconds, self seconds], in the
+        # order the imports started.
+        self._imports = []
+        # List of (step name, seconds).
+        self._phases = []
+        # Time spent in nested imports, one entry per import in progress.
+        self._child_times = []
+
+    def install(self):
+        """Start timing imports"""
+        if self.enabled:
+            return
+        self.enabled = True
+        self._start_time = perf_counter()
+        self._original_import = builtins.__import__
+        builtins.__import__ = self._timed_import
+
+    def uninstall(self):
+        """Stop timing imports"""
+        if not self.enabled:
+            return
+        builtins.__import__ = self._original_import
+        self.enabled = False
+
+    @contextmanager
+    def phase(self, name):
+        """Context manager that times a named step of start up. Does nothing
+        when the profiler is not installed."""
+        if not self.enabled:
+            yield
+            return
+        start = perf_counter()
+        try:
+            yield
+        finally:
+            self._phases.append((name, perf_counter() - start))
+
+    def report(self, stream=None):
+        """Stop timing and write the report to a stream, stderr by default"""
+        total = perf_counter() - self._start_time if self._start_time else 0.0
+        self.uninstall()
+        if stream is None:
+            stream = sys.stderr
+
+        lines = [
+            "Startup profile (milliseconds)",
+            f"{'total':>10} {'self':>10}  module",
+        ]
+        for name, depth, seconds, self_seconds in self._imports:
+            lines.append(
+                f"{seconds * 1000:10.2f} {self_seconds * 1000:10.2f}  "
+                f"{'  ' * depth}{name}"
+            )
+        lines.append("")
+        lines.append(f"{'total':>10}  step")
+        for name, seconds in self._phases:
+            lines.append(f"{seconds * 1000:10.2f}  {name}")
+        lines.append("")
+        lines.append(f"{total * 1000:10.2f}  since profiling started")
+        stream.write("\n".join(lines) + "\n")
+        stream.flush()
+
+    def _timed_import(self, name, *args, **kwargs):
+        """Replacement for builtins.__import__ that times new modules"""
+        # Relative imports and modules that are already loaded cost next to
+        # nothing, so they are passed straight through.
+        level = args[3] if len(args) > 3 else kwargs.get("level", 0)
+        if level or name in sys.modules:
+            return self._original_import(name, *args, **kwargs)
+
+        entry = [name, len(self._child_times), 0.0, 0.0]
+        self._imports.append(entry)
+        self._child_times.append(0.0)
+        start = perf_counter()
+        try:
+            return self._original_import(name, *args, **kwargs)
+        finally:
+            seconds = perf_counter() - start
+            child_seconds = self._child_times.pop()
+            if self._child_times:
+                self._child_times[-1] += seconds
+            entry[2] = seconds
+            entry[3] = seconds - child_seconds
+
+
+# Profiler used by main.py and program.py.
+profiler = StartupProfiler()
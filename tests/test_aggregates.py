@@ -0,0 +1,93 @@
+"""Tests for the aggregates module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import unittest
+from itertools import combinations
+
+# First-party Imports
+from aggregates import DIMENSIONS
+from columnar import ColumnarDroidCollection
+from droids import Droid, DroidCollection
+
+
+def make_records(count):
+    """Return count compact records covering every model"""
+    return [
+        (index % 4, (index // 4) % 4, (index // 16) % 4, index % 64, index % 5)
+        for index in range(count)
+    ]
+
+
+def group_droids(droids, dimensions):
+    """Return the total costs of the droids grouped by the dimensions, the
+    slow way"""
+    groups = {}
+    for droid in droids:
+        values = {
+            "model": droid.model_name,
+            "material": droid.material,
+            "color": droid.color,
+        }
+        key = tuple(values[dimension] for dimension in dimensions)
+        groups.setdefault(key, []).append(droid.total_cost)
+    return groups
+
+
+class GroupByTests(unittest.TestCase):
+    """Running totals match grouping every droid by hand"""
+
+    def assert_groups(self, droid_collection):
+        """Every grouping of the collection matches grouping it by hand"""
+        droids = list(droid_collection)
+        for size in range(len(DIMENSIONS) + 1):
+            for dimensions in combinations(DIMENSIONS, size):
+                groups = droid_collection.group_by(*dimensions)
+                expected = group_droids(droids, dimensions)
+                self.assertEqual(set(groups), set(expected))
+                for key, costs in expected.items():
+                    summary = groups[key]
+                    self.assertEqual(summary.count, len(costs))
+                    self.assertAlmostEqual(summary.total, sum(costs))
+                    self.assertEqual(summary.minimum, min(costs))
+                    self.assertEqual(summary.maximum, max(costs))
+                    self.assertAlmostEqual(summary.mean, sum(costs) / len(costs))
+
+    def test_totals(self):
+        """Droids added before and after the totals start are all counted,
+        and sorting does not change them"""
+        records = make_records(300)
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            with self.subTest(collection=collection_class.__name__):
+                droid_collection = collection_class()
+                droid_collection.add_records(records[:120])
+                droid_collection.enable_aggregates()
+                droid_collection.add_records(records[120:])
+                droid_collection.add_protocol(
+                    Droid.Materials.CARBONITE, Droid.Colors.WHITE, 3
+                )
+                self.assert_groups(droid_collection)
+
+                droid_collection.sort_by_total_cost()
+                droid_collection.sort_into_categories()
+                self.assert_groups(droid_collection)
+                self.assertEqual(droid_collection.cost_summary().count, 301)
+
+    def test_empty(self):
+        """An empty collection has no groups and an empty summary"""
+        droid_collection = DroidCollection()
+        self.assertEqual(droid_collection.group_by("model"), {})
+        summary = droid_collection.cost_summary()
+        self.assertEqual((summary.count, summary.mean), (0, None))
+
+    def test_unknown_dimension(self):
+        """Only model, material and color can be grouped by"""
+        with self.assertRaises(ValueError):
+            DroidCollection().group_by("size")
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,126 @@
+"""Tests for the batch module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import io
+import json
+import unittest
+
+# First-party Imports
+from batch import run_batch
+from droids import DroidCollection
+
+# Commands sent, each with the response expected back, when a blank line is
+# sent after the second one. Responses with droids in them are checked
+# separately.
+ROUND_TRIP = (
+    (
+        {
+            "id": "a",
+            "command": "add",
+            "model": "Protocol",
+            "material": "Carbonite",
+            "color": "White",
+            "number_of_languages": 2,
+        },
+        {"id": "a", "command": "add", "ok": True, "added": 1, "size": 1},
+    ),
+    (
+        {
+            "command": "add",
+            "droids": [
+                {
+                    "model": "Utility",
+                    "material": "Vanadium",
+                    "color": "Red",
+                    "toolbox": True,
+                },
+                {
+                    "model": "Astromech",
+                    "material": "Quadranium",
+                    "color": "Blue",
+                    "navigation": "yes",
+                    "number_of_ships": 3,
+                },
+            ],
+        },
+        {"command": "add", "ok": True, "added": 2, "size": 3},
+    ),
+    (
+        {"command": "add", "model": "Gonk", "material": "Carbonite", "color": "Red"},
+        {"command": "add", "ok": False, "error": "Unknown model 'Gonk'", "line": 4},
+    ),
+    ({"command": "sort", "by": "cost"}, {"command": "sort", "ok": True}),
+    (
+        {"command": "fly"},
+        {"command": "fly", "ok": False, "error": "Unknown command 'fly'", "line": 6},
+    ),
+)
+
+
+class BatchTests(unittest.TestCase):
+    """Commands read as JSON Lines give one JSON Lines response each"""
+
+    def run_lines(self, lines):
+        """Run lines of input against a new collection and return the report,
+        the parsed responses and the collection"""
+        droid_collection = DroidCollection()
+        output_file = io.StringIO()
+        report = run_batch(
+            io.StringIO("".join(f"{line}\n" for line in lines)),
+            output_file,
+            droid_collection,
+        )
+        responses = [json.loads(line) for line in output_file.getvalue().splitlines()]
+        return report, responses, droid_collection
+
+    def test_round_trip(self):
+        """Each command gets its response, in order, and failures do not
+        stop the commands after them"""
+        commands = [json.dumps(command) for command, _ in ROUND_TRIP]
+        # Blank lines are skipped but still counted for line numbers.
+        commands.insert(2, "")
+        report, responses, _ = self.run_lines(commands)
+
+        self.assertEqual(responses, [response for _, response in ROUND_TRIP])
+        self.assertEqual((report.commands, report.failed), (5, 2))
+        self.assertTrue(report.has_errors)
+
+    def test_listing_after_sort(self):
+        """Droids come back with the fields they were added with, in the
+        order of the collection"""
+        commands = [json.dumps(command) for command, _ in ROUND_TRIP[:2]]
+        commands += [
+            '{"command": "sort", "by": "cost"}',
+            '{"command": "list"}',
+            '{"command": "list-page", "offset": 1, "limit": 1}',
+        ]
+        _, responses, droid_collection = self.run_lines(commands)
+
+        droids = responses[3]["droids"]
+        self.assertEqual(
+            [droid["model"] for droid in droids], ["Protocol", "Utility", "Astromech"]
+        )
+        self.assertEqual(
+            [droid["total_cost"] for droid in droids],
+            [droid.total_cost for droid in droid_collection],
+        )
+        self.assertEqual(droids[2]["number_of_ships"], 3)
+        self.assertIs(droids[2]["navigation"], True)
+        self.assertEqual(responses[4]["droids"], droids[1:2])
+        self.assertEqual(responses[4]["size"], 3)
+
+    def test_bad_lines(self):
+        """Lines that are not commands are reported against their line"""
+        _, responses, _ = self.run_lines(["not json", "[1]", '{"id": 7}'])
+        self.assertEqual(
+            [(response["ok"], response["line"]) for response in responses],
+            [(False, 1), (False, 2), (False, 3)],
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
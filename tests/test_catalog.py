@@ -0,0 +1,102 @@
+"""Tests for the catalog module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import unittest
+from array import array
+
+# First-party Imports
+from catalog import DEFAULT_CATALOG_PATH, load_catalog
+from droids import RECORD_COLUMN_TYPES, droid_from_record
+from pricing import price_records
+
+# Prices from before the pricing catalog, when they were class constants and
+# if/elif chains in the droid classes. The default catalog must match them.
+MATERIAL_COSTS = (100.00, 120.00, 150.00, 200.00)
+COLOR_COSTS = (10.00, 20.00, 40.00, 50.00)
+MODEL_COSTS = (120.00, 130.00, 160.00, 200.00)
+COST_PER_OPTION = 35.00
+COST_PER_LANGUAGE = 25.00
+COST_PER_SHIP = 45.00
+# Option flags each model paid for, by model code.
+MODEL_OPTIONS = (0, 1 | 2 | 4, 1 | 2 | 4 | 8 | 16, 1 | 2 | 4 | 32)
+# Languages or ships tried for every other combination.
+COUNTS = (0, 1, 7, 1000)
+
+
+def original_total_cost(record):
+    """Price a compact record the way the droid classes used to"""
+    model_code, material_code, color_code, option_bits, count = record
+    total_cost = (
+        MODEL_COSTS[model_code]
+        + MATERIAL_COSTS[material_code]
+        + COLOR_COSTS[color_code]
+    )
+    # Each option was added on one at a time.
+    for flag in (1, 2, 4, 8, 16, 32):
+        if option_bits & MODEL_OPTIONS[model_code] & flag:
+            total_cost += COST_PER_OPTION
+    if model_code == 0:
+        total_cost += count * COST_PER_LANGUAGE
+    elif model_code == 3:
+        total_cost += COST_PER_SHIP * count
+    return total_cost
+
+
+def every_record():
+    """Return every combination of model, material, color and options, with
+    each of COUNTS"""
+    return [
+        (model_code, material_code, color_code, option_bits, count)
+        for model_code in range(len(MODEL_COSTS))
+        for material_code in range(len(MATERIAL_COSTS))
+        for color_code in range(len(COLOR_COSTS))
+        for option_bits in range(64)
+        for count in COUNTS
+    ]
+
+
+class DefaultCatalogTests(unittest.TestCase):
+    """The default catalog prices droids exactly as before"""
+
+    @classmethod
+    def setUpClass(cls):
+        """Load the default catalog and every record to price"""
+        cls.catalog = load_catalog(DEFAULT_CATALOG_PATH)
+        cls.records = every_record()
+
+    def test_every_combination_is_checked(self):
+        """All 16,384 combinations are priced"""
+        self.assertEqual(len(self.records), 16384)
+
+    def test_catalog_price_matches_original(self):
+        """PricingCatalog.price matches the original prices"""
+        for record in self.records:
+            self.assertEqual(
+                self.catalog.price(*record), original_total_cost(record), record
+            )
+
+    def test_droid_total_cost_matches_original(self):
+        """Droid objects priced with the default catalog match the original
+        prices"""
+        for record in self.records:
+            droid = droid_from_record(record)
+            self.assertEqual(droid.total_cost, original_total_cost(record), record)
+
+    def test_batch_pricing_matches_original(self):
+        """Pricing columns in one batch matches the original prices"""
+        columns = [
+            array(typecode, column)
+            for typecode, column in zip(RECORD_COLUMN_TYPES, zip(*self.records))
+        ]
+        total_costs = price_records(*columns, catalog=self.catalog)
+        self.assertEqual(
+            list(total_costs), [original_total_cost(record) for record in self.records]
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
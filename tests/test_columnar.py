@@ -0,0 +1,81 @@
+"""Tests for the columnar module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import unittest
+
+# First-party Imports
+from columnar import ColumnarDroidCollection
+from droids import MAX_RECORD_COUNT, Droid, DroidCollection
+
+CARBONITE = Droid.Materials.CARBONITE
+BLUE = Droid.Colors.BLUE
+
+
+def add_droids(droid_collection):
+    """Add one of each model, with counts at both ends of the range"""
+    droid_collection.add_protocol(CARBONITE, BLUE, MAX_RECORD_COUNT)
+    droid_collection.add_utility(CARBONITE, BLUE, True, False, True)
+    droid_collection.add_janitor(CARBONITE, BLUE, True, True, False, True, False)
+    droid_collection.add_astromech(CARBONITE, BLUE, False, True, True, True, 0)
+    droid_collection.add_astromech(CARBONITE, BLUE, True, True, True, False, 12)
+
+
+class ColumnarParityTests(unittest.TestCase):
+    """The columnar backend must hold and order droids exactly like the list
+    backend"""
+
+    def setUp(self):
+        """Build the same droids in both backends"""
+        self.droid_list = DroidCollection()
+        self.columnar = ColumnarDroidCollection()
+        for droid_collection in (self.droid_list, self.columnar):
+            droid_collection.load_default_droids()
+            add_droids(droid_collection)
+
+    def assert_same(self):
+        """Both backends print and store the same droids in the same order"""
+        self.assertEqual(str(self.columnar), str(self.droid_list))
+        self.assertEqual(
+            list(self.columnar.iter_records(include_costs=True)),
+            list(self.droid_list.iter_records(include_costs=True)),
+        )
+
+    def test_same_droids_and_sorts(self):
+        """Adding and both sorts give the same result"""
+        self.assert_same()
+        self.columnar.sort_by_total_cost()
+        self.droid_list.sort_by_total_cost()
+        self.assert_same()
+        self.columnar.sort_into_categories()
+        self.droid_list.sort_into_categories()
+        self.assert_same()
+
+    def test_count_too_large_for_a_column(self):
+        """A count the columns can not hold is rejected without adding a row,
+        leaving the collection as it was"""
+        for count in (MAX_RECORD_COUNT + 1, 5000000000, -1):
+            with self.assertRaises(ValueError):
+                self.columnar.add_astromech(
+                    CARBONITE, BLUE, True, True, True, True, count
+                )
+            with self.assertRaises(ValueError):
+                self.columnar.add_records([(3, 0, 0, 0, 1), (3, 0, 0, 0, count)])
+        self.test_same_droids_and_sorts()
+
+    def test_options_and_counts_models_do_not_have(self):
+        """Option bits and counts a model does not have are dropped, the same
+        as building the droid from the record does"""
+        records = [(0, 1, 2, 0xFF, 3), (1, 0, 0, 0xFF, 9), (2, 3, 3, 0xFF, 9)]
+        for record in records:
+            self.columnar.add_record(record)
+        self.columnar.add_records(records)
+        self.droid_list.add_records(records * 2)
+        self.test_same_droids_and_sorts()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,90 @@
+"""Tests for the datastructures module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import random
+import unittest
+
+# First-party Imports
+from datastructures import ArrayQueue, Queue
+
+
+class ArrayQueueTests(unittest.TestCase):
+    """The circular buffer keeps first in, first out order while it wraps
+    around and grows"""
+
+    def assert_contents(self, array_queue, expected):
+        """The queue holds exactly the expected items, front first"""
+        self.assertEqual(len(array_queue), len(expected))
+        self.assertEqual(list(array_queue), expected)
+        self.assertEqual(array_queue.peek(), expected[0] if expected else None)
+        self.assertEqual(array_queue.is_empty, not expected)
+
+    def test_wraparound(self):
+        """Items enqueued past the end of the buffer wrap to the start"""
+        capacity = ArrayQueue.INITIAL_CAPACITY
+        array_queue = ArrayQueue(range(capacity))
+        for _ in range(10):
+            array_queue.dequeue()
+        array_queue.enqueue_many(range(capacity, capacity + 8))
+        array_queue.enqueue(capacity + 8)
+        # The buffer did not need to grow to take the wrapped items.
+        # pylint:disable-next=protected-access
+        self.assertEqual(len(array_queue._buffer), capacity)
+        self.assert_contents(array_queue, list(range(10, capacity + 9)))
+
+    def test_growth_while_wrapped(self):
+        """Growing a wrapped buffer keeps the items in order, whether one item
+        or many at a time pushes it over"""
+        capacity = ArrayQueue.INITIAL_CAPACITY
+        for extra in (1, 5, 3 * capacity):
+            with self.subTest(extra=extra):
+                array_queue = ArrayQueue(range(capacity))
+                for _ in range(6):
+                    array_queue.dequeue()
+                array_queue.enqueue_many(range(capacity, capacity + 6))
+                if extra == 1:
+                    array_queue.enqueue(2 * capacity)
+                else:
+                    array_queue.enqueue_many(range(2 * capacity, 2 * capacity + extra))
+                expected = list(range(6, capacity + 6)) + list(
+                    range(2 * capacity, 2 * capacity + extra)
+                )
+                self.assert_contents(array_queue, expected)
+                self.assertEqual(list(array_queue.drain()), expected)
+                self.assert_contents(array_queue, [])
+
+    def test_matches_queue(self):
+        """A random mix of calls gives the same results as the linked Queue"""
+        generator = random.Random(226)
+        array_queue = ArrayQueue()
+        queue = Queue()
+        expected = []
+        next_item = 0
+        for _ in range(2000):
+            choice = generator.random()
+            if choice < 0.4:
+                array_queue.enqueue(next_item)
+                queue.enqueue(next_item)
+                expected.append(next_item)
+                next_item += 1
+            elif choice < 0.5:
+                items = list(range(next_item, next_item + generator.randrange(40)))
+                array_queue.enqueue_many(items)
+                for item in items:
+                    queue.enqueue(item)
+                expected.extend(items)
+                next_item += len(items)
+            else:
+                self.assertEqual(array_queue.dequeue(), queue.dequeue())
+                if expected:
+                    expected.pop(0)
+            self.assertEqual(len(array_queue), len(queue))
+        self.assert_contents(array_queue, expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,305 @@
+"""Tests for the droids module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import os
+import tempfile
+import unittest
+from operator import attrgetter
+
+# First-party Imports
+from columnar import ColumnarDroidCollection
+from datastructures import Queue, Stack
+from droids import (
+    AstromechDroid,
+    Droid,
+    DroidCollection,
+    JanitorDroid,
+    ProtocolDroid,
+    UtilityDroid,
+    droid_from_record,
+)
+from snapshot import load_snapshot, save_snapshot
+
+
+def make_records(count):
+    """Return count compact records covering every model, many of them
+    different droids with the same total cost"""
+    return [
+        (index % 4, (index // 4) % 4, (index // 16) % 4, index % 64, index % 5)
+        for index in range(count)
+    ]
+
+
+def get_records(droids):
+    """Return the compact record of each droid in an iterable of droids"""
+    return [droid.to_record() for droid in droids]
+
+
+def stack_queue_sort(droids):
+    """Return the droids in the order the original sort_into_categories put
+    them in: pushed onto a stack per model, then popped off the stacks into a
+    queue, astromech first, and dequeued"""
+    stacks = {
+        model_class: Stack()
+        for model_class in (AstromechDroid, JanitorDroid, UtilityDroid, ProtocolDroid)
+    }
+    for droid in droids:
+        # Most specific class first, as astromech droids are utility droids.
+        for model_class, stack in stacks.items():
+            if isinstance(droid, model_class):
+                stack.push(droid)
+                break
+
+    droid_queue = Queue()
+    for stack in stacks.values():
+        droid = stack.pop()
+        while droid is not None:
+            droid_queue.enqueue(droid)
+            droid = stack.pop()
+
+    sorted_droids = []
+    droid = droid_queue.dequeue()
+    while droid is not None:
+        sorted_droids.append(droid)
+        droid = droid_queue.dequeue()
+    return sorted_droids
+
+
+class TotalCostCacheTests(unittest.TestCase):
+    """The total cost is calculated when first read and kept until a pricing
+    attribute changes"""
+
+    def setUp(self):
+        """Make a droid to price"""
+        self.droid = AstromechDroid(
+            Droid.Materials.CARBONITE, Droid.Colors.WHITE, True, False, False, True, 2
+        )
+
+    def test_priced_when_read(self):
+        """A new droid is priced on first read, not left at zero"""
+        droid = ProtocolDroid(Droid.Materials.CARBONITE, Droid.Colors.WHITE, 1)
+        self.assertGreater(droid.total_cost, 0)
+
+    def test_pricing_attributes_reprice(self):
+        """Setting any pricing attribute through its property reprices"""
+        for name, value in (
+            ("material", Droid.Materials.TEARS_OF_A_JEDI),
+            ("color", Droid.Colors.BLUE),
+            ("has_computer_connection", True),
+            ("has_navigation", False),
+            ("number_of_ships", 9),
+        ):
+            with self.subTest(name=name):
+                before = self.droid.total_cost
+                setattr(self.droid, name, value)
+                self.assertEqual(getattr(self.droid, name), value)
+                self.assertNotEqual(self.droid.total_cost, before)
+
+    def test_assigned_total_cost_is_kept(self):
+        """A value assigned to total_cost is read back rather than being
+        calculated again, until a pricing attribute changes"""
+        calculated = self.droid.total_cost
+        self.droid.total_cost = 1.5
+        self.assertEqual(self.droid.total_cost, 1.5)
+        self.droid.number_of_ships = 2
+        self.assertEqual(self.droid.total_cost, calculated)
+
+
+class CategorySortTests(unittest.TestCase):
+    """sort_into_categories gives exactly the order of the original stack
+    and queue sort, however it is mixed with adding and sorting by cost"""
+
+    # Steps run in order against each backend, each with its records to add.
+    STEPS = (
+        ("add", slice(0, 13)),
+        ("sort_into_categories", None),
+        ("add", slice(13, None)),
+        ("sort_into_categories", None),
+        ("sort_into_categories", None),
+        ("sort_by_total_cost", None),
+        ("sort_into_categories", None),
+    )
+
+    def test_matches_stack_queue_sort(self):
+        """Every backend ends each step in the same order as the original"""
+        records = make_records(40)
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            droid_collection = collection_class()
+            expected = []
+            for step, (name, added) in enumerate(self.STEPS):
+                with self.subTest(collection=collection_class.__name__, step=step):
+                    if name == "add":
+                        droid_collection.add_records(records[added])
+                        expected.extend(map(droid_from_record, records[added]))
+                    elif name == "sort_into_categories":
+                        droid_collection.sort_into_categories()
+                        expected = stack_queue_sort(expected)
+                    else:
+                        droid_collection.sort_by_total_cost()
+                        expected.sort(key=attrgetter("total_cost"))
+                    self.assertEqual(
+                        get_records(droid_collection), get_records(expected)
+                    )
+
+class TopTests(unittest.TestCase):
+    """The cheapest and most expensive droids match the ends of a stable
+    sort, ties included"""
+
+    def test_matches_sort(self):
+        """Every count, from none to more than the collection holds"""
+        records = make_records(200)
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            droid_collection = collection_class()
+            droid_collection.add_records(records)
+            droids = list(droid_collection)
+            by_cost = sorted(droids, key=attrgetter("total_cost"))
+            by_cost_reversed = sorted(
+                droids, key=attrgetter("total_cost"), reverse=True
+            )
+            for count in (0, 1, 7, 50, 200, 250):
+                with self.subTest(collection=collection_class.__name__, count=count):
+                    self.assertEqual(
+                        get_records(droid_collection.cheapest(count)),
+                        get_records(by_cost[:count]),
+                    )
+                    self.assertEqual(
+                        get_records(droid_collection.most_expensive(count)),
+                        get_records(by_cost_reversed[:count]),
+                    )
+            # Neither changes the order of the collection.
+            self.assertEqual(get_records(droid_collection), get_records(droids))
+
+    def test_ties_keep_their_order(self):
+        """Droids with the same cost come back in collection order"""
+        droid_collection = DroidCollection()
+        droid_collection.add_records([(0, 0, 0, 0, 1)] * 5)
+        droids = list(droid_collection)
+        for count in range(6):
+            self.assertEqual(
+                list(map(id, droid_collection.cheapest(count))),
+                list(map(id, droids[:count])),
+            )
+            self.assertEqual(
+                list(map(id, droid_collection.most_expensive(count))),
+                list(map(id, droids[:count])),
+            )
+
+
+class CostIndexTests(unittest.TestCase):
+    """The cost index always holds the order sort_by_total_cost gives"""
+
+    def test_matches_sort_by_total_cost(self):
+        """Indexed and plain collections agree as droids are added and the
+        collection is sorted other ways"""
+        records = make_records(300)
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            with self.subTest(collection=collection_class.__name__):
+                indexed_collection = collection_class()
+                indexed_collection.enable_cost_index()
+                plain_collection = collection_class()
+
+                # Droids added to an index already built are inserted into
+                # it, and sorting by category makes it start over.
+                for start, stop, by_category in (
+                    (0, 100, False),
+                    (100, 180, True),
+                    (180, 300, False),
+                ):
+                    for droid_collection in (indexed_collection, plain_collection):
+                        droid_collection.add_records(records[start:stop])
+                        if by_category:
+                            droid_collection.sort_into_categories()
+                    by_cost = get_records(indexed_collection.iter_by_cost())
+
+                    plain_collection.sort_by_total_cost()
+                    self.assertEqual(by_cost, get_records(plain_collection))
+                    indexed_collection.sort_by_total_cost()
+                    self.assertEqual(by_cost, get_records(indexed_collection))
+
+                    # Ranges of the index are runs of the same order.
+                    costs = [droid.total_cost for droid in plain_collection]
+                    minimum, maximum = costs[len(costs) // 4], costs[len(costs) // 2]
+                    self.assertEqual(
+                        get_records(indexed_collection.in_cost_range(minimum, maximum)),
+                        [
+                            record
+                            for record, cost in zip(by_cost, costs)
+                            if minimum <= cost <= maximum
+                        ],
+                    )
+                    self.assertEqual(
+                        indexed_collection.cost_rank(maximum), costs.index(maximum)
+                    )
+
+
+class WindowTests(unittest.TestCase):
+    """Windows and pages stop cleanly at either end of the collection, for
+    every kind of collection"""
+
+    # Number of droids in each collection, more than two pages of three.
+    SIZE = 7
+
+    def make_collections(self):
+        """Return a list, columnar and memory mapped collection holding the
+        same droids"""
+        records = [(index % 4, 0, 0, 0, 0) for index in range(self.SIZE)]
+        droid_collection = DroidCollection()
+        droid_collection.add_records(records)
+        columnar_collection = ColumnarDroidCollection()
+        columnar_collection.add_records(records)
+
+        directory = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "droids.snap")
+        save_snapshot(droid_collection, path)
+        mapped_collection = load_snapshot(path)
+        self.addCleanup(mapped_collection.close)
+        return droid_collection, columnar_collection, mapped_collection
+
+    def test_windows(self):
+        """Windows past the end are cut short or empty"""
+        for droid_collection in self.make_collections():
+            with self.subTest(collection=type(droid_collection).__name__):
+                records = [droid.to_record() for droid in droid_collection]
+                for offset, count in ((0, 0), (0, 7), (5, 3), (6, 1), (7, 1), (9, 2)):
+                    self.assertEqual(
+                        [
+                            droid.to_record()
+                            for droid in droid_collection.window(offset, count)
+                        ],
+                        records[offset : offset + count],
+                    )
+                for offset, count in ((-1, 1), (0, -1)):
+                    with self.assertRaises(ValueError):
+                        droid_collection.window(offset, count)
+
+    def test_pages(self):
+        """Pages cover every droid once, the last one holding what is left"""
+        for droid_collection in self.make_collections():
+            with self.subTest(collection=type(droid_collection).__name__):
+                self.assertEqual(droid_collection.page_count(3), 3)
+                self.assertEqual(droid_collection.page_count(7), 1)
+                self.assertEqual(droid_collection.page_count(6), 2)
+                self.assertEqual(
+                    [len(droid_collection.page(number, 3)) for number in (1, 2, 3, 4)],
+                    [3, 3, 1, 0],
+                )
+                with self.assertRaises(ValueError):
+                    droid_collection.page(0, 3)
+                with self.assertRaises(ValueError):
+                    droid_collection.page_count(0)
+
+    def test_empty_collection(self):
+        """An empty collection has one empty page"""
+        droid_collection = DroidCollection()
+        self.assertEqual(droid_collection.page_count(), 1)
+        self.assertEqual(droid_collection.page(1), [])
+        self.assertEqual(droid_collection.window(0, 5), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,73 @@
+"""Tests for the external sort module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# First-party Imports
+import snapshot
+from columnar import ColumnarDroidCollection
+from external_sort import sort_snapshot
+from snapshot import SnapshotReader, save_snapshot
+
+
+class SortSnapshotTests(unittest.TestCase):
+    """Sorting snapshot files by total cost"""
+
+    def setUp(self):
+        """Write an unsorted snapshot to a temporary folder"""
+        directory = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.directory = directory.name
+        self.path = os.path.join(self.directory, "droids.snap")
+
+        droid_collection = ColumnarDroidCollection()
+        droid_collection.add_records(
+            [
+                (index % 4, (index * 7) % 4, (index // 4) % 4, index % 8, index % 30)
+                for index in range(5000)
+            ]
+        )
+        save_snapshot(droid_collection, self.path)
+        droid_collection.sort_by_total_cost()
+        self.expected = list(droid_collection.iter_records(include_costs=True))
+
+    def read_snapshot(self):
+        """Return the records of the snapshot"""
+        with SnapshotReader(self.path) as reader:
+            return list(reader.iter_records())
+
+    def test_sort_into_the_same_file(self):
+        """Sorting a snapshot in place closes it before replacing it"""
+        events = []
+        close = SnapshotReader.close
+        replace = os.replace
+
+        def logged_close(reader):
+            events.append("close")
+            close(reader)
+
+        def logged_replace(source, destination):
+            events.append("replace")
+            replace(source, destination)
+
+        with mock.patch.object(
+            SnapshotReader, "close", logged_close
+        ), mock.patch.object(snapshot.os, "replace", logged_replace):
+            # A small budget so that runs are spilled to disk and merged.
+            count = sort_snapshot(self.path, self.path, 20 * 1024, self.directory)
+
+        self.assertEqual(count, len(self.expected))
+        self.assertEqual(events[:2], ["close", "replace"])
+        self.assertEqual(self.read_snapshot(), self.expected)
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+
+if __name__ == "__main__":
+    unittest.main()
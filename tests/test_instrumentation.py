@@ -0,0 +1,187 @@
+"""Tests for the instrumentation module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import json
+import os
+import random
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# First-party Imports
+from instrumentation import Instrumentation
+from mergesort import MergeSort
+
+# Folder holding main.py.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+class CountedValue:
+    """Value that counts every comparison made between values"""
+
+    comparisons = 0
+
+    def __init__(self, value):
+        """Constructor"""
+        self.value = value
+
+    def __lt__(self, other):
+        """Less than rich comparison method"""
+        CountedValue.comparisons += 1
+        return self.value < other.value
+
+
+def run_menu(choices, *args):
+    """Run the program with menu choices on stdin and metrics on, and return
+    the metrics it wrote"""
+    with tempfile.TemporaryDirectory() as directory:
+        metrics_path = os.path.join(directory, "metrics.json")
+        subprocess.run(
+            [sys.executable, "main.py", "--metrics", metrics_path, *args],
+            input="".join(f"{choice}\n" for choice in choices),
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        with open(metrics_path, encoding="utf-8") as file:
+            return json.load(file)
+
+
+class MergeSortCounterTests(unittest.TestCase):
+    """The MergeSort counters match what the sort really does"""
+
+    def setUp(self):
+        """Install a fresh instrumentation for each test"""
+        self.instrumentation = Instrumentation()
+        self.addCleanup(self.instrumentation.uninstall)
+
+    def count_comparisons(self, values, **sort_args):
+        """Return the comparisons made sorting the values, counted directly
+        and by the instrumentation"""
+        CountedValue.comparisons = 0
+        MergeSort().sort([CountedValue(value) for value in values], **sort_args)
+        direct = CountedValue.comparisons
+
+        self.instrumentation.reset()
+        self.instrumentation.install()
+        MergeSort().sort([CountedValue(value) for value in values], **sort_args)
+        self.instrumentation.uninstall()
+        return direct, self.instrumentation.counters["mergesort_comparisons_total"]
+
+    def test_comparisons_match_a_direct_count(self):
+        """Every way of sorting counts the same comparisons as __lt__ sees"""
+        generator = random.Random(226)
+        for _ in range(50):
+            values = [
+                generator.randint(0, generator.choice((3, 1000)))
+                for _ in range(generator.randint(0, 150))
+            ]
+            for sort_args in ({}, {"key": lambda value: value}, {"reverse": True}):
+                direct, counted = self.count_comparisons(values, **sort_args)
+                self.assertEqual(direct, counted)
+
+    def test_sorted_items_are_the_originals(self):
+        """Counting leaves the sorted list holding the items it was given"""
+        values = [CountedValue(value) for value in (5, 3, 9, 3, 1, 8, 2)]
+        self.instrumentation.install()
+        for sort_args in ({}, {"key": lambda value: value.value}, {"reverse": True}):
+            items = list(values)
+            MergeSort().sort(items, **sort_args)
+            self.assertEqual(sorted(map(id, items)), sorted(map(id, values)))
+
+    def test_uninstall_restores_methods(self):
+        """Uninstalling puts the original MergeSort methods back"""
+        original = MergeSort.__dict__["_merge"]
+        self.instrumentation.install()
+        self.assertIsNot(MergeSort.__dict__["_merge"], original)
+        self.instrumentation.uninstall()
+        self.assertIs(MergeSort.__dict__["_merge"], original)
+
+
+class LazyImportTests(unittest.TestCase):
+    """Runs without metrics do not load this module"""
+
+    def test_not_imported_by_the_program(self):
+        """Importing the program leaves the instrumentation unloaded"""
+        process = subprocess.run(
+            [
+                sys.executable,
+                "-c",
+                "import sys, program; print('instrumentation' in sys.modules)",
+            ],
+            cwd=PROJECT_DIR,
+            capture_output=True,
+            text=True,
+            check=True,
+        )
+        self.assertEqual(process.stdout.strip(), "False")
+
+
+class MenuMetricsTests(unittest.TestCase):
+    """Sorting from the menu moves the counters"""
+
+    def test_list_backend_sorts(self):
+        """Sorting by cost and into categories is counted on droid objects"""
+        metrics = run_menu([4, 3, 4, 5])
+        counters = metrics["counters"]
+        self.assertGreater(counters["mergesort_merges_total"], 0)
+        self.assertGreater(counters["mergesort_comparisons_total"], 0)
+        self.assertGreater(counters["mergesort_moves_total"], 0)
+        self.assertGreater(counters["cost_sort_droids_total"], 0)
+        self.assertGreater(counters["category_sort_droids_total"], 0)
+        self.assertGreater(counters["droids_priced_total"], 0)
+
+        actions = {
+            entry["labels"]["action"]: entry["count"]
+            for entry in metrics["histograms"]["menu_action_seconds"]
+        }
+        self.assertEqual(actions, {"sort_by_total_cost": 2, "sort_into_categories": 1})
+
+    def test_columnar_backend_sorts(self):
+        """The columnar backend counts the rows it sorts and prices"""
+        counters = run_menu([4, 3, 5], "--columnar")["counters"]
+        self.assertGreater(counters["cost_sort_droids_total"], 0)
+        self.assertGreater(counters["category_sort_droids_total"], 0)
+        self.assertGreater(counters["droids_priced_total"], 0)
+
+    def test_cost_index(self):
+        """Droids added to the cost index are counted"""
+        counters = run_menu([4, 5], "--cost-index")["counters"]
+        self.assertGreater(counters["cost_index_inserts_total"], 0)
+        self.assertGreater(counters["cost_index_chunks_total"], 0)
+
+    def test_prometheus_format(self):
+        """Metrics can be written as Prometheus text"""
+        with tempfile.TemporaryDirectory() as directory:
+            metrics_path = os.path.join(directory, "metrics.prom")
+            subprocess.run(
+                [
+                    sys.executable,
+                    "main.py",
+                    "--metrics",
+                    metrics_path,
+                    "--metrics-format",
+                    "prometheus",
+                ],
+                input="4\n5\n",
+                cwd=PROJECT_DIR,
+                capture_output=True,
+                text=True,
+                check=True,
+            )
+            with open(metrics_path, encoding="utf-8") as file:
+                text = file.read()
+        self.assertIn("# TYPE droids_mergesort_comparisons_total counter", text)
+        self.assertIn(
+            'droids_menu_action_seconds_count{action="sort_by_total_cost"} 1', text
+        )
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,88 @@
+"""Tests for the mergesort module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import gc
+import random
+import unittest
+import weakref
+from operator import attrgetter
+
+# First-party Imports
+from mergesort import MergeSort
+
+
+class Item:
+    """Item compared only by its key, so items with equal keys tie"""
+
+    def __init__(self, key, position):
+        """Constructor"""
+        self.key = key
+        self.position = position
+
+    def __lt__(self, other):
+        """Compare by key only"""
+        return self.key < other.key
+
+
+def make_items(count, seed):
+    """Return count items with many tied keys, numbered in their starting
+    order"""
+    keys = random.Random(seed).choices(range(max(1, count // 4)), k=count)
+    return [Item(key, position) for position, key in enumerate(keys)]
+
+
+class StabilityTests(unittest.TestCase):
+    """Every way of sorting gives the same order as sorted, ties included"""
+
+    def test_matches_sorted(self):
+        """Items with equal keys keep their starting order, reversed or not"""
+        for count in (0, 1, 2, 7, 64, 1000):
+            items = make_items(count, count)
+            for sort_args in (
+                {},
+                {"key": attrgetter("key")},
+                {"reverse": True},
+                {"key": attrgetter("key"), "reverse": True},
+            ):
+                with self.subTest(count=count, **sort_args):
+                    sorted_items = list(items)
+                    MergeSort().sort(sorted_items, **sort_args)
+                    self.assertEqual(
+                        [item.position for item in sorted_items],
+                        [item.position for item in sorted(items, **sort_args)],
+                    )
+
+    def test_sorter_reused(self):
+        """A sorter gives the same result after sorting a longer list"""
+        merge_sorter = MergeSort()
+        merge_sorter.sort(make_items(500, 1), key=attrgetter("key"))
+        items = make_items(50, 2)
+        expected = sorted(items, key=attrgetter("key"), reverse=True)
+        merge_sorter.sort(items, key=attrgetter("key"), reverse=True)
+        self.assertEqual(
+            [item.position for item in items], [item.position for item in expected]
+        )
+
+
+class BufferTests(unittest.TestCase):
+    """The sorter does not keep the items it sorted alive"""
+
+    def test_items_released(self):
+        """Once the sorted list is gone, so are its items"""
+        merge_sorter = MergeSort()
+        for sort_args in ({}, {"key": attrgetter("key")}, {"reverse": True}):
+            with self.subTest(**sort_args):
+                items = make_items(100, 3)
+                references = [weakref.ref(item) for item in items]
+                merge_sorter.sort(items, **sort_args)
+                del items
+                gc.collect()
+                self.assertTrue(all(reference() is None for reference in references))
+
+
+if __name__ == "__main__":
+    unittest.main()
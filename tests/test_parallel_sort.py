@@ -0,0 +1,81 @@
+"""Tests for the parallel_sort module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import random
+import unittest
+from operator import attrgetter
+from unittest import mock
+
+# First-party Imports
+import parallel_sort
+from columnar import ColumnarDroidCollection
+from droids import DroidCollection
+from mergesort import MergeSort
+from parallel_sort import parallel_sort_by_total_cost
+
+
+def random_records(count):
+    """Return records drawn from few enough combinations that many droids
+    share a total cost"""
+    generator = random.Random(226)
+    return [
+        (
+            generator.randrange(4),
+            generator.randrange(2),
+            generator.randrange(2),
+            generator.randrange(4),
+            generator.randrange(3),
+        )
+        for _ in range(count)
+    ]
+
+
+class ParallelSortTests(unittest.TestCase):
+    """Sorting with worker processes gives exactly the serial order"""
+
+    def setUp(self):
+        """Send even small collections to the workers"""
+        patcher = mock.patch.object(parallel_sort, "MIN_PARALLEL_SIZE", 0)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    def test_same_order_as_merge_sort(self):
+        """Droids with the same total cost stay in their serial order"""
+        droid_collection = DroidCollection()
+        droid_collection.add_records(random_records(5000))
+        expected = list(droid_collection)
+        MergeSort().sort(expected, key=attrgetter("total_cost"))
+
+        parallel_sort_by_total_cost(droid_collection, workers=3)
+        # The same droid objects must end up in the same places, so ties
+        # between equal droids are checked too.
+        self.assertEqual(
+            [id(droid) for droid in droid_collection],
+            [id(droid) for droid in expected],
+        )
+
+    def test_columnar_same_order_as_merge_sort(self):
+        """The columnar backend ends up in the serial order whether or not
+        it is sent to the workers"""
+        records = random_records(5000)
+        droid_collection = DroidCollection()
+        droid_collection.add_records(records)
+        droid_collection.sort_by_total_cost()
+        expected = list(droid_collection.iter_records(include_costs=True))
+
+        for parallel_sort_helps in (False, True):
+            columnar = ColumnarDroidCollection()
+            columnar.add_records(records)
+            with mock.patch.object(
+                ColumnarDroidCollection, "parallel_sort_helps", parallel_sort_helps
+            ):
+                parallel_sort_by_total_cost(columnar, workers=3)
+            self.assertEqual(list(columnar.iter_records(include_costs=True)), expected)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,120 @@
+"""Tests for the program module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import os
+import subprocess
+import sys
+import tempfile
+import unittest
+
+# Folder holding main.py.
+PROJECT_DIR = os.path.dirname(os.path.dirname(os.path.abspath(__file__)))
+
+
+def run_program(*args, stdin=""):
+    """Run main.py with arguments and return the finished process"""
+    return subprocess.run(
+        [sys.executable, "main.py", *args],
+        input=stdin,
+        cwd=PROJECT_DIR,
+        capture_output=True,
+        text=True,
+        check=False,
+        timeout=60,
+    )
+
+
+class BadFileTests(unittest.TestCase):
+    """Files given on the command line that can not be used are reported
+    with an exit status of 1 rather than a traceback"""
+
+    def assert_reported(self, process, text):
+        """The process failed cleanly and mentioned the text"""
+        self.assertEqual(process.returncode, 1)
+        self.assertNotIn("Traceback", process.stderr)
+        self.assertIn(text, process.stdout + process.stderr)
+
+    def test_load_missing_file(self):
+        """A droid file that does not exist"""
+        for mode in ((), ("--serve", "--port", "0")):
+            process = run_program(*mode, "--load", "missing.csv")
+            self.assert_reported(process, "Could not load missing.csv")
+
+    def test_load_unknown_format(self):
+        """A droid file that is not CSV or JSON Lines"""
+        for mode in ((), ("--serve", "--port", "0")):
+            process = run_program(*mode, "--load", "README.md")
+            self.assert_reported(process, "Could not load README.md")
+
+    def test_batch_files_that_can_not_be_opened(self):
+        """A batch input file that does not exist, or an output file in a
+        folder that does not"""
+        process = run_program("--batch", "missing.jsonl")
+        self.assert_reported(process, "Could not open missing.jsonl")
+        process = run_program("--batch", "-", "--output", "missing/out.jsonl")
+        self.assert_reported(process, "Could not open missing/out.jsonl")
+
+    def test_snapshot_that_can_not_be_loaded(self):
+        """A snapshot file that is not a snapshot"""
+        process = run_program("--snapshot", "README.md")
+        self.assert_reported(process, "Snapshot not loaded")
+
+    def test_snapshot_that_can_not_be_saved(self):
+        """A droid with more ships than a snapshot can hold is reported on
+        exit and no snapshot is written"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "droids.snap")
+            choices = (1, 4, 1, 1, "y", "y", "y", "y", 5000000000, 5)
+            process = run_program(
+                "--snapshot", path, stdin="".join(f"{choice}\n" for choice in choices)
+            )
+            self.assert_reported(process, "Snapshot not saved")
+            self.assertEqual(os.listdir(directory), [])
+
+
+class SnapshotSaveTests(unittest.TestCase):
+    """The snapshot is only written again on exit when the droids changed"""
+
+    def test_saved_only_when_changed(self):
+        """Listing the droids leaves the file alone and sorting them does
+        not"""
+        with tempfile.TemporaryDirectory() as directory:
+            path = os.path.join(directory, "droids.snap")
+            self.assertEqual(run_program("--snapshot", path, stdin="5\n").returncode, 0)
+            written = os.stat(path)
+
+            process = run_program("--snapshot", path, stdin="2\n5\n")
+            self.assertEqual(process.returncode, 0)
+            self.assertEqual(os.stat(path).st_ino, written.st_ino)
+            self.assertEqual(os.stat(path).st_mtime_ns, written.st_mtime_ns)
+
+            process = run_program("--snapshot", path, stdin="4\n5\n")
+            self.assertEqual(process.returncode, 0)
+            self.assertNotEqual(
+                (os.stat(path).st_ino, os.stat(path).st_mtime_ns),
+                (written.st_ino, written.st_mtime_ns),
+            )
+
+
+class ExitStatusTests(unittest.TestCase):
+    """Every way of running the program exits with a status"""
+
+    def test_menu(self):
+        """Exiting from the menu"""
+        self.assertEqual(run_program(stdin="5\n").returncode, 0)
+
+    def test_batch(self):
+        """A batch run exits with 0 when every command works and 1 when any
+        fails"""
+        process = run_program("--batch", "-", stdin='{"command": "sort-cost"}\n')
+        self.assertEqual(process.returncode, 0)
+        process = run_program("--batch", "-", stdin='{"command": "fly"}\n')
+        self.assertEqual(process.returncode, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,142 @@
+"""Tests for the server module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import asyncio
+import json
+import unittest
+
+# First-party Imports
+from droids import DroidCollection
+from server import DroidServer
+
+
+class Client:
+    """JSON Lines client of a running server"""
+
+    def __init__(self, reader, writer):
+        """Constructor"""
+        self.reader = reader
+        self.writer = writer
+
+    @classmethod
+    async def connect(cls, port):
+        """Connect to the server on a port"""
+        return cls(*await asyncio.open_connection("127.0.0.1", port))
+
+    async def send(self, **command):
+        """Send a command without waiting for its response"""
+        self.writer.write(json.dumps(command).encode("utf-8") + b"\n")
+        await self.writer.drain()
+
+    async def receive(self):
+        """Read the next line sent by the server"""
+        return json.loads(await self.reader.readline())
+
+    async def run(self, **command):
+        """Send a command and return its response"""
+        await self.send(**command)
+        return await self.receive()
+
+    async def close(self):
+        """Disconnect from the server"""
+        self.writer.close()
+        await self.writer.wait_closed()
+
+
+class ServerTests(unittest.IsolatedAsyncioTestCase):
+    """Clients can run commands on a shared collection"""
+
+    async def start_server(self, droid_collection):
+        """Start a server on a free port and return the port"""
+        server = DroidServer(droid_collection, port=0)
+        port = await server.start()
+        self.addAsyncCleanup(server.close)
+        return port
+
+    async def connect(self, port):
+        """Connect a new client to the server"""
+        client = await Client.connect(port)
+        self.addAsyncCleanup(client.close)
+        return client
+
+    async def test_commands(self):
+        """Every kind of served command gives the expected response"""
+        droid_collection = DroidCollection()
+        droid_collection.load_default_droids()
+        client = await self.connect(await self.start_server(droid_collection))
+        size = len(droid_collection)
+
+        response = await client.run(
+            id=1,
+            command="add",
+            model="Astromech",
+            material="Carbonite",
+            color="Red",
+            navigation=True,
+            number_of_ships=2,
+        )
+        self.assertEqual(
+            response,
+            {"id": 1, "command": "add", "ok": True, "added": 1, "size": size + 1},
+        )
+
+        response = await client.run(command="sort", by="cost")
+        self.assertTrue(response["ok"])
+        response = await client.run(command="list-page", offset=0, limit=2)
+        self.assertEqual(response["size"], size + 1)
+        costs = [droid["total_cost"] for droid in response["droids"]]
+        self.assertEqual(costs, sorted(costs))
+
+        response = await client.run(command="query", model="Astromech")
+        self.assertGreaterEqual(response["count"], 1)
+        self.assertTrue(
+            all(droid["model"] == "Astromech" for droid in response["droids"])
+        )
+
+        response = await client.run(command="aggregate", by=["model"])
+        self.assertEqual(sum(group["count"] for group in response["groups"]), size + 1)
+
+        await client.send(id=2, command="list")
+        droids = [await client.receive() for _ in range(size + 1)]
+        self.assertTrue(all("droid" in line for line in droids))
+        self.assertEqual(
+            await client.receive(),
+            {"id": 2, "command": "list", "ok": True, "count": size + 1},
+        )
+
+        # Reading files on the server is not allowed, and bad commands fail
+        # without dropping the client.
+        for command in (
+            {"command": "load", "path": "droids.csv"},
+            {"command": "sort", "by": "name"},
+        ):
+            response = await client.run(**command)
+            self.assertFalse(response["ok"])
+
+    async def test_sort_does_not_hold_up_other_clients(self):
+        """A quick command from one client is answered while another
+        client's large sort is still running"""
+        droid_collection = DroidCollection()
+        droid_collection.add_records(
+            [(n % 4, n % 3, n % 4, n % 64, n % 9) for n in range(200000)]
+        )
+        port = await self.start_server(droid_collection)
+        sorter = await self.connect(port)
+        other = await self.connect(port)
+
+        await sorter.send(command="sort", by="cost")
+        # Give the sort time to start on its worker thread.
+        await asyncio.sleep(0.05)
+        page = asyncio.ensure_future(other.run(command="list-page", limit=1))
+        sort = asyncio.ensure_future(sorter.receive())
+        done, _ = await asyncio.wait((page, sort), return_when=asyncio.FIRST_COMPLETED)
+        self.assertIn(page, done)
+        self.assertTrue((await sort)["ok"])
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,199 @@
+"""Tests for the snapshot module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import os
+import tempfile
+import unittest
+from unittest import mock
+
+# First-party Imports
+import snapshot
+from columnar import ColumnarDroidCollection
+from droids import Droid, DroidCollection
+from snapshot import (
+    HEADER,
+    RECORD_WITH_COST,
+    SnapshotError,
+    load_snapshot,
+    save_snapshot,
+)
+
+
+def make_records(count):
+    """Return count compact records covering every model"""
+    return [
+        (index % 4, index % 4, (index // 4) % 4, index % 8, index % 20)
+        for index in range(count)
+    ]
+
+
+class SaveOverMappedSnapshotTests(unittest.TestCase):
+    """Saving a mapped collection over the file it is reading from"""
+
+    def setUp(self):
+        """Write a snapshot to a temporary folder"""
+        directory = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "droids.snap")
+        droid_collection = ColumnarDroidCollection()
+        droid_collection.add_records(make_records(1000))
+        save_snapshot(droid_collection, self.path)
+
+    def record_events(self):
+        """Log when snapshot files are closed and replaced, in order"""
+        events = []
+        close = snapshot.SnapshotReader.close
+        replace = os.replace
+
+        def logged_close(reader):
+            events.append(("close", reader.path))
+            close(reader)
+
+        def logged_replace(source, destination):
+            events.append(("replace", destination))
+            replace(source, destination)
+
+        for patcher in (
+            mock.patch.object(snapshot.SnapshotReader, "close", logged_close),
+            mock.patch.object(snapshot.os, "replace", logged_replace),
+        ):
+            patcher.start()
+            self.addCleanup(patcher.stop)
+        return events
+
+    def test_file_is_closed_before_it_is_replaced(self):
+        """The map of the old file is closed before the new one replaces it,
+        and the collection goes on reading from the new file"""
+        droid_collection = load_snapshot(self.path)
+        expected = list(droid_collection.iter_records(include_costs=True))
+
+        events = self.record_events()
+        save_snapshot(droid_collection, self.path)
+
+        self.assertEqual(events, [("close", self.path), ("replace", self.path)])
+        self.assertFalse(droid_collection.is_decoded)
+        self.assertEqual(
+            list(droid_collection.iter_records(include_costs=True)), expected
+        )
+        droid_collection.close()
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+
+    def test_decoded_collection(self):
+        """A collection that has been changed saves over its old file"""
+        droid_collection = load_snapshot(self.path)
+        droid_collection.sort_by_total_cost()
+        expected = list(droid_collection.iter_records(include_costs=True))
+
+        save_snapshot(droid_collection, self.path)
+
+        saved = load_snapshot(self.path)
+        self.assertEqual(list(saved.iter_records(include_costs=True)), expected)
+        saved.close()
+
+
+class VersionTests(unittest.TestCase):
+    """Only changes to the droids or their order count as changes to a
+    mapped collection"""
+
+    def setUp(self):
+        """Write a snapshot to a temporary folder and map it"""
+        directory = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        path = os.path.join(directory.name, "droids.snap")
+        droid_collection = ColumnarDroidCollection()
+        droid_collection.add_records(make_records(100))
+        save_snapshot(droid_collection, path)
+        self.droid_collection = load_snapshot(path)
+        self.addCleanup(self.droid_collection.close)
+
+    def test_reading_is_not_a_change(self):
+        """Reading, even when it decodes the snapshot, leaves the version"""
+        droid_collection = self.droid_collection
+        list(droid_collection)
+        droid_collection.window(10, 10)
+        droid_collection.cheapest(5)
+        droid_collection.group_by("model")
+        self.assertTrue(droid_collection.is_decoded)
+        self.assertEqual(droid_collection.version, 0)
+
+    def test_changes(self):
+        """Adding and sorting each count as a change"""
+        droid_collection = self.droid_collection
+        droid_collection.sort_by_total_cost()
+        droid_collection.sort_into_categories()
+        droid_collection.add_record((0, 0, 0, 0, 1))
+        droid_collection.add_records(make_records(3))
+        self.assertEqual(droid_collection.version, 4)
+
+
+class BadSnapshotTests(unittest.TestCase):
+    """Droids a snapshot can not hold, and snapshots holding droids that can
+    not exist, raise SnapshotError"""
+
+    def setUp(self):
+        """Write a snapshot to a temporary folder"""
+        directory = tempfile.TemporaryDirectory()  # pylint:disable=consider-using-with
+        self.addCleanup(directory.cleanup)
+        self.path = os.path.join(directory.name, "droids.snap")
+        self.write_snapshot()
+
+    def write_snapshot(self):
+        """Write a valid snapshot, replacing any already written"""
+        droid_collection = ColumnarDroidCollection()
+        droid_collection.add_records(make_records(100))
+        save_snapshot(droid_collection, self.path)
+
+    def test_count_too_large(self):
+        """Saving fails without a temporary file left behind or the old
+        snapshot being touched"""
+        with open(self.path, "rb") as file:
+            original = file.read()
+        droid_collection = DroidCollection()
+        droid_collection.load_default_droids()
+        droid_collection.add_astromech(
+            Droid.Materials.CARBONITE, Droid.Colors.RED, True, True, True, True, 2**32
+        )
+
+        with self.assertRaises(SnapshotError):
+            save_snapshot(droid_collection, self.path)
+
+        self.assertFalse(os.path.exists(f"{self.path}.tmp"))
+        with open(self.path, "rb") as file:
+            self.assertEqual(file.read(), original)
+
+    def corrupt(self, index, field, value):
+        """Overwrite one byte field of the record at an index"""
+        with open(self.path, "r+b") as file:
+            file.seek(HEADER.size + index * RECORD_WITH_COST.size + field)
+            file.write(bytes((value,)))
+
+    def test_unknown_codes(self):
+        """Codes past the end of each lookup table are found on decoding or
+        when the droid is read"""
+        for field in range(3):
+            with self.subTest(field=field):
+                self.write_snapshot()
+                self.corrupt(50, field, 200)
+                droid_collection = load_snapshot(self.path)
+                with self.assertRaises(SnapshotError):
+                    droid_collection.sort_by_total_cost()
+                with self.assertRaises(SnapshotError):
+                    list(droid_collection)
+                droid_collection.release_file()
+
+    def test_option_the_model_lacks(self):
+        """A protocol droid with a toolbox is found on decoding"""
+        # Record 0 is a protocol droid, which has no options at all.
+        self.corrupt(0, 3, Droid.Options.TOOLBOX)
+        droid_collection = load_snapshot(self.path)
+        with self.assertRaises(SnapshotError):
+            droid_collection.sort_by_total_cost()
+        droid_collection.release_file()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,116 @@
+"""Tests for the threadsafe module"""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import sys
+import threading
+import unittest
+from collections import Counter
+
+# First-party Imports
+from columnar import ColumnarDroidCollection
+from droids import DroidCollection, droid_from_record
+from threadsafe import ThreadSafeDroidCollection
+
+# Droids added at a time by the writer thread, and how many times.
+CHUNK_SIZE = 10
+CHUNKS = 200
+
+
+def make_records(count):
+    """Return count compact records covering every model"""
+    return [
+        (index % 4, (index // 4) % 4, (index // 16) % 4, index % 64, index % 5)
+        for index in range(count)
+    ]
+
+
+def get_records(droids):
+    """Return the compact record of each droid in an iterable of droids"""
+    return [droid.to_record() for droid in droids]
+
+
+def write_chunks(droid_collection, records, reading):
+    """Once the reading event is set, add the records a chunk at a time,
+    sorting after each chunk"""
+    reading.wait()
+    for start in range(0, len(records), CHUNK_SIZE):
+        droid_collection.add_records(records[start : start + CHUNK_SIZE])
+        if start % (4 * CHUNK_SIZE) == 0:
+            droid_collection.sort_by_total_cost()
+        else:
+            droid_collection.sort_into_categories()
+
+
+class SnapshotIsolationTests(unittest.TestCase):
+    """A snapshot keeps showing the droids and order it was taken with"""
+
+    def test_unchanged_by_later_changes(self):
+        """Adding, sorting and repricing after a snapshot do not show up in
+        it"""
+        records = make_records(120)
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            with self.subTest(collection=collection_class.__name__):
+                droid_collection = ThreadSafeDroidCollection(collection_class())
+                droid_collection.add_records(records[:60])
+                snapshot = droid_collection.snapshot()
+                expected = get_records(snapshot)
+                astromech_droids = get_records(snapshot.query(model="Astromech"))
+
+                droid_collection.add_records(records[60:])
+                droid_collection.sort_by_total_cost()
+                droid_collection.sort_into_categories()
+                droid_collection.add_record(records[0])
+
+                self.assertEqual(len(snapshot), 60)
+                self.assertEqual(get_records(snapshot), expected)
+                self.assertEqual(get_records(snapshot.window(50, 20)), expected[50:])
+                self.assertEqual(snapshot[-1].to_record(), expected[-1])
+                self.assertEqual(
+                    get_records(snapshot.query(model="Astromech")), astromech_droids
+                )
+                self.assertEqual(len(droid_collection.snapshot()), 121)
+                self.assertGreater(
+                    droid_collection.snapshot().version, snapshot.version
+                )
+
+    def test_concurrent_writer(self):
+        """Snapshots taken while another thread adds and sorts each show a
+        whole number of the writer's changes"""
+        # Switch threads often, so reads and writes really are mixed.
+        self.addCleanup(sys.setswitchinterval, sys.getswitchinterval())
+        sys.setswitchinterval(1e-5)
+        records = make_records(CHUNK_SIZE * CHUNKS)
+        # Records each snapshot should hold, by its size.
+        expected_counts = {
+            size: Counter(get_records(map(droid_from_record, records[:size])))
+            for size in range(0, len(records) + 1, CHUNK_SIZE)
+        }
+        for collection_class in (DroidCollection, ColumnarDroidCollection):
+            with self.subTest(collection=collection_class.__name__):
+                droid_collection = ThreadSafeDroidCollection(collection_class())
+                reading = threading.Event()
+                writer = threading.Thread(
+                    target=write_chunks, args=(droid_collection, records, reading)
+                )
+                writer.start()
+                reading.set()
+                # Each snapshot is read while the writer keeps changing the
+                # collection.
+                while writer.is_alive():
+                    snapshot = droid_collection.snapshot()
+                    size = len(snapshot)
+                    self.assertEqual(size % CHUNK_SIZE, 0)
+                    # The droids are the ones added so far, in any order.
+                    self.assertEqual(
+                        Counter(get_records(snapshot)), expected_counts[size]
+                    )
+                writer.join()
+                self.assertEqual(len(droid_collection.snapshot()), len(records))
+
+
+if __name__ == "__main__":
+    unittest.main()
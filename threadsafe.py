@@ -0,0 +1,268 @@
+"""Thread Safe Droid Collection module
+
+Lets many threads use one droid collection at once. Changes, such as adding
+droids and sorting, are made one at a time under a lock. Reading is done
+from snapshots, which never change once taken, so threads can render, query
+and export a snapshot without any lock while other threads keep adding and
+sorting:
+
+    droid_collection = ThreadSafeDroidCollection(ColumnarDroidCollection())
+    ...
+    # In a reader thread
+    snapshot = droid_collection.snapshot()
+    snapshot.export_to_file("droids.txt")
+
+Taking a snapshot is quick however many droids there are. Rather than
+copying the droids, a snapshot remembers the sequence that holds the current
+order and how long it was. The collections only ever add to the end of that
+sequence or replace it with a new one, such as when sorting, so the part of
+it a snapshot reads never changes."""
+
+# David Barnes
+# CIS 226
+# 6-4-2023
+
+# System Imports
+import threading
+from contextlib import contextmanager
+from itertools import islice
+
+# First-party Imports
+from droids import DroidCollection, check_window
+
+
+class DroidSnapshot:
+    """Read only view of the droids in a collection, in the order they were
+    in when the snapshot was taken.
+
+    NOTE: The droids and their order are fixed, but their total costs are
+    not. Repricing the collection after a pricing catalog change shows up
+    in snapshots already taken."""
+
+    def __init__(self, droid_collection, version):
+        """Constructor. Only call this while nothing is changing the
+        collection."""
+        # pylint:disable=protected-access
+        self._droid_collection = droid_collection
+        self._to_droid = droid_collection._droid_for_entry
+        self._entries, self._size = droid_collection._get_entries()
+        # Number of changes made to the collection before the snapshot.
+        self.version = version
+
+    def __len__(self):
+        """Number of droids in the snapshot"""
+        return self._size
+
+    def __iter__(self):
+        """Iterate over the droids in their order at the time of the
+        snapshot"""
+        return map(self._to_droid, islice(self._entries, self._size))
+
+    def __getitem__(self, index):
+        """Get the droid at an index of the snapshot"""
+        # Indexing a range of the same length checks the index and turns a
+        # negative index into a positive one.
+        return self._to_droid(self._entries[range(self._size)[index]])
+
+    def is_empty(self):
+        """Whether the snapshot is empty or not"""
+        return self._size <= 0
+
+    def window(self, offset, count):
+        """Return a list of up to count droids, starting at position offset
+        of the snapshot"""
+        check_window(offset, count)
+        stop = min(offset + count, self._size)
+        return [self._to_droid(entry) for entry in self._entries[offset:stop]]
+
+    # Rendering, exporting and the rest only read the droids by iterating
+    # them, so the same code works on a snapshot as on a collection.
+    __str__ = DroidCollection.__str__
+    iter_rendered = DroidCollection.iter_rendered
+    write_to = DroidCollection.write_to
+    export_to_file = DroidCollection.export_to_file
+    iter_records = DroidCollection.iter_records
+    cheapest = DroidCollection.cheapest
+    most_expensive = DroidCollection.most_expensive
+    page = DroidCollection.page
+    page_count = DroidCollection.page_count
+
+    def query(self, model=None, material=None, color=None, options=0):
+        """Return a list of the droids matching every condition given, in
+        the order of the snapshot. See DroidCollection.query.
+
+        The indexes of the collection can not be used, as they are changed
+        along with the collection, so this looks at every droid."""
+        # pylint:disable=protected-access
+        conditions = self._droid_collection._query_conditions(
+            model, material, color, options
+        )
+        # Position in the record and code wanted there, for each of model,
+        # material and color that was given.
+        wanted = [
+            (position, conditions[name])
+            for position, name in enumerate(("model", "material", "color"))
+            if name in conditions
+        ]
+
+        matches = []
+        for droid in self:
+            record = droid.to_record()
+            if record[3] & options == options and all(
+                record[position] == code for position, code in wanted
+            ):
+                matches.append(droid)
+        return matches
+
+
+class ThreadSafeDroidCollection:
+    """Wraps a droid collection so that it can be shared between threads.
+
+    Every change goes through this class and is made while holding a lock,
+    so only one thread changes the collection at a time. Each change ends by
+    publishing a new snapshot, and snapshot returns the latest one without
+    taking the lock. Readers never wait for writers, and never see a change
+    that is only part way done."""
+
+    def __init__(self, droid_collection=None):
+        """Constructor. Uses a new DroidCollection when no collection is
+        given. The collection must not be used directly after this."""
+        if droid_collection is None:
+            droid_collection = DroidCollection()
+        self._droid_collection = droid_collection
+        self._lock = threading.Lock()
+        self._snapshot = DroidSnapshot(droid_collection, 0)
+
+    def snapshot(self):
+        """Return a snapshot of the collection after the latest change"""
+        return self._snapshot
+
+    @contextmanager
+    def write(self):
+        """Context manager that holds the lock and gives the collection, for
+        making several changes that readers should only see all at once"""
+        with self._lock:
+            try:
+                yield self._droid_collection
+            finally:
+                self._snapshot = DroidSnapshot(
+                    self._droid_collection, self._snapshot.version + 1
+                )
+
+    def add_protocol(self, material, color, number_of_languages):
+        """Add protocol droid to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_protocol(material, color, number_of_languages)
+
+    def add_utility(self, material, color, toolbox, computer_connection, scanner):
+        """Add utility droid to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_utility(
+                material, color, toolbox, computer_connection, scanner
+            )
+
+    def add_janitor(
+        self, material, color, toolbox, computer_connection, scanner, broom, vacuum
+    ):
+        """Add janitor droid to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_janitor(
+                material, color, toolbox, computer_connection, scanner, broom, vacuum
+            )
+
+    def add_astromech(
+        self,
+        material,
+        color,
+        toolbox,
+        computer_connection,
+        scanner,
+        navigation,
+        number_of_ships,
+    ):
+        """Add astromech droid to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_astromech(
+                material,
+                color,
+                toolbox,
+                computer_connection,
+                scanner,
+                navigation,
+                number_of_ships,
+            )
+
+    def add_record(self, record):
+        """Add a droid in compact record form to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_record(record)
+
+    def add_records(self, records):
+        """Add a batch of droids in compact record form to the collection"""
+        with self.write() as droid_collection:
+            droid_collection.add_records(records)
+
+    def load_default_droids(self):
+        """Load the default droids into the collection"""
+        with self.write() as droid_collection:
+            droid_collection.load_default_droids()
+
+    def sort_into_categories(self):
+        """Sort the collection by category"""
+        with self.write() as droid_collection:
+            droid_collection.sort_into_categories()
+
+    def sort_by_total_cost(self):
+        """Sort the collection by total cost"""
+        with self.write() as droid_collection:
+            droid_collection.sort_by_total_cost()
+
+    def reprice(self, change):
+        """Recalculate the total cost of the droids a pricing catalog change
+        affects. Returns the number of droids affected."""
+        with self.write() as droid_collection:
+            return droid_collection.reprice(change)
+
+    def group_by(self, *dimensions):
+        """Return the cost summary of each group of droids. See
+        DroidCollection.group_by."""
+        # The running totals catch up on new droids when read, so this needs
+        # the lock even though the droids do not change.
+        with self._lock:
+            return self._droid_collection.group_by(*dimensions)
+
+    def cost_summary(self):
+        """Return a CostSummary of every droid in the collection"""
+        with self._lock:
+            return self._droid_collection.cost_summary()
+
+    def __len__(self):
+        """Number of droids in the latest snapshot"""
+        return len(self._snapshot)
+
+    def __iter__(self):
+        """Iterate over the droids of the latest snapshot"""
+        return iter(self._snapshot)
+
+    def __str__(self):
+        """String method. Renders the latest snapshot."""
+        return str(self._snapshot)
+
+    def export_to_file(self, path):
+        """Write the printed form of the latest snapshot to a file"""
+        self._snapshot.export_to_file(path)
+
+    def iter_records(self, include_costs=False):
+        """Yield each droid of the latest snapshot as a compact record tuple.
+        See DroidCollection.iter_records."""
+        return self._snapshot.iter_records(include_costs)
+
+    def window(self, offset, count):
+        """Return a list of up to count droids of the latest snapshot,
+        starting at position offset"""
+        return self._snapshot.window(offset, count)
+
+    def query(self, model=None, material=None, color=None, options=0):
+        """Return the droids of the latest snapshot matching every condition
+        given. See DroidSnapshot.query."""
+        return self._snapshot.query(model, material, color, options)
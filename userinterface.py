@@ -6,6 +6,7 @@
 
 # First-party imports
 from colors import (
+    console,
     print_error,
     print_info,
     print_primary,
@@ -13,11 +14,13 @@ from colors import (
     print_warning,
 )
 from droids import (
+    DEFAULT_PAGE_SIZE,
     AstromechDroid,
     Droid,
     JanitorDroid,
     ProtocolDroid,
     UtilityDroid,
+    write_droids,
 )
 
 
@@ -25,6 +28,9 @@ class UserInterface:
     """Do I/O with the user"""
 
     MAX_MENU_CHOICES = 5
+    # Number of droids printed at a time. Longer lists are shown a page at
+    # a time, so only the droids on screen are priced and rendered.
+    PAGE_SIZE = DEFAULT_PAGE_SIZE
 
     def __init__(self, droid_collection):
         """Constructor"""
@@ -60,16 +66,122 @@ class UserInterface:
         print_success("Droid list has been sorted by their Total Cost")
         print()
 
+    def display_load_report(self, path, report):
+        """Display the result of bulk loading a droid file"""
+        print()
+        for error in report.errors:
+            print_error(f"{path}: {error}")
+        if report.has_errors:
+            print_warning(
+                f"Loaded {report.loaded} droids from {path}. "
+                f"Skipped {len(report.errors)} invalid rows."
+            )
+        else:
+            print_success(f"Loaded {report.loaded} droids from {path}.")
+
+    def display_load_error(self, path, error):
+        """Display why a droid file could not be bulk loaded"""
+        print()
+        print_error(f"Could not load {path}: {error}")
+        print()
+
+    def display_catalog_reloaded(self, repriced):
+        """Display that the pricing catalog was reloaded"""
+        print_info(f"Pricing catalog reloaded. Repriced {repriced} droids.")
+        print()
+
+    @staticmethod
+    def display_catalog_load_error(error):
+        """Display why the pricing catalog given on the command line could
+        not be loaded. Static as it is shown before there is a collection."""
+        print_error(f"Pricing catalog not loaded: {error}")
+        print()
+
+    @staticmethod
+    def display_snapshot_error(message):
+        """Display why the snapshot file could not be loaded or saved. Static
+        as loading fails before there is a collection."""
+        print_error(message)
+        print()
+
+    def display_catalog_error(self, error):
+        """Display why the pricing catalog could not be reloaded"""
+        print_error(f"Pricing catalog not reloaded: {error}")
+        print()
+
     def print_droid_list(self):
         """Print the droid list out"""
         print()
         if self.droid_collection.is_empty():
             print_warning("The droid collection is currently empty.")
             print()
+        elif len(self.droid_collection) > self.PAGE_SIZE:
+            self._page_droid_list()
         else:
-            print_success("This is the current droid list:")
-            print(self.droid_collection)
+            # Collect the whole listing into large buffered writes instead
+            # of writing each piece to the terminal separately.
+            with console.buffered():
+                print_success("This is the current droid list:")
+                # Stream the droids out in chunks rather than building one
+                # string holding the entire list.
+                self.droid_collection.write_to(console)
+                console.write("\n\n")
+
+    def _page_droid_list(self):
+        """Print the droid list a page at a time, until the user goes back
+        to the main menu"""
+        size = len(self.droid_collection)
+        offset = 0
+        while offset is not None:
+            droids = self.droid_collection.window(offset, self.PAGE_SIZE)
+            with console.buffered():
+                print_success(
+                    "This is the current droid list "
+                    f"(droids {offset + 1} to {offset + len(droids)} of {size}):"
+                )
+                write_droids(console, droids)
+                console.write("\n")
+            offset = self._get_page_choice(offset, size)
+        print()
+
+    def _display_page_menu(self, offset):
+        """Display the page menu"""
+        page = offset // self.PAGE_SIZE + 1
+        pages = self.droid_collection.page_count(self.PAGE_SIZE)
+        print_info(f"Page {page} of {pages}. What would you like to do?")
+        print("n. Show the next page")
+        print("p. Show the previous page")
+        print("g. Go to a page number")
+        print("j. Jump to a droid number")
+        print("q. Return to the main menu")
+        print()
+        self._display_prompt()
+
+    def _get_page_choice(self, offset, size):
+        """Ask the user which droids to show next. Returns the offset of the
+        first droid to show, or None to stop showing the list."""
+        self._display_page_menu(offset)
+        while True:
+            user_input = input().strip().lower()
+            # Pressing enter on its own shows the next page.
+            if user_input in ("n", ""):
+                next_offset = offset + self.PAGE_SIZE
+                # Going past the last page ends the list.
+                return next_offset if next_offset < size else None
+            if user_input == "p":
+                return max(0, offset - self.PAGE_SIZE)
+            if user_input == "g":
+                pages = self.droid_collection.page_count(self.PAGE_SIZE)
+                page = min(max(self._get_int(message="Which page?"), 1), pages)
+                return (page - 1) * self.PAGE_SIZE
+            if user_input == "j":
+                number = self._get_int(message=f"Which droid number (1 to {size})?")
+                return min(max(number, 1), size) - 1
+            if user_input == "q":
+                return None
+            print_error("That is not a valid entry.")
             print()
+            self._display_page_menu(offset)
 
     def create_droid(self):
         """Get new Droid info"""
@@ -119,6 +231,13 @@ class UserInterface:
             print_warning("Droid addition canceled.")
             print()
             return
+        except ValueError as err:
+            # The columnar backend can not hold every number the menu accepts,
+            # such as more ships than fit in its count column.
+            print()
+            print_error(f"Droid not added: {err}")
+            print()
+            return
 
     def get_menu_choice(self, max_choice, menu_function):
         """Prompt user for a menu choice"""